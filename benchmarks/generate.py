@@ -0,0 +1,175 @@
+# benchmarks/generate.py
+"""
+Corpus sintético para os benchmarks: planilha XLSX com N atos e um conjunto
+de patches (data/patches/*.json) no mesmo formato dos gerados pelas Issues.
+
+- cabeçalhos sorteados entre as variantes reais de COLS_VARIANTS, com linhas
+  de título acima (exercita a detecção do cabeçalho);
+- identificações acentuadas ("Portaria Conjunta MDS/INSS nº 1.234, de 5 de
+  março de 2021"), às vezes sem as colunas TIPO/NÚMERO (força a inferência);
+- cadeias de alteração densas: cada patch de ato novo altera o patch
+  anterior do seu grupo (grupos de CHAIN) e mais 1-3 atos da planilha; os
+  patches "alterar ato" acrescentam alterado_por cruzados.
+
+Uso: python -m benchmarks.generate 10000 --out /tmp/bench-10k
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+import argparse
+import json
+import random
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from openpyxl import Workbook
+
+from bpa.extract.xlsx_ingest import COLS_VARIANTS
+
+MESES = ["janeiro", "fevereiro", "março", "abril", "maio", "junho", "julho",
+         "agosto", "setembro", "outubro", "novembro", "dezembro"]
+TIPOS = ["Lei", "Decreto", "Medida Provisória", "Portaria", "Portaria Conjunta", "Portaria MDS",
+         "Portaria INSS", "Portaria Interministerial", "Instrução Normativa", "Instrução Operacional",
+         "Memorando Circular", "Orientação Interna", "Resolução"]
+ORGAOS = ["MDS", "INSS", "MPS", "MDS/INSS", "MC/MTP/INSS", "MDS/MPS/INSS", "SNAS", "CNAS"]
+TEMAS = ["BPC", "Renda Mensal Vitalícia", "Cadastro Único", "Avaliação da deficiência",
+         "Revisão de benefícios", "Auxílio-Inclusão", "Pensão Especial"]
+VIGENCIAS = ["Vigente", "vigente", "V", "Revogada", "Revogado", "R", "Suspensa", "Não vigente"]
+ASSUNTOS = ["concessão", "manutenção", "revisão", "cessação", "reavaliação biopsicossocial",
+            "cálculo da renda per capita", "inscrição no CadÚnico", "pagamento", "recurso administrativo"]
+CHAIN = 8
+
+# campos gravados na planilha, na ordem das colunas
+_FIELDS = ["tipo", "numero", "ano", "data", "vigencia", "identificacao", "ementa", "tema",
+           "origem", "fonte_planalto", "fonte_dou"]
+
+
+def _numero(i: int, tipo: str) -> str:
+    n = str(i + 1)
+    # leis e decretos com separador de milhar, como publicados
+    if tipo in ("Lei", "Decreto") and len(n) > 3:
+        n = f"{int(n):,}".replace(",", ".")
+    return n
+
+
+def make_acts(n: int, rnd: random.Random) -> list[dict]:
+    """N atos distintos (tipo+número+ano e identificação únicos)."""
+    counters: dict[tuple[str, int], int] = {}
+    acts = []
+    for i in range(n):
+        tipo = rnd.choice(TIPOS)
+        ano = rnd.randint(1990, 2025)
+        k = counters.get((tipo, ano), 0)
+        counters[tipo, ano] = k + 1
+        num = _numero(k, tipo)
+        d = datetime(ano, rnd.randint(1, 12), rnd.randint(1, 28))
+        # órgão no texto só onde não muda o tipo inferido ("Portaria" + "MDS" = "Portaria MDS")
+        if tipo in ("Lei", "Decreto", "Medida Provisória", "Portaria MDS", "Portaria INSS"):
+            orgao = ""
+        else:
+            orgao = " " + rnd.choice([o for o in ORGAOS if tipo != "Portaria" or not o.startswith(("MDS", "INSS"))])
+        ident = f"{tipo}{orgao} nº {num}, de {d.day}{'º' if d.day == 1 else ''} de {MESES[d.month - 1]} de {ano}"
+        act = {
+            "tipo": tipo, "numero": num, "ano": str(ano), "data": d,
+            "vigencia": rnd.choice(VIGENCIAS), "identificacao": ident,
+            "ementa": f"Dispõe sobre {rnd.choice(ASSUNTOS)} do benefício no âmbito do {rnd.choice(TEMAS)}"
+                      f" e dá outras providências ({i}).",
+            "tema": rnd.choice(TEMAS), "origem": orgao.strip(),
+            "fonte_planalto": f"https://www.planalto.gov.br/ccivil_03/ato/{ano}/{i}.htm" if rnd.random() < 0.3 else "",
+            "fonte_dou": f"https://www.in.gov.br/web/dou/-/ato-{i}" if rnd.random() < 0.5 else "",
+        }
+        acts.append(act)
+    return acts
+
+
+def write_xlsx(acts: list[dict], path: Path, rnd: random.Random) -> None:
+    # variante de cabeçalho sorteada por campo; às vezes sem TIPO/NÚMERO
+    header = [rnd.choice(COLS_VARIANTS[f]) for f in _FIELDS]
+    keep = [j for j, f in enumerate(_FIELDS) if not (f in ("tipo", "numero") and rnd.random() < 0.5)]
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Normativos")
+    ws.append(["Normativas de Benefícios Assistenciais — base sintética"])
+    ws.append([])
+    ws.append([header[j] for j in keep])
+    for a in acts:
+        ws.append([a[_FIELDS[j]] for j in keep])
+    wb.save(path)
+
+
+def _short_ref(a: dict) -> str:
+    return f"{a['tipo']} nº {a['numero']}/{a['ano']}"
+
+
+def make_patches(acts: list[dict], rnd: random.Random, count: int) -> list[dict]:
+    """
+    Patches de Issues: ~60% novos atos que alteram atos existentes, ~30%
+    "alterar ato" (situação/links/alterado_por) e ~10% reenvios de atos que
+    já estão na planilha (devem virar upsert, não duplicata).
+    """
+    out = []
+    novos, anterior = 0, ""
+    for k in range(count):
+        r = rnd.random()
+        if r < 0.6:
+            alvos = [_short_ref(a) if rnd.random() < 0.5 else a["identificacao"]
+                     for a in rnd.sample(acts, min(len(acts), rnd.randint(1, 3)))]
+            if novos % CHAIN:
+                alvos.insert(0, anterior)
+            novos, anterior = novos + 1, f"Portaria MDS nº {90000 + k}/2026"
+            out.append({
+                "tipo": "Portaria MDS", "numero": str(90000 + k), "ano": "2026", "data": "2026-01-15",
+                "vigencia": "Vigente", "origem": "MDS",
+                "identificacao": f"Portaria MDS nº {90000 + k}, de 15 de janeiro de 2026",
+                "ementa": f"Altera normas de {rnd.choice(ASSUNTOS)} ({k}).", "tema": rnd.choice(TEMAS),
+                "fonte_dou": f"https://www.in.gov.br/web/dou/-/portaria-{90000 + k}",
+                "fonte_planalto": "",
+                "altera": "; ".join(alvos),
+                "alterado_por": "",
+            })
+        elif r < 0.9:
+            a = rnd.choice(acts)
+            out.append({"acao": "alterar", "slug": a["identificacao"], "campos": {
+                "situacao": rnd.choice(["Revogada", "Vigente"]),
+                "dou_url": f"https://www.in.gov.br/web/dou/-/retificacao-{k}",
+                "alterado_por": [_short_ref(rnd.choice(acts))],
+            }})
+        else:
+            a = rnd.choice(acts)
+            out.append({**{f: str(a[f]) for f in _FIELDS if f != "data"}, "data": a["data"].strftime("%Y-%m-%d")})
+    return out
+
+
+def generate(n: int, out_dir: str | Path, seed: int = 0, patches: int | None = None) -> dict:
+    """
+    Grava OUT_DIR/data/acts.xlsx e OUT_DIR/data/patches/*.json (N/10 patches
+    por padrão). Layout igual ao do repositório, para rodar merge_patches no
+    próprio diretório. Retorna os caminhos gerados.
+    """
+    rnd = random.Random(seed)
+    out = Path(out_dir)
+    data = out / "data"
+    pdir = data / "patches"
+    pdir.mkdir(parents=True, exist_ok=True)
+    acts = make_acts(n, rnd)
+    xlsx = data / "acts.xlsx"
+    write_xlsx(acts, xlsx, rnd)
+    plist = make_patches(acts, rnd, n // 10 if patches is None else patches)
+    for k, p in enumerate(plist):
+        (pdir / f"issue-{k:06d}.json").write_text(json.dumps(p, ensure_ascii=False, indent=2), encoding="utf-8")
+    return {"xlsx": str(xlsx), "patches": str(pdir), "acts": n, "patch_count": len(plist)}
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("n", type=int)
+    p.add_argument("--out", required=True)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--patches", type=int, default=None)
+    args = p.parse_args()
+    print(json.dumps(generate(args.n, args.out, args.seed, args.patches), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
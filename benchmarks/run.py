@@ -0,0 +1,178 @@
+# benchmarks/run.py
+"""
+Mede cada etapa do pipeline sobre corpora sintéticos (benchmarks.generate):
+tempo de parede e pico de memória Python (tracemalloc), em execuções
+separadas para que o rastreamento não distorça o tempo.
+
+Etapas, cada uma sobre a saída da anterior:
+  read_xlsx_to_json   leitura pandas da planilha (lista em memória)
+  write_norms_json    ingest streaming -> data/norms.json
+  merge_patches       scripts/merge_patches.main (upsert + ledger)
+  validate            bpa.validate sobre o corpus mesclado
+  build_site          publicação completa (--full)
+  build_site_incr     republicação sem mudanças (manifesto)
+  build_sqlite        banco SQLite/FTS5
+
+Uso: python -m benchmarks.run --sizes 1000 10000 --out benchmarks/results.json
+     python -m benchmarks.run --sizes 1000 --baseline benchmarks/results.json
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from pathlib import Path
+import argparse
+import contextlib
+import gc
+import importlib.util
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.generate import generate
+from bpa import corpus
+from bpa.extract.xlsx_ingest import read_xlsx_to_json, write_norms_json
+from bpa.publish.emit_site import build_site
+from bpa.publish.emit_sqlite import build_sqlite
+from bpa.validate import validate_file
+
+
+def _load_merge_patches():
+    spec = importlib.util.spec_from_file_location("merge_patches", ROOT / "scripts" / "merge_patches.py")
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def _measure(setup, fn, memory: bool) -> tuple[dict, object]:
+    setup()
+    gc.collect()
+    t0 = time.perf_counter()
+    result = fn()
+    res = {"segundos": round(time.perf_counter() - t0, 4)}
+    if memory:
+        setup()
+        gc.collect()
+        tracemalloc.start()
+        fn()
+        res["pico_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+        tracemalloc.stop()
+    return res, result
+
+
+def run_size(n: int, work: Path, memory: bool = True, jobs: int = 1) -> dict:
+    t0 = time.perf_counter()
+    gen = generate(n, work)
+    stages: dict[str, dict] = {"gerar": {"segundos": round(time.perf_counter() - t0, 4)}}
+    xlsx = Path(gen["xlsx"])
+    data = work / "data"
+    norms = data / "norms.json"
+    ingested = work / "ingested.json"
+    site = work / "_site"
+    mp = _load_merge_patches()
+    noop = lambda: None
+
+    def step(name, setup, fn, extra=None):
+        res, out = _measure(setup, fn, memory)
+        if extra:
+            res.update(extra(out))
+        stages[name] = res
+        print(f"  {name:<18} {res['segundos']:>9.3f}s" + (f" {res['pico_mb']:>9.1f} MB" if "pico_mb" in res else ""), flush=True)
+        return out
+
+    step("read_xlsx_to_json", noop, lambda: read_xlsx_to_json(xlsx), lambda r: {"registros": len(r)})
+    step("write_norms_json", noop, lambda: write_norms_json(xlsx, ingested, engine="stream", jobs=1),
+         lambda c: {"registros": c})
+
+    def reset_merge():
+        shutil.copyfile(ingested, norms)
+        (data / "patches" / mp.LEDGER_NAME).unlink(missing_ok=True)
+
+    def merge():
+        with contextlib.redirect_stdout(io.StringIO()):
+            mp.main(data)
+
+    step("merge_patches", reset_merge, merge,
+         lambda _: {"registros": len(corpus.load(norms)), "patches": gen["patch_count"]})
+    step("validate", noop, lambda: validate_file(ROOT / "data" / "schema.json", norms),
+         lambda r: {"violacoes": len(r[0])})
+    step("build_site", lambda: shutil.rmtree(site, ignore_errors=True),
+         lambda: build_site(str(norms), str(site), full=True, jobs=jobs), lambda s: dict(s))
+    step("build_site_incr", noop, lambda: build_site(str(norms), str(site), jobs=jobs), lambda s: dict(s))
+    step("build_sqlite", lambda: (site / "bench.sqlite").unlink(missing_ok=True),
+         lambda: build_sqlite(str(norms), str(site / "bench.sqlite"), graph_json=str(site / "graph.json")))
+    return {"atos": n, "patches": gen["patch_count"], "etapas": stages}
+
+
+def _git_rev() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _compare(results: dict, baseline: dict) -> None:
+    base = {r["atos"]: r["etapas"] for r in baseline.get("corpora", [])}
+    for r in results["corpora"]:
+        prev = base.get(r["atos"])
+        if not prev:
+            continue
+        print(f">> {r['atos']} atos vs. baseline ({baseline.get('git', '?')}):")
+        for name, cur in r["etapas"].items():
+            old = prev.get(name)
+            if not old or not old.get("segundos"):
+                continue
+            line = f"  {name:<18} x{cur['segundos'] / old['segundos']:.2f} tempo"
+            if cur.get("pico_mb") and old.get("pico_mb"):
+                line += f"  x{cur['pico_mb'] / old['pico_mb']:.2f} memória"
+            print(line)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmarks do pipeline ingest/merge/validate/publish.")
+    p.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000],
+                   help="Tamanhos do corpus (nº de atos). Ex.: --sizes 1000 10000 100000")
+    p.add_argument("--out", default=str(ROOT / "benchmarks" / "results.json"))
+    p.add_argument("--baseline", default=None, help="results.json anterior para comparar.")
+    p.add_argument("--no-memory", action="store_true", help="Só tempo (pula a segunda execução com tracemalloc).")
+    p.add_argument("--jobs", "-j", type=int, default=1, help="Processos do build_site.")
+    p.add_argument("--keep", action="store_true", help="Mantém os diretórios de trabalho.")
+    args = p.parse_args()
+
+    results = {
+        "quando": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git": _git_rev(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "corpora": [],
+    }
+    for n in args.sizes:
+        work = Path(tempfile.mkdtemp(prefix=f"bpa-bench-{n}-"))
+        print(f">> {n} atos ({work})", flush=True)
+        try:
+            results["corpora"].append(run_size(n, work, memory=not args.no_memory, jobs=args.jobs))
+        finally:
+            if not args.keep:
+                shutil.rmtree(work, ignore_errors=True)
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f">> Resultados: {out}")
+    if args.baseline:
+        _compare(results, json.loads(Path(args.baseline).read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+# bpa/api.py
+"""
+API JSON somente leitura sobre o corpus (bpa api), para ferramentas internas
+que hoje baixam o norms.json inteiro.
+
+  GET /                         versão do corpus, nº de atos e rotas
+  GET /normas?...               listagem filtrada e paginada (filtros de bpa search:
+                                q, tipo (repetível), numero, ano, tema, origem,
+                                situacao; pagina, por_pagina)
+  GET /normas/<slug>            registro completo (?raw=1 inclui os metadados da planilha)
+  GET /normas/<slug>/relacoes   altera / alterado_por / relacionados / cadeia, do grafo do site
+
+Os índices (bpa.search e o grafo de relações do publish) são montados na
+carga e refeitos quando o arquivo do corpus muda. Um ato por slug, como nas
+páginas do site: registros de slug repetido valem pelo último, na listagem,
+no detalhe e na contagem de GET /. Toda resposta 200 leva um
+ETag forte = sha256(hash do corpus + rota canônica), então If-None-Match é
+respondido com 304 sem executar a consulta; corpos grandes vão em gzip
+quando o cliente aceita (com ETag próprio, por ser outra representação).
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable
+from urllib.parse import parse_qs, unquote, urlencode, urlsplit
+import gzip
+import hashlib
+import json
+import threading
+
+from bpa import corpus
+from bpa.publish.emit_site import graph_for, page_items
+from bpa.publish.graph import RELS, page_refs
+from bpa.search import Query, load_index
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# respostas menores que isto não compensam o gzip
+GZIP_MIN = 512
+# respostas prontas (corpo + gzip) guardadas por rota canônica
+RESPONSE_CACHE = 256
+
+_LIST_PARAMS = ("q", "tipo", "numero", "ano", "tema", "origem", "situacao", "pagina", "por_pagina")
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class Snapshot:
+    """Corpus carregado + índices, imutável; trocado inteiro quando o arquivo muda."""
+
+    def __init__(self, norms_path: Path, cache_dir: Path | None):
+        self.stat = _stat(norms_path)
+        if norms_path.exists():
+            with open(norms_path, "rb") as f:
+                self.corpus_hash = hashlib.file_digest(f, "sha256").hexdigest()
+        else:
+            self.corpus_hash = hashlib.sha256(b"").hexdigest()
+        norms = corpus.load(norms_path)
+        # mesmos slugs do site; slugs repetidos: vale o último
+        self.items = page_items(norms)
+        self.graph = graph_for(self.items)
+        self.index = load_index(norms_path, cache_dir)
+
+    # ----------------- rotas -----------------
+
+    def root(self) -> dict[str, Any]:
+        return {
+            "versao": self.corpus_hash[:16],
+            "normas": len(self.items),
+            "rotas": ["/normas", "/normas/{slug}", "/normas/{slug}/relacoes"],
+        }
+
+    def listing(self, params: dict[str, list[str]]) -> dict[str, Any]:
+        first = lambda k: (params.get(k) or [""])[0]
+        pagina = _positive(first("pagina") or "1", "pagina")
+        por_pagina = _positive(first("por_pagina") or str(PAGE_SIZE), "por_pagina")
+        if por_pagina > MAX_PAGE_SIZE:
+            raise ApiError(400, f"por_pagina acima de {MAX_PAGE_SIZE}")
+        q = Query(first("q"), tuple(params.get("tipo") or ()), first("numero"), first("ano"),
+                  first("tema"), first("origem"), first("situacao"))
+        found = self.index.search(q)
+        start = (pagina - 1) * por_pagina
+        return {
+            "total": len(found),
+            "pagina": pagina,
+            "por_pagina": por_pagina,
+            "paginas": -(-len(found) // por_pagina),
+            "itens": found[start:start + por_pagina],
+        }
+
+    def detail(self, slug: str, raw: bool) -> dict[str, Any]:
+        n = self._norm(slug)
+        return {**n.to_json(raw=raw), "slug": slug}
+
+    def relations(self, slug: str) -> dict[str, Any]:
+        self._norm(slug)
+        refs = page_refs(self.graph, slug)
+        derived = {rel: {(label, target): d for label, target, d in self.graph["arestas"].get(slug, {}).get(rel, [])}
+                   for rel in RELS}
+        out: dict[str, Any] = {"slug": slug}
+        for rel in RELS:
+            out[rel] = [{"rotulo": label, "slug": target, "derivada": bool(derived[rel].get((label, target)))}
+                        for label, target in refs[rel]]
+        out["cadeia"] = [{"rotulo": label, "slug": target} for label, target in refs["cadeia"]]
+        return out
+
+    def _norm(self, slug: str):
+        hit = self.items.get(slug)
+        if hit is None:
+            raise ApiError(404, f"ato não encontrado: {slug}")
+        return hit[1]
+
+
+def _positive(v: str, name: str) -> int:
+    try:
+        k = int(v)
+    except ValueError:
+        k = 0
+    if k < 1:
+        raise ApiError(400, f"{name} deve ser inteiro positivo")
+    return k
+
+
+def _stat(p: Path) -> tuple[int, int] | None:
+    try:
+        st = p.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def route(target: str) -> tuple[str, Callable[[Snapshot], dict[str, Any]]]:
+    """
+    Rota canônica (parâmetros conhecidos, ordenados) e a função que produz a
+    resposta; a rota canônica é a chave do ETag e do cache de respostas.
+    """
+    parts = urlsplit(target)
+    path = "/" + "/".join(unquote(s) for s in parts.path.split("/") if s)
+    params = parse_qs(parts.query)
+    segs = path.strip("/").split("/") if path != "/" else []
+    if not segs:
+        return "/", Snapshot.root
+    if segs[0] != "normas" or len(segs) > 3:
+        raise ApiError(404, f"rota inexistente: {path}")
+    if len(segs) == 1:
+        known = {k: sorted(v) if k == "tipo" else v[:1] for k, v in params.items() if k in _LIST_PARAMS}
+        canon = path + ("?" + urlencode(sorted(known.items()), doseq=True) if known else "")
+        return canon, lambda s: s.listing(known)
+    slug = segs[1]
+    if len(segs) == 3:
+        if segs[2] != "relacoes":
+            raise ApiError(404, f"rota inexistente: {path}")
+        return path, lambda s: s.relations(slug)
+    raw = (params.get("raw") or [""])[0] in ("1", "true", "sim")
+    return path + ("?raw=1" if raw else ""), lambda s: s.detail(slug, raw)
+
+
+def _accepts_gzip(header: str | None) -> bool:
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            q = params.strip()
+            return not q.startswith("q=") or q[2:].strip() not in ("0", "0.0", "0.00", "0.000")
+    return False
+
+
+def _etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    # If-None-Match usa comparação fraca: W/"x" casa com "x"
+    return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
+
+
+class Api:
+    """Estado compartilhado pelos handlers: snapshot atual e cache de respostas."""
+
+    def __init__(self, norms_path: Path, cache_dir: Path | None = None):
+        self.norms_path = norms_path
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._snapshot = Snapshot(norms_path, cache_dir)
+        self._responses: OrderedDict[tuple[str, str], tuple[bytes, bytes | None]] = OrderedDict()
+
+    def snapshot(self) -> Snapshot:
+        """Snapshot do corpus atual; recarrega se o arquivo mudou (tamanho/mtime)."""
+        snap = self._snapshot
+        if _stat(self.norms_path) == snap.stat:
+            return snap
+        with self._lock:
+            if _stat(self.norms_path) != self._snapshot.stat:
+                self._snapshot = Snapshot(self.norms_path, self.cache_dir)
+                self._responses.clear()
+            return self._snapshot
+
+    def respond(self, snap: Snapshot, canon: str, produce: Callable[[Snapshot], dict[str, Any]]) -> tuple[bytes, bytes | None]:
+        """(corpo JSON, corpo em gzip ou None), do cache quando possível."""
+        key = (snap.corpus_hash, canon)
+        with self._lock:
+            hit = self._responses.get(key)
+            if hit is not None:
+                self._responses.move_to_end(key)
+                return hit
+        body = json.dumps(produce(snap), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        gz = gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= GZIP_MIN else None
+        with self._lock:
+            self._responses[key] = (body, gz)
+            while len(self._responses) > RESPONSE_CACHE:
+                self._responses.popitem(last=False)
+        return body, gz
+
+
+def make_handler(api: Api) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "bpa-api"
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def do_HEAD(self):
+            self._get(head=True)
+
+        def do_GET(self):
+            self._get(head=False)
+
+        def _get(self, head: bool) -> None:
+            try:
+                canon, produce = route(self.path)
+                snap = api.snapshot()
+                use_gz = _accepts_gzip(self.headers.get("Accept-Encoding"))
+                base = hashlib.sha256((snap.corpus_hash + "\0" + canon).encode("utf-8")).hexdigest()[:32]
+                etag_plain, etag_gz = f'"{base}"', f'"{base}-gz"'
+                inm = self.headers.get("If-None-Match")
+                for etag in ((etag_gz, etag_plain) if use_gz else (etag_plain,)):
+                    if _etag_matches(inm, etag):
+                        self.send_response(304)
+                        self._common(etag)
+                        self.end_headers()
+                        return
+                body, gz = api.respond(snap, canon, produce)
+            except ApiError as e:
+                return self._error(e.status, str(e), head)
+            except Exception as e:  # corpus ilegível durante uma regravação etc.
+                return self._error(500, f"{type(e).__name__}: {e}", head)
+            self.send_response(200)
+            if use_gz and gz is not None:
+                body = gz
+                self._common(etag_gz)
+                self.send_header("Content-Encoding", "gzip")
+            else:
+                self._common(etag_plain)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if not head:
+                self.wfile.write(body)
+
+        def _common(self, etag: str) -> None:
+            self.send_header("ETag", etag)
+            # o cliente guarda, mas revalida (If-None-Match) a cada uso
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Vary", "Accept-Encoding")
+
+        def _error(self, status: int, message: str, head: bool) -> None:
+            body = json.dumps({"erro": message}, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if not head:
+                self.wfile.write(body)
+
+    return Handler
+
+
+def serve_api(norms_path: Path, host: str = "127.0.0.1", port: int = 8001, cache_dir: Path | None = None,
+              log: Callable[[str], None] = print) -> None:
+    api = Api(norms_path, cache_dir)
+    server = ThreadingHTTPServer((host, port), make_handler(api))
+    server.daemon_threads = True
+    log(f">> API de {norms_path} ({len(api.snapshot().items)} atos) em http://{host}:{server.server_address[1]}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -1,34 +1,221 @@
 ﻿from __future__ import annotations
+from contextlib import contextmanager
 from pathlib import Path
+import json
 import click
 
+from bpa import corpus, metrics
+from bpa.api import serve_api
 from bpa.extract.xlsx_ingest import write_norms_json
-from bpa.publish.emit_site import build_site
+from bpa.publish.assets import format_sizes
+from bpa.publish.changes import diff_records, is_empty, summary
+from bpa.publish.emit_site import page_items, build_site
+from bpa.publish.emit_sqlite import build_sqlite
+from bpa.publish.graph import GRAPH_NAME
+from bpa.search import Query, format_table, load_index
+from bpa.serve import serve as serve_site
+from bpa.validate import validate_file
 
 @click.group()
 def cli():
-    """Ferramentas do Banco de Normativos (ingest / publish)."""
+    """Ferramentas do Banco de Normativos (ingest / publish / validate / search / serve / api / convert / diff)."""
     pass
 
+def _metrics_options(f):
+    """--profile / --metrics-json / --cprofile, comuns a ingest e publish."""
+    f = click.option("--cprofile", "cprofile", type=click.Path(dir_okay=False, path_type=Path), default=None,
+                     help="Grava o dump do cProfile (pstats) do comando neste arquivo.")(f)
+    f = click.option("--metrics-json", "metrics_json", type=click.Path(dir_okay=False, path_type=Path), default=None,
+                     help="Grava tempo, pico de RSS e itens de cada etapa neste JSON.")(f)
+    f = click.option("--profile", is_flag=True, help="Mostra a tabela de métricas por etapa ao final.")(f)
+    return f
+
+@contextmanager
+def _instrumented(command: str, profile: bool, metrics_json: Path | None, cprofile: Path | None):
+    if not (profile or metrics_json or cprofile):
+        yield
+        return
+    with metrics.session(command, metrics_json=metrics_json, cprofile=cprofile) as m:
+        yield
+    if profile:
+        click.echo(m.table(), err=True)
+    if metrics_json:
+        click.echo(f">> Métricas: {metrics_json}", err=True)
+
 @cli.command()
-@click.argument("xlsx", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.argument("xlsx", nargs=-1, required=True, type=click.Path(exists=True, path_type=Path))
 @click.option("--out-json", "out_json", type=click.Path(dir_okay=False, path_type=Path), default=Path("data/norms.json"))
-def ingest(xlsx: Path, out_json: Path):
-    """Lê a PLANILHA XLSX e gera data/norms.json normalizado."""
-    click.echo(f">> Lendo: {xlsx}")
-    write_norms_json(xlsx, out_json)
-    click.echo(f">> Gravado: {out_json}")
+@click.option("--engine", type=click.Choice(["stream", "pandas"]), default="stream", show_default=True,
+              help="stream: openpyxl read_only, registro a registro; pandas: DataFrame inteiro em memória.")
+@click.option("--jobs", "-j", type=int, default=None, help="Processos para ler planilhas/abas em paralelo (padrão: nº de CPUs).")
+@click.option("--all-sheets", is_flag=True, help="Lê todas as abas com cabeçalho reconhecível, não só a primeira.")
+@click.option("--cache-dir", type=click.Path(file_okay=False, path_type=Path), default=Path(".cache"), show_default=True,
+              help="Reaproveita registros de planilhas já ingeridas (mesmo conteúdo e versão do parser).")
+@click.option("--no-cache", is_flag=True, help="Não lê nem grava o cache de ingest.")
+@_metrics_options
+def ingest(xlsx: tuple[Path, ...], out_json: Path, engine: str, jobs: int | None, all_sheets: bool,
+           cache_dir: Path, no_cache: bool, profile: bool, metrics_json: Path | None, cprofile: Path | None):
+    """Lê uma ou mais PLANILHAS XLSX (ou diretórios) e gera data/norms.json normalizado (.ndjson = NDJSON)."""
+    for x in xlsx:
+        click.echo(f">> Lendo: {x}")
+    with _instrumented("ingest", profile, metrics_json, cprofile):
+        total = write_norms_json(list(xlsx), out_json, engine=engine, jobs=jobs, all_sheets=all_sheets,
+                                 cache_dir=None if no_cache else cache_dir)
+    click.echo(f">> Gravado: {out_json} ({total} registros)")
 
 @cli.command()
 @click.option("--json", "json_path", type=click.Path(exists=True, dir_okay=False, path_type=Path), default=Path("data/norms.json"))
 @click.option("--out", "out_dir", type=click.Path(file_okay=False, path_type=Path), default=Path("_site"))
 @click.option("--sqlite", "sqlite_path", type=click.Path(dir_okay=False, path_type=Path), default=Path("_site/bpc_normativos.sqlite"))
-def publish(json_path: Path, out_dir: Path, sqlite_path: Path):
-    """Gera o site estático em OUT a partir do JSON (sqlite reservado para uso futuro)."""
+@click.option("--full", is_flag=True, help="Ignora o manifesto de build e regrava todas as páginas.")
+@click.option("--jobs", "-j", type=int, default=1, show_default=True, help="Processos para renderizar as páginas de detalhe.")
+@click.option("--changes-dir", type=click.Path(file_okay=False, path_type=Path), default=Path(".cache/changes"), show_default=True,
+              help="Estado do feed de mudanças (último corpus publicado e deltas), fora do site.")
+@click.option("--no-changes", is_flag=True, help="Não gera OUT/changes/ (deltas, índice de versões e feed Atom).")
+@_metrics_options
+def publish(json_path: Path, out_dir: Path, sqlite_path: Path, full: bool, jobs: int, changes_dir: Path, no_changes: bool,
+            profile: bool, metrics_json: Path | None, cprofile: Path | None):
+    """Gera o site estático em OUT e o banco SQLite (FTS5) a partir do JSON (ou NDJSON)."""
     click.echo(">> Publicando site...")
     out_dir.mkdir(parents=True, exist_ok=True)
-    build_site(str(json_path), str(out_dir))
+    with _instrumented("publish", profile, metrics_json, cprofile):
+        stats = build_site(str(json_path), str(out_dir), full=full, jobs=jobs,
+                           changes_dir=None if no_changes else str(changes_dir))
+        click.echo(f">> Páginas: {stats['paginas']} · gravadas: {stats['gravadas']} · removidas: {stats['removidas']}")
+        if "mudancas" in stats:
+            ch = stats["mudancas"]
+            novo = ch["novo"]
+            click.echo(f">> Versão: {ch['versao']} · " + (
+                " · ".join(f"{k}: {v}" for k, v in novo.items()) if novo else "sem delta novo"))
+        click.echo(f">> Tamanhos por classe ({stats['tamanhos']['comprimidos']} arquivo(s) recomprimido(s)):")
+        click.echo(format_sizes(stats["tamanhos"]))
+        with metrics.stage("publish.sqlite"):
+            built = build_sqlite(str(json_path), str(sqlite_path), graph_json=str(out_dir / GRAPH_NAME))
+    if built:
+        click.echo(f">> SQLite: {sqlite_path}")
+    else:
+        click.echo(f">> SQLite inalterado: {sqlite_path}")
     click.echo(f">> Arquivos em: {out_dir}")
 
+@cli.command()
+@click.option("--schema", "schema_path", type=click.Path(exists=True, dir_okay=False, path_type=Path), default=Path("data/schema.json"))
+@click.option("--data", "data_path", type=click.Path(exists=True, dir_okay=False, path_type=Path), default=Path("data/norms.json"))
+@click.option("--changed-only", "manifest", type=click.Path(path_type=Path), default=None,
+              help="Checa schema/URLs só dos registros novos ou alterados desde o manifesto (.bpa-manifest.json ou o diretório do site).")
+@click.option("--strict", is_flag=True, help="Avisos (identificação ou tipo+número+ano duplicados, referência sem ato) também reprovam.")
+def validate(schema_path: Path, data_path: Path, manifest: Path | None, strict: bool):
+    """Valida o JSON (ou NDJSON, em streaming) contra o schema e as regras do corpus, listando todas as violações."""
+    try:
+        problems, total, checked = validate_file(schema_path, data_path, changed_only=manifest)
+    except ValueError as e:  # JSON ilegível (no NDJSON, com o nº da linha)
+        raise click.ClickException(f"{data_path}: {e}")
+    for v in problems:
+        click.echo(str(v), err=True)
+    erros = sum(1 for v in problems if v.level == "erro" or strict)
+    avisos = len(problems) - erros
+    click.echo(f">> Validados: {checked}/{total} registros · erros: {erros} · avisos: {avisos}")
+    if erros:
+        raise SystemExit(1)
+
+@cli.command()
+@click.option("--json", "json_path", type=click.Path(dir_okay=False, path_type=Path), default=Path("data/norms.json"))
+@click.option("--out", "out_dir", type=click.Path(file_okay=False, path_type=Path), default=Path("_site"))
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", type=int, default=8000, show_default=True)
+@click.option("--watch", "watch_files", is_flag=True,
+              help="Observa as planilhas, os patches e o JSON (no diretório do JSON) e refaz só as etapas afetadas.")
+@click.option("--debounce", type=float, default=0.3, show_default=True,
+              help="Segundos sem novas gravações antes de reconstruir.")
+@click.option("--cache-dir", type=click.Path(file_okay=False, path_type=Path), default=Path(".cache"), show_default=True)
+def serve(json_path: Path, out_dir: Path, host: str, port: int, watch_files: bool, debounce: float, cache_dir: Path):
+    """Serve o site de OUT localmente, com recarga automática das páginas após cada rebuild."""
+    serve_site(json_path, out_dir, host=host, port=port, watch_files=watch_files, debounce=debounce,
+               cache_dir=cache_dir, log=click.echo)
+
+@cli.command()
+@click.argument("arg", nargs=-1)
+@click.option("--json", "json_path", type=click.Path(exists=True, dir_okay=False, path_type=Path), default=Path("data/norms.json"))
+@click.option("--tipo", "tipos", multiple=True, help="Tipo do ato (repetível; qualquer um dos informados).")
+@click.option("--numero", default="", help="Trecho do número.")
+@click.option("--ano", default="")
+@click.option("--tema", default="", help="Trecho do tema.")
+@click.option("--origem", default="")
+@click.option("--situacao", default="", help="Vigência (ex.: Vigente, Revogada).")
+@click.option("--limit", "-n", type=int, default=20, show_default=True, help="Máximo de resultados por consulta (0 = todos).")
+@click.option("--format", "fmt", type=click.Choice(["table", "json"]), default="table", show_default=True)
+@click.option("--batch", type=click.File("r", encoding="utf-8"), default=None,
+              help="Arquivo (ou -) com uma consulta JSON por linha; resultados em JSON, uma linha por consulta.")
+@click.option("--cache-dir", type=click.Path(file_okay=False, path_type=Path), default=Path(".cache"), show_default=True,
+              help="Guarda o índice de busca, reaproveitado enquanto o corpus não mudar.")
+@click.option("--no-cache", is_flag=True, help="Não lê nem grava o índice em disco.")
+def search(arg: tuple[str, ...], json_path: Path, tipos: tuple[str, ...], numero: str, ano: str, tema: str, origem: str,
+           situacao: str, limit: int, fmt: str, batch, cache_dir: Path, no_cache: bool):
+    """Pesquisa o corpus com os filtros da página (ARG = palavras da identificação/ementa)."""
+    index = load_index(json_path, cache_dir=None if no_cache else cache_dir)
+    top = limit or None
+    if batch is not None:
+        for line in batch:
+            if not line.strip():
+                continue
+            d = json.loads(line)
+            q = Query.from_json(d)
+            click.echo(json.dumps({"consulta": d, "resultados": index.search(q, top)}, ensure_ascii=False))
+        return
+    q = Query(" ".join(arg), tipos, numero, ano, tema, origem, situacao)
+    results = index.search(q, top)
+    if fmt == "json":
+        click.echo(json.dumps(results, ensure_ascii=False, indent=2))
+    elif results:
+        click.echo(format_table(results))
+    else:
+        click.echo("Nenhum resultado.", err=True)
+
+@cli.command()
+@click.option("--json", "json_path", type=click.Path(exists=True, dir_okay=False, path_type=Path), default=Path("data/norms.json"))
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", type=int, default=8001, show_default=True)
+@click.option("--cache-dir", type=click.Path(file_okay=False, path_type=Path), default=Path(".cache"), show_default=True,
+              help="Reaproveita o índice de busca de bpa search.")
+def api(json_path: Path, host: str, port: int, cache_dir: Path):
+    """API JSON somente leitura do corpus: listagem filtrada e paginada, detalhe e relações, com ETag e gzip."""
+    serve_api(json_path, host=host, port=port, cache_dir=cache_dir, log=click.echo)
+
+@cli.command()
+@click.argument("src", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.argument("dest", type=click.Path(dir_okay=False, path_type=Path))
+def convert(src: Path, dest: Path):
+    """Converte o corpus SRC para o formato de DEST (.json = formato 2; .ndjson/.jsonl = NDJSON)."""
+    if src.resolve() == dest.resolve():
+        raise click.UsageError("SRC e DEST são o mesmo arquivo.")
+    total = corpus.dump(corpus.iter_load(src), dest)
+    click.echo(f">> Gravado: {dest} ({total} registros)")
+
+@cli.command()
+@click.argument("old", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.argument("new", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option("--format", "fmt", type=click.Choice(["summary", "json"]), default="summary", show_default=True)
+@click.option("--out", "out_path", type=click.Path(dir_okay=False, path_type=Path), default=None,
+              help="Grava o delta (JSON, formato de changes/<versão>.json) neste arquivo.")
+def diff(old: Path, new: Path, fmt: str, out_path: Path | None):
+    """Delta entre os corpora OLD e NEW (JSON ou NDJSON): atos adicionados, removidos e campos alterados, por slug."""
+    def records(p: Path) -> dict:
+        return {slug: n.to_json() for slug, (_, n) in page_items(corpus.load(p)).items()}
+
+    delta = diff_records(records(old), records(new))
+    text = json.dumps(delta, ensure_ascii=False, indent=2)
+    if out_path is not None:
+        out_path.write_text(text, encoding="utf-8")
+    if fmt == "json":
+        click.echo(text)
+        return
+    for r in delta["adicionados"]:
+        click.echo(f"+ {r['slug']}")
+    for slug in delta["removidos"]:
+        click.echo(f"- {slug}")
+    for a in delta["alterados"]:
+        click.echo(f"~ {a['slug']}: {', '.join(a['campos'])}")
+    click.echo(f">> {delta['anterior']} -> {delta['versao']} · "
+               + ("sem diferenças" if is_empty(delta) else " · ".join(f"{k}: {v}" for k, v in summary(delta).items())))
+
 if __name__ == "__main__":
     cli()
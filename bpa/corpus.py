@@ -0,0 +1,283 @@
+# bpa/corpus.py
+"""
+Leitura e gravação do data/norms.json.
+
+Formato 2 (gravado pelo ingest e pelo merge de patches):
+
+  {"formato":2,"normas":[
+  {"slug":...,"tipo":...,"raw_header":0,"raw_values":["",null,"*"]},
+  ...
+  ],"cabecalhos":[
+  {"colunas":["","ANO","DATA",...],"campos":[null,"ano","data",...]}
+  ]}
+
+Cada cabeçalho de planilha aparece uma vez em "cabecalhos"; o registro
+guarda só o índice (raw_header) e as células na ordem das colunas, sem as
+vazias do fim. null = a célula é igual ao campo canônico mapeado para a
+coluna ("campos", o mesmo mapeamento do ingest), então ementa, identificação
+etc. não são gravadas duas vezes. Campos de texto vazios são omitidos (salvo
+slug e identificação). Um registro por linha, sem indentação.
+
+Formato 1 (lista de registros com "raw" dict + "raw_columns") continua
+sendo lido.
+
+NDJSON (norms.ndjson / .jsonl): os mesmos registros, um por linha, e cada
+cabeçalho numa linha própria ({"cabecalho":k,"colunas":...,"campos":...})
+antes do primeiro registro que o usa. Lido em streaming e aberto para
+acréscimo: append() grava atos novos no fim sem regravar o arquivo.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, TextIO
+import io
+import json
+
+from bpa.model import Norm, shared_columns
+
+FORMAT = 2
+NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+HEADER_KEY = "cabecalho"
+
+_DUMP = {"ensure_ascii": False, "separators": (",", ":")}
+# gravados mesmo vazios (o validador distingue "vazio" de "ausente")
+_ALWAYS = frozenset({"slug", "identificacao"})
+
+
+class HeaderTable:
+    """Cabeçalhos distintos, na ordem em que aparecem: colunas -> (índice, campos)."""
+
+    def __init__(self):
+        self.index: dict[tuple[str, ...], tuple[int, tuple[str | None, ...]]] = {}
+        self.rows: list[dict[str, list]] = []
+
+    def add(self, columns: tuple[str, ...]) -> tuple[int, tuple[str | None, ...]]:
+        hit = self.index.get(columns)
+        if hit is None:
+            from bpa.extract.xlsx_ingest import map_columns  # o ingest importa este módulo
+
+            campos: list[str | None] = [None] * len(columns)
+            for field, j in map_columns(list(columns)).items():
+                campos[j] = field
+            hit = self.index[columns] = (len(self.rows), tuple(campos))
+            self.rows.append({"colunas": list(columns), "campos": campos})
+        return hit
+
+    def load(self, h: dict) -> None:
+        """Cabeçalho já gravado (campos como estão no arquivo)."""
+        cols, campos = header_entry(h)
+        self.index.setdefault(cols, (len(self.rows), campos))
+        self.rows.append({"colunas": list(cols), "campos": list(campos)})
+
+
+def is_ndjson(path: str | Path) -> bool:
+    return Path(path).suffix.lower() in NDJSON_SUFFIXES
+
+
+def encode(n: Norm, headers: HeaderTable) -> dict[str, Any]:
+    """Norm -> registro do formato 2."""
+    d = {k: v for k, v in n.to_json(raw=False).items() if v != "" or k in _ALWAYS}
+    if n.raw_columns is not None:
+        k, campos = headers.add(n.raw_columns)
+        values: list[str | None] = []
+        for v, f in zip(n.raw_values or (), campos):
+            values.append(None if v and f and v == getattr(n, f) else v)
+        while values and values[-1] == "":
+            values.pop()
+        d["raw_header"] = k
+        d["raw_values"] = values
+    return d
+
+
+def header_entry(h: Any) -> tuple[tuple[str, ...], tuple[str | None, ...]]:
+    """Um cabeçalho gravado -> (colunas, campos); malformado = sem colunas."""
+    if not isinstance(h, dict):
+        return (), ()
+    cols = shared_columns(str(c) for c in h.get("colunas") or [])
+    campos = list(h.get("campos") or [])[:len(cols)]
+    return cols, tuple(campos + [None] * (len(cols) - len(campos)))
+
+
+def read_headers(doc: dict) -> list[tuple[tuple[str, ...], tuple[str | None, ...]]]:
+    """Lê "cabecalhos" do formato 2 -> [(colunas, campos)]."""
+    return [header_entry(h) for h in doc.get("cabecalhos") or []]
+
+
+def iter_ndjson(lines: Iterable[str], headers: list,
+                on_header: Callable[[Any, int], None] | None = None) -> Iterator[Any]:
+    """
+    Registros crus de um NDJSON, na ordem. As linhas de cabeçalho não são
+    produzidas: vão para HEADERS (e para ON_HEADER(linha, índice)), antes
+    dos registros que as usam.
+    """
+    for no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            obj = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"linha {no}: JSON inválido ({e})") from None
+        if isinstance(obj, dict) and HEADER_KEY in obj:
+            if on_header is not None:
+                on_header(obj, len(headers))
+            headers.append(header_entry(obj))
+        else:
+            yield obj
+
+
+def decode_record(d: dict[str, Any], headers: list) -> Norm:
+    """Registro (formato 1 ou 2) -> Norm; raw_header inválido = sem metadados."""
+    n = Norm.from_json(d)
+    extra = n.extra
+    if extra is None or "raw_header" not in extra:
+        return n
+    k = extra.pop("raw_header")
+    values = extra.pop("raw_values", None) or []
+    if not extra:
+        n.extra = None
+    if isinstance(k, int) and 0 <= k < len(headers):
+        cols, campos = headers[k]
+        cells = [getattr(n, f) if v is None and f else "" if v is None else str(v)
+                 for v, f in zip(values, campos)]
+        n.raw_columns = cols
+        n.raw_values = tuple(cells + [""] * (len(cols) - len(cells)))
+    return n
+
+
+def decode(doc: Any) -> list[Norm]:
+    """Documento já carregado (lista do formato 1 ou objeto do formato 2) -> [Norm]."""
+    if isinstance(doc, dict):
+        headers = read_headers(doc)
+        return [decode_record(d, headers) for d in doc.get("normas") or [] if isinstance(d, dict)]
+    return [Norm.from_json(d) for d in doc or [] if isinstance(d, dict)]
+
+
+def records(doc: Any) -> Any:
+    """Lista de registros crus do documento (formato 1 ou 2)."""
+    return doc.get("normas") if isinstance(doc, dict) else doc
+
+
+def loads(text: str | bytes, ndjson: bool = False) -> list[Norm]:
+    if isinstance(text, bytes):
+        text = text.decode("utf-8")
+    if ndjson:
+        headers: list = []
+        return [decode_record(d, headers) for d in iter_ndjson(text.splitlines(), headers) if isinstance(d, dict)]
+    return decode(json.loads(text)) if text else []
+
+
+def iter_load(path: str | Path) -> Iterator[Norm]:
+    """Registros de PATH (formato pelo sufixo); NDJSON é lido linha a linha."""
+    p = Path(path)
+    if not p.exists():
+        return
+    if not is_ndjson(p):
+        yield from loads(p.read_text(encoding="utf-8"))
+        return
+    headers: list = []
+    with open(p, encoding="utf-8") as f:
+        for d in iter_ndjson(f, headers):
+            if isinstance(d, dict):
+                yield decode_record(d, headers)
+
+
+def load(path: str | Path) -> list[Norm]:
+    """norms.json / norms.ndjson -> [Norm]; arquivo ausente = corpus vazio."""
+    return list(iter_load(path))
+
+
+class Writer:
+    """Gravação registro a registro; os cabeçalhos vão no fim, quando todos são conhecidos."""
+
+    def __init__(self, f: TextIO):
+        self.f = f
+        self.headers = HeaderTable()
+        self.count = 0
+        f.write('{"formato":%d,"normas":[' % FORMAT)
+
+    def write(self, n: Norm) -> None:
+        self.f.write("\n" if self.count == 0 else ",\n")
+        self.f.write(json.dumps(encode(n, self.headers), **_DUMP))
+        self.count += 1
+
+    def close(self) -> None:
+        self.f.write('\n],"cabecalhos":[')
+        self.f.write(",".join("\n" + json.dumps(h, **_DUMP) for h in self.headers.rows))
+        self.f.write("\n]}\n")
+
+
+class NdjsonWriter:
+    """Um registro por linha; cada cabeçalho novo vai numa linha logo antes do primeiro registro que o usa."""
+
+    def __init__(self, f: TextIO, headers: HeaderTable | None = None):
+        self.f = f
+        self.headers = headers if headers is not None else HeaderTable()
+        self.count = 0
+
+    def write(self, n: Norm) -> None:
+        known = len(self.headers.rows)
+        d = encode(n, self.headers)
+        for k in range(known, len(self.headers.rows)):
+            self.f.write(json.dumps({HEADER_KEY: k, **self.headers.rows[k]}, **_DUMP) + "\n")
+        self.f.write(json.dumps(d, **_DUMP) + "\n")
+        self.count += 1
+
+    def close(self) -> None:
+        pass
+
+
+def writer(f: TextIO, path: str | Path) -> Writer | NdjsonWriter:
+    """Writer do formato indicado pelo sufixo de PATH."""
+    return NdjsonWriter(f) if is_ndjson(path) else Writer(f)
+
+
+def dumps(norms: Iterable[Norm], ndjson: bool = False) -> str:
+    buf = io.StringIO()
+    w = NdjsonWriter(buf) if ndjson else Writer(buf)
+    for n in norms:
+        w.write(n)
+    w.close()
+    return buf.getvalue()
+
+
+def dump(norms: Iterable[Norm], path: str | Path) -> int:
+    """Grava o corpus em PATH (formato pelo sufixo, via arquivo temporário); retorna o nº de registros."""
+    out = Path(path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(out.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        w = writer(f, out)
+        for n in norms:
+            w.write(n)
+        w.close()
+    tmp.replace(out)
+    return w.count
+
+
+def append(norms: Iterable[Norm], path: str | Path) -> int:
+    """
+    Acrescenta NORMS ao fim de um NDJSON sem regravar os registros
+    existentes; só as linhas de cabeçalho são lidas (para reaproveitar os
+    índices). Retorna o nº de registros gravados.
+    """
+    p = Path(path)
+    if not is_ndjson(p):
+        raise ValueError(f"append só vale para NDJSON ({', '.join(NDJSON_SUFFIXES)}): {p}")
+    table = HeaderTable()
+    newline = False
+    if p.exists():
+        marker = '{"' + HEADER_KEY + '"'
+        last = ""
+        with open(p, encoding="utf-8") as f:
+            for last in f:
+                if last.startswith(marker):
+                    table.load(json.loads(last))
+        newline = bool(last) and not last.endswith("\n")
+    p.parent.mkdir(parents=True, exist_ok=True)
+    with open(p, "a", encoding="utf-8") as f:
+        if newline:
+            f.write("\n")
+        w = NdjsonWriter(f, table)
+        for n in norms:
+            w.write(n)
+    return w.count
@@ -1,9 +1,12 @@
 ﻿from __future__ import annotations
 from pathlib import Path
-import json, re, unicodedata
-from typing import List, Dict, Any, Set
+import hashlib, itertools, json, os, re, time, unicodedata
+from typing import List, Dict, Any, Set, Iterable, Iterator, Sequence
 import pandas as pd
 
+from bpa import corpus, metrics
+from bpa.model import Norm, shared_columns
+
 # ----------------- utilitários de normalização -----------------
 
 def _strip_accents(s: str) -> str:
@@ -17,6 +20,12 @@ def _norm_name(s: str) -> str:
 def _norm_val(s: Any) -> str:
     return ("" if s is None else str(s)).strip()
 
+def _cell_str(v: Any) -> str:
+    # mesma conversão do pandas (read_excel dtype=str) para células openpyxl
+    if v is None: return ""
+    if isinstance(v, float) and v.is_integer(): return str(int(v))
+    return str(v)
+
 def _slugify(s: str) -> str:
     s = _strip_accents(s).lower()
     s = re.sub(r"[^a-z0-9\-]+", "-", s)
@@ -34,10 +43,12 @@ def _score_header_row(cells: List[str]) -> int:
     toks = {_norm_name(c) for c in cells if _norm_name(c)}
     return sum(1 for t in EXPECTED_TOKENS if t in toks)
 
-def _find_header_index(df_raw: pd.DataFrame) -> int:
+HEADER_SCAN_ROWS = 10
+
+def _find_header_index(rows: Sequence[Sequence[Any]]) -> int:
     best_idx,best_score = 0,-1
-    for i in range(min(10,len(df_raw))):
-        row = [str(x) for x in df_raw.iloc[i].tolist()]
+    for i in range(min(HEADER_SCAN_ROWS,len(rows))):
+        row = [str(x) for x in rows[i]]
         sc = _score_header_row(row)
         if sc>best_score:
             best_idx,best_score = i,sc
@@ -66,7 +77,7 @@ for k,variants in COLS_VARIANTS.items():
     for v in variants:
         COLS_INDEX[_norm_name(v)] = k
 
-def _map_columns(header_row: List[str]) -> Dict[str,int]:
+def map_columns(header_row: List[str]) -> Dict[str,int]:
     mapping: Dict[str,int] = {}
     for idx,col in enumerate(header_row):
         norm = _norm_name(col)
@@ -76,36 +87,40 @@ def _map_columns(header_row: List[str]) -> Dict[str,int]:
 
 # ----------------- inferências a partir de IDENTIFICAÇÃO -----------------
 
-def _infer_tipo_from_ident(ident: str) -> str:
-    s = _strip_accents(ident).lower()
-    pairs = [
-        ("portaria interministerial","Portaria Interministerial"),
-        ("portaria conjunta","Portaria Conjunta"),
-        ("portaria inss","Portaria INSS"),
-        ("portaria mds","Portaria MDS"),
-        ("instrucao normativa","Instrução Normativa"),
-        ("instrucao operacional","Instrução Operacional"),
-        ("memorando circular","Memorando Circular"),
-        ("orientacao interna","Orientação Interna"),
-        ("medida provisoria","Medida Provisória"),
-        ("resolucao","Resolução"),
-        ("decreto","Decreto"),
-        ("lei","Lei"),
-        ("portaria","Portaria"),
-    ]
-    for k,v in pairs:
-        if k in s:
-            return v
-    return ""
-
-def _infer_numero_from_ident(ident: str) -> str:
-    m = re.search(r"n[ºo]\s*([0-9\.\-\/]+)", ident, flags=re.I)
+TIPO_PAIRS = [
+    ("portaria interministerial","Portaria Interministerial"),
+    ("portaria conjunta","Portaria Conjunta"),
+    ("portaria inss","Portaria INSS"),
+    ("portaria mds","Portaria MDS"),
+    ("instrucao normativa","Instrução Normativa"),
+    ("instrucao operacional","Instrução Operacional"),
+    ("memorando circular","Memorando Circular"),
+    ("orientacao interna","Orientação Interna"),
+    ("medida provisoria","Medida Provisória"),
+    ("resolucao","Resolução"),
+    ("decreto","Decreto"),
+    ("lei","Lei"),
+    ("portaria","Portaria"),
+]
+# uma única alternância de lookaheads ancorada no início: o primeiro ramo que
+# casar (na ordem de prioridade acima) define o grupo -> mesmo resultado do laço
+_TIPO_RE = re.compile("^(?:" + "|".join(f"(?=.*?({re.escape(k)}))" for k,_ in TIPO_PAIRS) + ")", re.S)
+_NUMERO_RE = re.compile(r"n[ºo]\s*([0-9\.\-\/]+)", re.I)
+_NUMERO_ALT_RE = re.compile(r"\b(\d{1,6}[\.\/]\d{4})\b")
+_ANO_RE = re.compile(r"(\d{4})$")
+
+def infer_tipo_from_ident(ident: str) -> str:
+    m = _TIPO_RE.match(_strip_accents(ident).lower())
+    return TIPO_PAIRS[m.lastindex-1][1] if m and m.lastindex else ""
+
+def infer_numero_from_ident(ident: str) -> str:
+    m = _NUMERO_RE.search(ident)
     if m: return m.group(1)
-    m2 = re.search(r"\b(\d{1,6}[\.\/]\d{4})\b", ident)
+    m2 = _NUMERO_ALT_RE.search(ident)
     return m2.group(1) if m2 else ""
 
-def _year_from_numero(numero: str) -> str:
-    m = re.search(r"(\d{4})$", numero or "")
+def year_from_numero(numero: str) -> str:
+    m = _ANO_RE.search(numero or "")
     return m.group(1) if m else ""
 
 def _map_vigencia(v: str) -> str:
@@ -146,68 +161,350 @@ def _unique_slug(base_slug: str, tipo: str, numero: str, ano: str, taken: Set[st
             return c
         i += 1
 
-# ----------------- principal -----------------
+# ----------------- canonicalização em lote (por coluna) -----------------
 
-def read_xlsx_to_json(xlsx_path: str | Path):
-    df_raw = pd.read_excel(xlsx_path, header=None, dtype=str, engine="openpyxl").fillna("")
-    header_idx = _find_header_index(df_raw)
-    header = [str(x) for x in df_raw.iloc[header_idx].tolist()]
-    col_map = _map_columns(header)
-    df = df_raw.iloc[header_idx+1:].reset_index(drop=True)
+BATCH_ROWS = 5000
+
+def _fold_series(s: pd.Series) -> pd.Series:
+    return s.str.normalize("NFKD").str.encode("ascii","ignore").str.decode("ascii").str.lower()
+
+def _fill(s: pd.Series, fallback: pd.Series) -> pd.Series:
+    return s.where(s != "", fallback)
+
+def canonical_columns(rows: List[List[str]], col_map: Dict[str,int]) -> Dict[str,List[str]]:
+    """
+    Resolve os campos canônicos de um lote de linhas coluna a coluna: cada
+    coluna é dobrada (acentos) uma vez, tipo sai de uma única alternância,
+    número/ano de str.extract e a vigência de uma tabela montada uma vez.
+    """
+    df = pd.DataFrame(rows, dtype=object)
+    empty = pd.Series([""]*len(rows), index=df.index, dtype=object)
+    cols = {k: df[i].astype(str).str.strip() for k,i in col_map.items()}
+    def col(key: str) -> pd.Series:
+        return cols.get(key, empty)
+
+    ident = col("identificacao")
+    hits = _fold_series(ident).str.extract(_TIPO_RE)
+    labels = pd.Series([v for _,v in TIPO_PAIRS], dtype=object)
+    tipo_inf = hits.notna().to_numpy().argmax(axis=1)
+    tipo_inf = pd.Series(labels.to_numpy()[tipo_inf], index=df.index).where(hits.notna().any(axis=1), "")
+    tipo = _fill(col("tipo"), tipo_inf)
+
+    num_inf = ident.str.extract(_NUMERO_RE, expand=False).fillna(
+        ident.str.extract(_NUMERO_ALT_RE, expand=False)).fillna("")
+    numero = _fill(col("numero"), num_inf)
+    ano = _fill(col("ano"), numero.str.extract(_ANO_RE, expand=False).fillna(""))
+
+    vig = col("vigencia")
+    vig = vig.map({v: _map_vigencia(v) for v in vig.unique()})
+
+    out = {k: v.tolist() for k,v in cols.items()}
+    out.update(identificacao=ident.tolist(), tipo=tipo.tolist(), numero=numero.tolist(),
+               ano=ano.tolist(), vigencia=vig.tolist())
+    return out
+
+# ----------------- montagem dos registros -----------------
+
+CANON_FIELDS = ["tipo","numero","ano","data","vigencia","identificacao","ementa","tema","origem",
+                "fonte_planalto","fonte_dou","texto_original","texto_compilado"]
+
+def _build_records(rows: List[List[str]], raw_cols: List[str], col_map: Dict[str,int],
+                   planilha: str, aba: str) -> List[Norm]:
+    """Registros sem slug (slug = ""); o slug é resolvido depois por _assign_slug."""
+    rows = [r for r in rows if any(_norm_val(x) for x in r)]
+    if not rows:
+        return []
+    cols = canonical_columns(rows, col_map)
+    blank = [""]*len(rows)
+    fields = [(f, cols.get(f, blank)) for f in CANON_FIELDS]
+    width = range(len(raw_cols))
+    columns = shared_columns(raw_cols)
 
     records = []
-    used_slugs: Set[str] = set()
+    for j,row_vals in enumerate(rows):
+        rec = Norm(**{f: values[j] for f,values in fields}, planilha=planilha, aba=aba,
+                   raw_columns=columns, raw_values=tuple(_norm_val(row_vals[i]) for i in width))
+        records.append(rec)
+    return records
+
+def _assign_slug(rec: Norm, taken: Set[str]) -> Norm:
+    tipo, numero, ano, ident = rec.tipo, rec.numero, rec.ano, rec.identificacao
+    base = ident or f"{tipo} {numero or ''} {ano or ''}".strip()
+    rec.slug = _unique_slug(base, tipo, numero, ano, taken)
+    return rec
+
+# ----------------- leitura de uma aba -----------------
+
+# pontuação mínima de cabeçalho para aceitar uma aba em --all-sheets
+MIN_HEADER_SCORE = 2
 
-    for _,row in df.iterrows():
-        row_vals = [str(x) for x in row.tolist()]
-        if not any(_norm_val(x) for x in row_vals):
-            continue
+def _sheet_rows_pandas(xlsx_path: str | Path, sheet: str | None):
+    xl = pd.ExcelFile(xlsx_path, engine="openpyxl")
+    name = sheet if sheet is not None else xl.sheet_names[0]
+    df_raw = xl.parse(name, header=None, dtype=str).fillna("")
+    return name, [[str(x) for x in r] for r in df_raw.itertuples(index=False, name=None)]
 
-        raw_dict = {str(header[i]): _norm_val(row_vals[i]) for i in range(len(header))}
+def _iter_sheet_records(xlsx_path: str | Path, sheet: str | None = None, engine: str = "stream",
+                        min_score: int = 0) -> Iterator[Norm]:
+    """
+    Registros (sem slug) de uma aba; sheet=None -> primeira aba. No engine
+    "stream" percorre a aba com openpyxl read_only em lotes de BATCH_ROWS;
+    no "pandas" carrega a aba inteira num DataFrame.
+    """
+    planilha = Path(xlsx_path).name
+    t0 = time.perf_counter()
+    if engine == "pandas":
+        aba, all_rows = _sheet_rows_pandas(xlsx_path, sheet)
+        if not all_rows:
+            return
+        loaded = time.perf_counter()
+        header_idx = _find_header_index(all_rows[:HEADER_SCAN_ROWS])
+        if _score_header_row(all_rows[header_idx]) < min_score:
+            return
+        header = all_rows[header_idx]
         raw_cols = [str(h) for h in header]
+        metrics.add("ingest.cabecalho", time.perf_counter() - loaded, 1)
+        t1 = time.perf_counter()
+        recs = _build_records(all_rows[header_idx+1:], raw_cols, map_columns(header), planilha, aba)
+        # aba inteira carregada pelo pandas conta como laço de linhas
+        metrics.add("ingest.linhas", (loaded - t0) + (time.perf_counter() - t1), len(recs))
+        yield from recs
+        return
+
+    from openpyxl import load_workbook
+
+    wb = load_workbook(xlsx_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb[sheet] if sheet is not None else wb.worksheets[0]
+        aba = ws.title
+        rows = ws.iter_rows(values_only=True)
+        head = []
+        for row in rows:
+            head.append([_cell_str(v) for v in row])
+            if len(head) >= HEADER_SCAN_ROWS:
+                break
+        if not head:
+            return
+        header_idx = _find_header_index(head)
+        header = head[header_idx]
+        if _score_header_row(header) < min_score:
+            return
+        raw_cols = [str(h) for h in header]
+        col_map = map_columns(header)
+        width = len(header)
+        metrics.add("ingest.cabecalho", time.perf_counter() - t0, 1)
+
+        def pending() -> Iterator[List[str]]:
+            yield from head[header_idx+1:]
+            for row in rows:
+                yield [_cell_str(v) for v in row]
+        # tempo da etapa "linhas" = leitura + canonicalização, sem o tempo do consumidor
+        t0 = time.perf_counter()
+        batch: List[List[str]] = []
+        for row_vals in pending():
+            if len(row_vals) < width:
+                row_vals = row_vals + [""] * (width - len(row_vals))
+            batch.append(row_vals)
+            if len(batch) >= BATCH_ROWS:
+                recs = _build_records(batch, raw_cols, col_map, planilha, aba)
+                metrics.add("ingest.linhas", time.perf_counter() - t0, len(recs))
+                yield from recs
+                batch = []
+                t0 = time.perf_counter()
+        recs = _build_records(batch, raw_cols, col_map, planilha, aba)
+        metrics.add("ingest.linhas", time.perf_counter() - t0, len(recs))
+        yield from recs
+    finally:
+        wb.close()
+
+def _sheet_names(xlsx_path: str | Path) -> List[str]:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(xlsx_path, read_only=True, keep_links=False)
+    try:
+        return [ws.title for ws in wb.worksheets]
+    finally:
+        wb.close()
+
+def _read_job(job: tuple) -> tuple[List[Norm], Dict[str,dict]]:
+    """
+    Unidade de trabalho do pool: (planilha, aba, engine, min_score). Devolve
+    também as métricas das etapas medidas no worker, somadas às do processo
+    principal.
+    """
+    xlsx_path, sheet, engine, min_score = job
+    m = metrics.start("worker")
+    try:
+        return list(_iter_sheet_records(xlsx_path, sheet, engine, min_score)), m.stages
+    finally:
+        metrics.stop()
 
-        def get_can(key: str) -> str:
-            return _norm_val(row_vals[col_map[key]]) if key in col_map else ""
-
-        ident = get_can("identificacao")
-        tipo = get_can("tipo") or _infer_tipo_from_ident(ident)
-        numero = get_can("numero") or _infer_numero_from_ident(ident)
-        ano = get_can("ano") or _year_from_numero(numero)
-        data = get_can("data")
-        ementa = get_can("ementa")
-        tema = get_can("tema")
-        origem = get_can("origem")
-        vigencia = _map_vigencia(get_can("vigencia"))
-
-        fonte_planalto = get_can("fonte_planalto")
-        fonte_dou = get_can("fonte_dou")
-        texto_original = get_can("texto_original")
-        texto_compilado = get_can("texto_compilado")
-
-        base = ident or f"{tipo} {numero or ''} {ano or ''}".strip()
-        slug = _unique_slug(base, tipo, numero, ano, used_slugs)
-
-        records.append({
-            "slug": slug,
-            "tipo": tipo,
-            "numero": numero,
-            "ano": ano,
-            "data": data,
-            "vigencia": vigencia,
-            "identificacao": ident,
-            "ementa": ementa,
-            "tema": tema,
-            "origem": origem,
-            "fonte_planalto": fonte_planalto,
-            "fonte_dou": fonte_dou,
-            "texto_original": texto_original,
-            "texto_compilado": texto_compilado,
-            "raw": raw_dict,
-            "raw_columns": raw_cols,
-        })
-    return records
+# ----------------- principal -----------------
 
-def write_norms_json(xlsx_path: str | Path, out_json: str | Path) -> None:
-    data = read_xlsx_to_json(xlsx_path)
-    Path(out_json).parent.mkdir(parents=True, exist_ok=True)
-    Path(out_json).write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+def read_xlsx_to_json(xlsx_path: str | Path):
+    """Lê a planilha inteira via pandas e devolve a lista de registros (dicts do norms.json)."""
+    taken: Set[str] = set()
+    return [_assign_slug(r, taken).to_json() for r in _iter_sheet_records(xlsx_path, engine="pandas")]
+
+def iter_xlsx_records(xlsx_path: str | Path, sheet: str | None = None,
+                      taken: Set[str] | None = None) -> Iterator[Norm]:
+    """
+    Modo streaming: percorre a aba com openpyxl read_only e produz os
+    registros normalizados um a um, sem montar DataFrame nem lista.
+    """
+    taken = set() if taken is None else taken
+    for rec in _iter_sheet_records(xlsx_path, sheet):
+        yield _assign_slug(rec, taken)
+
+def expand_inputs(inputs: Iterable[str | Path]) -> List[Path]:
+    """Planilhas e/ou diretórios (-> *.xlsx do diretório, em ordem)."""
+    out: List[Path] = []
+    for p in map(Path, inputs):
+        if p.is_dir():
+            out.extend(sorted(x for x in p.glob("*.xlsx") if not x.name.startswith("~$")))
+        else:
+            out.append(p)
+    return out
+
+# ----------------- cache de ingest -----------------
+
+CACHE_SUBDIR = "ingest"
+
+def _file_sha256(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+def _cache_key(xlsx_path: Path, all_sheets: bool) -> str:
+    """Conteúdo da planilha + tabelas de cabeçalho + versão deste código."""
+    key = {
+        "xlsx": _file_sha256(xlsx_path),
+        "planilha": xlsx_path.name,
+        "all_sheets": all_sheets,
+        "cols": COLS_VARIANTS,
+        "tokens": sorted(EXPECTED_TOKENS),
+        "code": _file_sha256(Path(__file__)),
+        "formato": corpus.FORMAT,
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+def _cache_read(path: Path) -> Iterator[Norm]:
+    yield from corpus.load(path)
+
+def _cache_through(records: Iterable[Norm], path: Path) -> Iterator[Norm]:
+    """Repassa os registros gravando-os (formato de bpa.corpus) na entrada de cache."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        w = corpus.Writer(f)
+        for rec in records:
+            w.write(rec)
+            yield rec
+        w.close()
+    tmp.replace(path)
+
+# ----------------- corpus -----------------
+
+def iter_corpus_records(inputs: Iterable[str | Path], engine: str = "stream", jobs: int | None = None,
+                        all_sheets: bool = False, cache_dir: str | Path | None = None) -> Iterator[Norm]:
+    """
+    Corpus único a partir de várias planilhas/abas. Cada (planilha, aba) é
+    lida por um worker do pool; os resultados são consumidos na ordem das
+    entradas e os slugs resolvidos globalmente via _unique_slug. Um ato
+    (tipo+número+ano normalizados) já lido de outra planilha é descartado:
+    vale a primeira planilha; repetições dentro da mesma planilha (o ato em
+    cada tema) ficam. Com cache_dir, planilhas já vistas (mesmo conteúdo e
+    mesma versão do parser) vêm do cache sem abrir o openpyxl.
+    """
+    paths = expand_inputs(inputs)
+    min_score = MIN_HEADER_SCORE if all_sheets else 0
+    cache = Path(cache_dir) / CACHE_SUBDIR if cache_dir is not None else None
+
+    plan = []   # (planilha, entrada de cache, aba(s) a ler; None = acerto no cache)
+    for p in paths:
+        entry = cache / (_cache_key(p, all_sheets) + ".json") if cache is not None else None
+        if entry is not None and entry.exists():
+            plan.append((p, entry, None))
+        else:
+            plan.append((p, entry, _sheet_names(p) if all_sheets else [None]))
+    work = [(str(p), s, engine, min_score) for p, _, sheets in plan for s in (sheets or [])]
+    taken: Set[str] = set()
+
+    def sources(results: Iterator[Iterable[Norm]]) -> Iterator[Iterable[Norm]]:
+        for p, entry, sheets in plan:
+            if sheets is None:
+                yield _cache_read(entry)
+                continue
+            recs = itertools.chain.from_iterable(next(results) for _ in sheets)
+            yield _cache_through(recs, entry) if entry is not None else recs
+
+    metrics.add("ingest.cache", 0.0, sum(1 for *_, sheets in plan if sheets is None))
+
+    from bpa.publish.graph import tna_keys  # o grafo importa este módulo
+    owner: Dict[str, str | None] = {}   # chave tipo|número|ano -> planilha que a trouxe primeiro
+
+    def deduped(recs: Iterable[Norm]) -> Iterator[Norm]:
+        dropped = 0
+        try:
+            for rec in recs:
+                keys = tna_keys(rec.tipo, rec.numero, rec.ano)
+                if keys and owner.setdefault(keys[0], rec.planilha) != rec.planilha:
+                    dropped += 1
+                    continue
+                yield rec
+        finally:
+            metrics.add("ingest.duplicados", 0.0, dropped)
+
+    def slugged(recs: Iterable[Norm]) -> Iterator[Norm]:
+        if not metrics.enabled():
+            for rec in recs:
+                yield _assign_slug(rec, taken)
+            return
+        spent, n = 0.0, 0
+        try:
+            for rec in recs:
+                t0 = time.perf_counter()
+                _assign_slug(rec, taken)
+                spent += time.perf_counter() - t0
+                n += 1
+                yield rec
+        finally:
+            metrics.add("ingest.slugs", spent, n)
+
+    if len(work) <= 1 or jobs == 1:
+        results = (_iter_sheet_records(*job) for job in work)
+        for recs in sources(results):
+            yield from slugged(deduped(recs))
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    def unpack(done: Iterator[tuple]) -> Iterator[List[Norm]]:
+        for recs, stages in done:
+            metrics.merge(stages)
+            yield recs
+
+    with ProcessPoolExecutor(max_workers=min(jobs or os.cpu_count() or 1, len(work))) as pool:
+        for recs in sources(unpack(pool.map(_read_job, work))):
+            yield from slugged(deduped(recs))
+
+def _write_corpus(records: Iterable[Norm], out_json: Path) -> int:
+    """Grava registro a registro no formato de bpa.corpus indicado pelo sufixo (.json ou .ndjson)."""
+    tmp = out_json.with_name(out_json.name + ".tmp")
+    spent = 0.0  # só serialização/escrita, sem o tempo de produzir os registros
+    with open(tmp, "w", encoding="utf-8") as f:
+        w = corpus.writer(f, out_json)
+        for rec in records:
+            t0 = time.perf_counter()
+            w.write(rec)
+            spent += time.perf_counter() - t0
+        w.close()
+    tmp.replace(out_json)
+    metrics.add("ingest.gravacao", spent, w.count)
+    return w.count
+
+def write_norms_json(xlsx_path: str | Path | Sequence[str | Path], out_json: str | Path, engine: str = "stream",
+                     jobs: int | None = None, all_sheets: bool = False, cache_dir: str | Path | None = None) -> int:
+    inputs = [xlsx_path] if isinstance(xlsx_path, (str, Path)) else list(xlsx_path)
+    out = Path(out_json)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    return _write_corpus(iter_corpus_records(inputs, engine, jobs, all_sheets, cache_dir), out)
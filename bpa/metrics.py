@@ -0,0 +1,142 @@
+# bpa/metrics.py
+"""
+Métricas por etapa do ingest/publish (tempo de parede, pico de RSS, itens),
+ativadas por --profile / --metrics-json. Sem sessão ativa, add()/stage()
+não fazem nada, então a instrumentação pode ficar no caminho quente.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator
+import json
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb() -> float:
+    """Pico de RSS do processo e dos filhos já encerrados (workers do pool)."""
+    if resource is None:
+        return 0.0
+    # ru_maxrss: KiB no Linux, bytes no macOS
+    scale = 2**20 if sys.platform == "darwin" else 2**10
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    kids = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(own, kids) / scale, 1)
+
+
+class Metrics:
+    """Acumulador de etapas: nome -> segundos, itens, chamadas, pico de RSS ao fim."""
+
+    def __init__(self, command: str):
+        self.command = command
+        self.started = datetime.now(timezone.utc)
+        self._t0 = time.perf_counter()
+        self.stages: dict[str, dict] = {}
+
+    def add(self, name: str, seconds: float, items: int = 0, calls: int = 1) -> None:
+        s = self.stages.setdefault(name, {"segundos": 0.0, "itens": 0, "chamadas": 0, "rss_pico_mb": 0.0})
+        s["segundos"] += seconds
+        s["itens"] += items
+        s["chamadas"] += calls
+        s["rss_pico_mb"] = max(s["rss_pico_mb"], peak_rss_mb())
+
+    def merge(self, stages: dict[str, dict]) -> None:
+        for name, s in stages.items():
+            self.add(name, s["segundos"], s["itens"], s["chamadas"])
+
+    def report(self) -> dict:
+        return {
+            "comando": self.command,
+            "inicio": self.started.isoformat(timespec="seconds"),
+            "segundos": round(time.perf_counter() - self._t0, 4),
+            "rss_pico_mb": peak_rss_mb(),
+            "etapas": [{"etapa": k, **v, "segundos": round(v["segundos"], 4)} for k, v in self.stages.items()],
+        }
+
+    def table(self) -> str:
+        r = self.report()
+        lines = [f"{'etapa':<24} {'segundos':>10} {'itens':>9} {'chamadas':>9} {'RSS (MB)':>9}"]
+        for s in r["etapas"]:
+            lines.append(f"{s['etapa']:<24} {s['segundos']:>10.3f} {s['itens']:>9} {s['chamadas']:>9} {s['rss_pico_mb']:>9.1f}")
+        lines.append(f"{'total':<24} {r['segundos']:>10.3f} {'':>9} {'':>9} {r['rss_pico_mb']:>9.1f}")
+        return "\n".join(lines)
+
+
+_ACTIVE: Metrics | None = None
+
+
+def start(command: str) -> Metrics:
+    global _ACTIVE
+    _ACTIVE = Metrics(command)
+    return _ACTIVE
+
+
+def stop() -> Metrics | None:
+    global _ACTIVE
+    m, _ACTIVE = _ACTIVE, None
+    return m
+
+
+def enabled() -> bool:
+    return _ACTIVE is not None
+
+
+def add(name: str, seconds: float, items: int = 0, calls: int = 1) -> None:
+    if _ACTIVE is not None:
+        _ACTIVE.add(name, seconds, items, calls)
+
+
+def merge(stages: dict[str, dict]) -> None:
+    if _ACTIVE is not None and stages:
+        _ACTIVE.merge(stages)
+
+
+@contextmanager
+def stage(name: str, items: int = 0) -> Iterator[dict]:
+    """
+    Mede o bloco como uma chamada da etapa NAME. O dict produzido aceita
+    "itens" para contagens só conhecidas ao fim do bloco.
+    """
+    if _ACTIVE is None:
+        yield {}
+        return
+    box = {"itens": items}
+    t0 = time.perf_counter()
+    try:
+        yield box
+    finally:
+        _ACTIVE.add(name, time.perf_counter() - t0, box["itens"])
+
+
+@contextmanager
+def session(command: str, metrics_json: Path | None = None, cprofile: Path | None = None) -> Iterator[Metrics]:
+    """
+    Sessão de métricas de um comando da CLI: grava METRICS_JSON ao fim e,
+    com CPROFILE, o dump do cProfile (pstats) do corpo do comando.
+    """
+    m = start(command)
+    prof = None
+    if cprofile is not None:
+        import cProfile
+
+        prof = cProfile.Profile()
+        prof.enable()
+    try:
+        yield m
+    finally:
+        if prof is not None:
+            prof.disable()
+            Path(cprofile).parent.mkdir(parents=True, exist_ok=True)
+            prof.dump_stats(str(cprofile))
+        stop()
+        if metrics_json is not None:
+            p = Path(metrics_json)
+            p.parent.mkdir(parents=True, exist_ok=True)
+            p.write_text(json.dumps(m.report(), ensure_ascii=False, indent=2), encoding="utf-8")
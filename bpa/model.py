@@ -0,0 +1,214 @@
+# bpa/model.py
+"""
+Norm: o registro de um ato, único formato em memória do ingest, do merge de
+patches e do publish. Campos fixos em __slots__, valores repetidos (tipo,
+vigência, tema, origem, planilha/aba) internados e referências já separadas
+em tuplas; nomes alternativos de planilhas antigas e de patches são
+resolvidos uma única vez, em from_json(). Os metadados da planilha ficam
+posicionais: raw_columns (tupla compartilhada pelos registros da aba) e
+raw_values (uma célula por coluna).
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Iterable
+import sys
+
+# campos de texto, na ordem do norms.json
+TEXT_FIELDS = ("tipo", "numero", "ano", "data", "vigencia", "identificacao", "ementa", "tema", "origem",
+               "fonte_planalto", "fonte_dou", "texto_original", "texto_compilado")
+REF_FIELDS = ("altera", "alterado_por", "relacionados")
+# nome alternativo -> campo (Issue Forms, spreadsheet.py, ci_fallback_ingest.py, planilhas antigas);
+# em from_json o campo canônico, se preenchido, tem precedência; entre apelidos vale esta ordem
+ALIASES = {
+    "situacao": "vigencia",
+    "dou_url": "fonte_dou",
+    "link_dou": "fonte_dou",
+    "planalto_url": "fonte_planalto",
+    "link_planalto": "fonte_planalto",
+    "subtema": "subtemas",
+    "altera_ids": "altera",
+    "alteracoes": "altera",
+    "alterado_por_ids": "alterado_por",
+    "legislacao_correlata": "relacionados",
+}
+# vocabulário pequeno e repetido em milhares de registros
+_INTERNED = frozenset({"tipo", "vigencia", "tema", "origem", "planilha", "aba"})
+# cabeçalhos compartilhados entre os registros da mesma aba; limitado porque
+# vive o processo todo (API, serve): cheio, recomeça (só se perde o compartilhamento)
+_COLUMNS: dict[tuple[str, ...], tuple[str, ...]] = {}
+_COLUMNS_MAX = 1024
+
+
+def split_refs(val: Any) -> tuple[str, ...]:
+    """'a; b; c' (ou lista) -> ('a', 'b', 'c')."""
+    if not val:
+        return ()
+    items = val if isinstance(val, (list, tuple)) else str(val).split(";")
+    return tuple(s for s in (str(x).strip() for x in items) if s)
+
+
+def _text(v: Any) -> str:
+    if isinstance(v, str):
+        return v
+    if isinstance(v, (list, tuple)):  # listas dos formulários de Issue (subtemas etc.)
+        return "; ".join(split_refs(v))
+    return "" if v is None else str(v)
+
+
+@dataclass(slots=True)
+class Norm:
+    slug: str = ""
+    tipo: str = ""
+    numero: str = ""
+    ano: str = ""
+    data: str = ""
+    vigencia: str = ""
+    identificacao: str = ""
+    ementa: str = ""
+    tema: str = ""
+    origem: str = ""
+    fonte_planalto: str = ""
+    fonte_dou: str = ""
+    texto_original: str = ""
+    texto_compilado: str = ""
+    subtemas: str = ""
+    altera: tuple[str, ...] = ()
+    alterado_por: tuple[str, ...] = ()
+    relacionados: tuple[str, ...] = ()
+    planilha: str = ""
+    aba: str = ""
+    raw_columns: tuple[str, ...] | None = None
+    raw_values: tuple[str, ...] | None = None
+    # chaves desconhecidas, devolvidas como vieram por to_json()
+    extra: dict[str, Any] | None = None
+
+    def __post_init__(self):
+        for f in _INTERNED:
+            v = getattr(self, f)
+            if v:
+                setattr(self, f, sys.intern(v))
+        if self.raw_columns is not None:
+            self.raw_columns = shared_columns(self.raw_columns)
+            if self.raw_values is not None:
+                self.raw_values = tuple(self.raw_values)
+
+    def set(self, key: str, value: Any) -> None:
+        """Atribui um campo pelo nome do JSON (apelidos incluídos), com a conversão de tipo do modelo."""
+        key = ALIASES.get(key, key)
+        if key in REF_FIELDS:
+            setattr(self, key, split_refs(value))
+        elif key == "raw":
+            self.set_raw(value, self.raw_columns)
+        elif key == "raw_columns":
+            self.set_raw(self.raw_dict(), value)
+        elif key in _FIELD_SET:
+            v = _text(value)
+            setattr(self, key, sys.intern(v) if key in _INTERNED and v else v)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def update(self, fields: dict[str, Any], keep_empty: bool = False) -> None:
+        """Aplica FIELDS (nomes do JSON); vazios são ignorados salvo keep_empty. O slug não muda."""
+        for k, v in fields.items():
+            if k == "slug" or (not keep_empty and v in ("", None, [], ())):
+                continue
+            self.set(k, v)
+
+    def set_raw(self, raw: dict[str, Any] | None, columns: Iterable[str] | None = None) -> None:
+        """Metadados no formato dict coluna -> valor (+ ordem das colunas); chaves fora de COLUMNS vão ao fim."""
+        if raw is None and columns is None:
+            self.raw_columns = self.raw_values = None
+            return
+        raw = raw or {}
+        cols = list(columns) if columns is not None else list(raw)
+        known = set(cols)
+        cols += [k for k in raw if k not in known]
+        self.raw_columns = shared_columns(cols)
+        self.raw_values = tuple(_text(raw.get(c, "")) for c in cols)
+
+    def raw_items(self) -> Iterable[tuple[str, str]]:
+        """(coluna, valor) na ordem da planilha."""
+        return zip(self.raw_columns or (), self.raw_values or ())
+
+    def raw_dict(self) -> dict[str, str] | None:
+        if self.raw_columns is None:
+            return None
+        return dict(self.raw_items())
+
+    def refs(self, rel: str) -> tuple[str, ...]:
+        return getattr(self, rel)
+
+    @classmethod
+    def from_json(cls, d: dict[str, Any]) -> "Norm":
+        n = cls()
+        aliased = []
+        for k, v in d.items():
+            if k in ALIASES:
+                aliased.append(k)
+            elif k not in _RAW_KEYS:
+                n.set(k, v)
+        for k in sorted(aliased, key=_ALIAS_ORDER.__getitem__):
+            if not getattr(n, ALIASES[k]):
+                n.set(k, d[k])
+        values = d.get("raw_values")
+        if isinstance(values, list) and isinstance(d.get("raw_columns"), list):
+            # colunas repetidas: as células vêm na ordem (ver to_json)
+            n.extra.pop("raw_values")
+            if not n.extra:
+                n.extra = None
+            cols = shared_columns(_text(c) for c in d["raw_columns"])
+            cells = [_text(v) for v in values[:len(cols)]]
+            n.raw_columns = cols
+            n.raw_values = tuple(cells + [""] * (len(cols) - len(cells)))
+        elif "raw" in d or "raw_columns" in d:
+            n.set_raw(d.get("raw"), d.get("raw_columns"))
+        return n
+
+    def to_json(self, raw: bool = True) -> dict[str, Any]:
+        """
+        Registro como dict (raw/raw_columns no formato dict); raw=False omite
+        os metadados, que bpa.corpus grava à parte. Slug e campos de texto
+        sempre; opcionais só quando preenchidos. Com colunas de nome repetido
+        (o dict raw guarda uma só), raw_values leva também as células na ordem.
+        """
+        d: dict[str, Any] = {"slug": self.slug}
+        for f in TEXT_FIELDS:
+            d[f] = getattr(self, f)
+        if self.subtemas:
+            d["subtemas"] = self.subtemas
+        for f in REF_FIELDS:
+            refs = getattr(self, f)
+            if refs:
+                d[f] = "; ".join(refs)
+        if self.planilha:
+            d["planilha"] = self.planilha
+        if self.aba:
+            d["aba"] = self.aba
+        if raw and self.raw_columns is not None:
+            d["raw"] = self.raw_dict()
+            d["raw_columns"] = list(self.raw_columns)
+            if len(set(self.raw_columns)) < len(self.raw_columns):
+                d["raw_values"] = [v for _, v in self.raw_items()]
+        if self.extra:
+            for k, v in self.extra.items():
+                d.setdefault(k, v)
+        return d
+
+
+_FIELD_SET = frozenset(TEXT_FIELDS) | {"slug", "subtemas", "planilha", "aba"}
+_RAW_KEYS = frozenset({"raw", "raw_columns"})
+_ALIAS_ORDER = {k: i for i, k in enumerate(ALIASES)}
+
+
+def shared_columns(cols: Iterable[str]) -> tuple[str, ...]:
+    t = tuple(cols)
+    hit = _COLUMNS.get(t)
+    if hit is None:
+        if len(_COLUMNS) >= _COLUMNS_MAX:
+            _COLUMNS.clear()
+        hit = _COLUMNS[t] = t
+    return hit
+
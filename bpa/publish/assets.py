@@ -0,0 +1,130 @@
+# bpa/publish/assets.py
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import gzip
+import hashlib
+import os
+
+try:
+    import brotli
+except ImportError:  # opcional (está no requirements.txt): sem ele, só .gz
+    brotli = None
+
+ASSETS_DIR = "assets"
+
+# extensões que ganham irmãos pré-comprimidos (.gz e, com brotli, .br)
+COMPRESSIBLE = (".html", ".json", ".js", ".css", ".atom")
+SIBLINGS = (".gz", ".br")
+
+
+def asset_path(stem: str, ext: str, text: str) -> str:
+    """Caminho relativo ao site, com o hash do conteúdo no nome (cacheável para sempre)."""
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+    return f"{ASSETS_DIR}/{stem}.{digest}.{ext}"
+
+
+def write_assets(out: Path, assets: dict[str, str]) -> tuple[int, int]:
+    """
+    Grava os ASSETS (caminho de asset_path() -> conteúdo) que ainda não
+    existem e remove de OUT/assets os de builds anteriores. Retorna
+    (gravados, removidos).
+    """
+    written = removed = 0
+    for rel, text in assets.items():
+        p = out / rel
+        if not p.exists():  # mesmo nome = mesmo conteúdo
+            p.parent.mkdir(parents=True, exist_ok=True)
+            p.write_text(text, encoding="utf-8")
+            written += 1
+    keep = set(assets)
+    for p in (out / ASSETS_DIR).glob("*"):
+        rel = f"{ASSETS_DIR}/{p.name}"
+        if p.is_file() and not rel.endswith(SIBLINGS) and rel not in keep:
+            p.unlink()
+            removed += 1
+    return written, removed
+
+
+def _compress(src: Path) -> None:
+    data = src.read_bytes()
+    st = src.stat()
+    outputs = [(src.with_name(src.name + ".gz"), lambda: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        outputs.append((src.with_name(src.name + ".br"), lambda: brotli.compress(data, quality=11)))
+    for sib, make in outputs:
+        tmp = sib.with_name(sib.name + ".tmp")
+        tmp.write_bytes(make())
+        # mesmo mtime da origem = irmão em dia (ver _stale)
+        os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+        tmp.replace(sib)
+
+
+def _stale(src: Path, mtime_ns: int) -> bool:
+    for ext in SIBLINGS[:2 if brotli is not None else 1]:
+        try:
+            if src.with_name(src.name + ext).stat().st_mtime_ns != mtime_ns:
+                return True
+        except FileNotFoundError:
+            return True
+    return False
+
+
+def _site_files(out: Path):
+    for dirpath, dirnames, filenames in os.walk(out):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for name in filenames:
+            if not name.startswith("."):
+                yield Path(dirpath) / name
+
+
+def compress_site(out: Path, jobs: int | None = None) -> dict:
+    """
+    Grava NOME.gz (e NOME.br, se o módulo brotli estiver instalado) ao lado
+    de cada HTML/JSON/JS/CSS/Atom de OUT, em paralelo; só refaz os que mudaram
+    desde a última compressão e remove irmãos órfãos (e os .br de um build
+    com brotli, que ficariam velhos). Retorna o relatório de tamanhos por
+    classe (extensão): arquivos, bytes, gz e br (None sem brotli).
+    """
+    sizes: dict[str, dict] = {}
+    todo: list[Path] = []
+    orphans = 0
+    for p in _site_files(out):
+        if p.suffix in SIBLINGS:
+            src = p.with_suffix("")
+            stale_br = p.suffix == ".br" and brotli is None
+            if src.suffix not in COMPRESSIBLE or not src.exists() or stale_br:
+                p.unlink()
+                orphans += 1
+            continue
+        if p.suffix not in COMPRESSIBLE:
+            continue
+        st = p.stat()
+        row = sizes.setdefault(p.suffix[1:], {"arquivos": 0, "bytes": 0, "gz": 0, "br": 0 if brotli else None})
+        row["arquivos"] += 1
+        row["bytes"] += st.st_size
+        if _stale(p, st.st_mtime_ns):
+            todo.append(p)
+
+    workers = jobs if jobs and jobs > 1 else os.cpu_count() or 1
+    # zlib e brotli liberam o GIL: threads bastam
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(_compress, todo))
+
+    for p in _site_files(out):
+        if p.suffix in SIBLINGS and p.with_suffix("").suffix in COMPRESSIBLE:
+            sizes[p.with_suffix("").suffix[1:]][p.suffix[1:]] += p.stat().st_size
+    return {"classes": dict(sorted(sizes.items())), "comprimidos": len(todo), "removidos": orphans}
+
+
+def format_sizes(report: dict) -> str:
+    """Uma linha por classe: arquivos, bytes e tamanho comprimido."""
+    def kb(n: int) -> str:
+        return f"{n / 1024:,.1f} KiB".replace(",", ".")
+
+    lines = []
+    for cls, row in report["classes"].items():
+        line = f"   {cls:<5} {row['arquivos']:>6} arquivo(s) · {kb(row['bytes'])} · gz {kb(row['gz'])}"
+        if row["br"] is not None:
+            line += f" · br {kb(row['br'])}"
+        lines.append(line)
+    return "\n".join(lines)
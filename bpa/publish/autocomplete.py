@@ -0,0 +1,115 @@
+# bpa/publish/autocomplete.py
+import hashlib
+import json
+import re
+from pathlib import Path
+
+from bpa.publish.search_index import fold, shard_key, tokenize
+from bpa.publish.util import write_if_changed
+
+AUTOCOMPLETE_DIR = "autocomplete"
+
+# campos indexados (o que o editor digita para achar o ato)
+FIELDS = ("identificacao", "numero", "tipo", "ano")
+# shards com mais atos que isto são divididos por um caractere a mais de
+# prefixo, até MAX_PREFIX caracteres; um token sozinho ("de", "portaria")
+# guarda só os SHARD_MAX atos mais recentes
+SHARD_MAX = 500
+MAX_PREFIX = 6
+
+
+def ato_tokens(identificacao: str, numero: str, tipo: str, ano: str) -> list[str]:
+    """
+    Tokens de um ato, como os calcula o admin: os de cada campo mais o número
+    sem pontuação ("8.742" também vira "8742").
+    """
+    toks = tokenize(" ".join((identificacao, numero, tipo, ano)))
+    compact = re.sub(r"[^a-z0-9]", "", fold(numero))
+    if compact:
+        toks.append(compact)
+    return list(dict.fromkeys(toks))
+
+
+def _split(prefix: str, table: dict[str, list[int]]) -> dict[str, dict[str, list[int]]]:
+    """
+    Prefixo -> (token -> ids). Um prefixo grande demais fica só com o token
+    igual a ele e o resto desce para prefixos um caractere mais longos.
+    """
+    if len(prefix) >= MAX_PREFIX or len(set().union(*table.values())) <= SHARD_MAX:
+        return {prefix: table}
+    out: dict[str, dict[str, list[int]]] = {}
+    children: dict[str, dict[str, list[int]]] = {}
+    for tok, ids in table.items():
+        if len(tok) == len(prefix):
+            out.setdefault(prefix, {})[tok] = ids
+        else:
+            children.setdefault(tok[:len(prefix) + 1], {})[tok] = ids
+    for key, sub in children.items():
+        out.update(_split(key, sub))
+    return out
+
+
+def build_autocomplete(fields: dict[str, list[str]], items: list[tuple[int, str]], out: Path) -> dict:
+    """
+    Índice de prefixos do seletor "Alterar ato" do admin, em OUT/autocomplete/:
+    index.json (versão e nº de ocorrências de cada prefixo) e um <prefixo>.json por shard,
+    com os tokens sem acento de identificação/número/tipo/ano em ordem e os
+    atos que eles alcançam ([slug, identificação, tipo, número, ano,
+    situação, ordem], do mais recente ao mais antigo; ordem = posição global,
+    para juntar atos de shards diferentes). ITEMS = (posição em FIELDS,
+    slug da página). Só regrava arquivos cujo conteúdo mudou e remove shards
+    que sumiram. Retorna a versão e quantos arquivos foram gravados/removidos.
+    """
+    slugs = dict(items)
+    ids = sorted(slugs, key=lambda i: (fields["data"][i], -i), reverse=True)
+
+    postings: dict[str, list[int]] = {}
+    totals: dict[str, int] = {}
+    for i in ids:
+        for tok in ato_tokens(*(fields[k][i] for k in FIELDS)):
+            hits = postings.setdefault(tok, [])
+            if len(hits) < SHARD_MAX:
+                hits.append(i)
+            totals[tok] = totals.get(tok, 0) + 1
+
+    groups: dict[str, dict[str, list[int]]] = {}
+    for tok in sorted(postings):
+        groups.setdefault(shard_key(tok), {})[tok] = postings[tok]
+    shards: dict[str, dict[str, list[int]]] = {}
+    for key, table in groups.items():
+        shards.update(_split(key, table))
+
+    rank = {i: k for k, i in enumerate(ids)}
+    files: dict[str, str] = {}
+    sizes: dict[str, int] = {}
+    for key, table in shards.items():
+        # ids locais ao shard, na ordem global (mais recente primeiro)
+        members = sorted(set().union(*table.values()), key=rank.__getitem__)
+        # ocorrências antes do corte em SHARD_MAX: é o que a página compara
+        sizes[key] = sum(totals[tok] for tok in table)
+        local = {i: k for k, i in enumerate(members)}
+        files[f"{key}.json"] = json.dumps({
+            # [token, ids] ou, se cortado, [token, ids, total]
+            "tokens": [[tok, [local[i] for i in table[tok]]] + ([totals[tok]] if totals[tok] > len(table[tok]) else [])
+                       for tok in sorted(table)],
+            "atos": [[slugs[i], fields["identificacao"][i], fields["tipo"][i], fields["numero"][i],
+                      fields["ano"][i], fields["vigencia"][i], rank[i]] for i in members],
+        }, ensure_ascii=False, separators=(",", ":"))
+
+    version = hashlib.sha256()
+    for name in sorted(files):
+        version.update(name.encode("utf-8") + b"\0" + files[name].encode("utf-8"))
+    versao = version.hexdigest()[:12]
+    # a página busca pelo token digitado cujo shard é o menor
+    files["index.json"] = json.dumps({"versao": versao, "n": len(ids), "shards": dict(sorted(sizes.items()))},
+                                     separators=(",", ":"))
+
+    base = out / AUTOCOMPLETE_DIR
+    written = sum(write_if_changed(base / name, text) for name, text in files.items())
+    removed = 0
+    if base.exists():
+        for p in base.glob("*.json"):
+            if p.name not in files:
+                p.unlink()
+                removed += 1
+    return {"versao": versao, "gravados": written, "removidos": removed}
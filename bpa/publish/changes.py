@@ -0,0 +1,217 @@
+# bpa/publish/changes.py
+"""
+Feed de mudanças entre versões do corpus (bpa diff e o passo do publish).
+
+Registros são comparados por slug da página (como no site e na API) e pelo
+hash de cada registro; só os que mudaram de hash são comparados campo a
+campo. Um delta:
+
+  {"versao", "anterior", "gerado_em",
+   "adicionados": [registro, ...],             (to_json() completo, com "hash")
+   "removidos": [slug, ...],
+   "alterados": [{"slug", "hash", "campos": {campo: [antigo, novo]}}, ...]}
+
+Campo ausente vale null; os metadados da planilha entram como "raw.<coluna>"
+("raw.<coluna>#2" etc. nas colunas de nome repetido).
+A versão é o sha256 (12 hex) dos pares slug/hash, independente do formato do
+arquivo (JSON ou NDJSON).
+
+No publish, STATE_DIR (fora do _site, pois o site é refeito do zero) guarda o
+último corpus publicado e os deltas; OUT/changes/ recebe index.json (versões,
+da mais recente à mais antiga), <versao>.json de cada delta e feed.atom com
+os atos novos e os revogados.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+from xml.sax.saxutils import escape
+import hashlib
+import json
+
+from bpa.publish.search_index import fold
+from bpa.publish.util import write_if_changed
+
+CHANGES_DIR = "changes"
+INDEX_NAME = "index.json"
+FEED_NAME = "feed.atom"
+STATE_NAME = "atual.json"
+# versões (e deltas) guardadas; as mais antigas saem do índice
+MAX_VERSIONS = 100
+FEED_ENTRIES = 100
+
+
+def record_hash(record: dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(record, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def corpus_version(hashes: dict[str, str]) -> str:
+    h = hashlib.sha256()
+    for slug in sorted(hashes):
+        h.update(f"{slug}\0{hashes[slug]}\n".encode("utf-8"))
+    return h.hexdigest()[:12]
+
+
+def _flat(record: dict[str, Any]) -> dict[str, Any]:
+    out = {k: v for k, v in record.items() if k not in ("raw", "raw_values")}
+    if "raw_values" in record:  # colunas repetidas: a 2ª vira "raw.<coluna>#2"
+        seen: dict[str, int] = {}
+        for col, v in zip(record.get("raw_columns") or [], record["raw_values"]):
+            seen[col] = seen.get(col, 0) + 1
+            out[f"raw.{col}" + (f"#{seen[col]}" if seen[col] > 1 else "")] = v
+        return out
+    for col, v in (record.get("raw") or {}).items():
+        out[f"raw.{col}"] = v
+    return out
+
+
+def field_changes(old: dict[str, Any], new: dict[str, Any]) -> dict[str, list]:
+    """Campo -> [antigo, novo] dos campos que diferem (null = ausente)."""
+    a, b = _flat(old), _flat(new)
+    return {k: [a.get(k), b.get(k)] for k in sorted(a.keys() | b.keys()) if a.get(k) != b.get(k)}
+
+
+def diff_records(old: dict[str, dict[str, Any]], new: dict[str, dict[str, Any]],
+                 old_hashes: dict[str, str] | None = None, new_hashes: dict[str, str] | None = None) -> dict[str, Any]:
+    """
+    Delta entre dois corpora dados como slug -> registro (to_json()). Os
+    hashes podem vir prontos (o publish já os calcula para o manifesto).
+    """
+    ha = old_hashes if old_hashes is not None else {s: record_hash(r) for s, r in old.items()}
+    hb = new_hashes if new_hashes is not None else {s: record_hash(r) for s, r in new.items()}
+    alterados = []
+    for slug in sorted(old.keys() & new.keys()):
+        if ha[slug] != hb[slug]:
+            campos = field_changes(old[slug], new[slug])
+            if campos:
+                alterados.append({"slug": slug, "hash": hb[slug], "campos": campos})
+    return {
+        "versao": corpus_version(hb),
+        "anterior": corpus_version(ha),
+        "adicionados": [{**new[s], "hash": hb[s]} for s in sorted(new.keys() - old.keys())],
+        "removidos": sorted(old.keys() - new.keys()),
+        "alterados": alterados,
+    }
+
+
+def is_empty(delta: dict[str, Any]) -> bool:
+    return not (delta["adicionados"] or delta["removidos"] or delta["alterados"])
+
+
+def summary(delta: dict[str, Any]) -> dict[str, int]:
+    return {k: len(delta[k]) for k in ("adicionados", "removidos", "alterados")}
+
+
+def _revogado(v: Any) -> bool:
+    return "revog" in fold(v or "")
+
+
+# ----------------- passo do publish -----------------
+
+def _read_json(p: Path) -> Any:
+    try:
+        return json.loads(p.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def _feed(versions: list[dict], deltas: dict[str, dict], records: dict[str, dict[str, Any]]) -> str:
+    """Atom com os atos novos e os revogados, da versão mais recente para trás."""
+    entries = []
+    for v in versions:
+        delta = deltas.get(v["versao"])
+        if delta is None:
+            continue
+        found = [("novo", r["slug"], r) for r in delta["adicionados"]]
+        for a in delta["alterados"]:
+            old, new = a["campos"].get("vigencia", [None, None])
+            if _revogado(new) and not _revogado(old):
+                found.append(("revogado", a["slug"], records.get(a["slug"])))
+        for kind, slug, record in found:
+            entries.append((v, kind, slug, record))
+        if len(entries) >= FEED_ENTRIES:
+            break
+    updated = versions[0]["gerado_em"] if versions else "1970-01-01T00:00:00Z"
+    parts = [
+        "<?xml version='1.0' encoding='utf-8'?>",
+        "<feed xmlns='http://www.w3.org/2005/Atom'>",
+        "<id>urn:bpa:changes</id>",
+        "<title>Banco de Normativos: atos novos e revogados</title>",
+        f"<updated>{updated}</updated>",
+        "<link rel='self' href='feed.atom'/>",
+        "<author><name>banco-normativos-ba</name></author>",
+    ]
+    for v, kind, slug, record in entries[:FEED_ENTRIES]:
+        label = (record or {}).get("identificacao") or slug
+        title = ("Novo: " if kind == "novo" else "Revogado: ") + label
+        ementa = (record or {}).get("ementa") or ""
+        parts.append(
+            "<entry>"
+            f"<id>urn:bpa:{escape(v['versao'])}:{escape(slug)}:{kind}</id>"
+            f"<title>{escape(title)}</title>"
+            f"<updated>{v['gerado_em']}</updated>"
+            f"<link href='../{escape(slug)}.html'/>"
+            f"<category term='{kind}'/>"
+            + (f"<summary>{escape(ementa)}</summary>" if ementa else "")
+            + "</entry>"
+        )
+    parts.append("</feed>")
+    return "\n".join(parts) + "\n"
+
+
+def build_changes(records: dict[str, dict[str, Any]], hashes: dict[str, str], out: Path, state_dir: Path,
+                  now: datetime | None = None) -> dict:
+    """
+    Compara RECORDS (slug -> to_json(), com seus HASHES) com o último corpus
+    publicado em STATE_DIR; se mudou, grava o delta e passa a versão nova a
+    ser a atual. Primeira execução (ou estado perdido): a versão vira a base,
+    sem delta. Depois espelha índice, deltas e feed em OUT/changes/. Retorna
+    a versão atual, o resumo do delta novo (ou None) e os arquivos
+    gravados/removidos em OUT.
+    """
+    state_dir.mkdir(parents=True, exist_ok=True)
+    version = corpus_version(hashes)
+    versions: list[dict] = _read_json(state_dir / INDEX_NAME) or []
+    state = _read_json(state_dir / STATE_NAME)
+    stamp = (now or datetime.now(timezone.utc)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    novo = None
+    if not versions or not state or state.get("versao") != versions[0]["versao"]:
+        versions = [{"versao": version, "anterior": None, "gerado_em": stamp, "delta": None}]
+    elif versions[0]["versao"] != version:
+        delta = diff_records(state["registros"], records, state["hashes"], hashes)
+        delta["gerado_em"] = stamp
+        write_if_changed(state_dir / f"{version}.json", _dumps(delta))
+        novo = summary(delta)
+        # corpus que voltou a uma versão antiga: o delta novo ocupa o nome
+        versions = ([{"versao": version, "anterior": delta["anterior"], "gerado_em": stamp,
+                      "delta": f"{version}.json", **novo}]
+                    + [v for v in versions if v["versao"] != version])[:MAX_VERSIONS]
+    if not state or state.get("versao") != version:
+        tmp = state_dir / (STATE_NAME + ".tmp")
+        tmp.write_text(_dumps({"versao": version, "hashes": hashes, "registros": records}), encoding="utf-8")
+        tmp.replace(state_dir / STATE_NAME)
+    write_if_changed(state_dir / INDEX_NAME, json.dumps(versions, ensure_ascii=False, indent=2))
+
+    keep = {v["delta"] for v in versions if v["delta"]}
+    for p in state_dir.glob("*.json"):
+        if p.name not in keep | {INDEX_NAME, STATE_NAME}:
+            p.unlink()
+
+    deltas = {v["versao"]: _read_json(state_dir / v["delta"]) for v in versions if v["delta"]}
+    files = {INDEX_NAME: _dumps({"atual": version, "versoes": versions}), FEED_NAME: _feed(versions, deltas, records)}
+    for name in keep:
+        files[name] = (state_dir / name).read_text(encoding="utf-8")
+    base = out / CHANGES_DIR
+    written = sum(write_if_changed(base / name, text) for name, text in files.items())
+    removed = 0
+    for p in base.glob("*"):
+        if p.is_file() and p.suffix in (".json", ".atom") and p.name not in files:
+            p.unlink()
+            removed += 1
+    return {"versao": version, "novo": novo, "gravados": written, "removidos": removed}
@@ -1,11 +1,27 @@
 ﻿# bpa/publish/emit_site.py
+from functools import lru_cache
 from pathlib import Path
+import hashlib
 import json
 import html
 import re
+import time
+
+from bpa import metrics
+from bpa.corpus import load as load_corpus
+from bpa.model import Norm
+from bpa.publish.assets import asset_path, compress_site, write_assets
+from bpa.publish.autocomplete import build_autocomplete
+from bpa.publish.changes import build_changes
+from bpa.publish.graph import GRAPH_NAME, build_graph, page_refs
+from bpa.publish.facets import FACETS, build_facets
+from bpa.publish.search_index import build_search_index, resolve_fields
+from bpa.publish.util import safe_slug, write_if_changed
 
 SEP = " · "
 
+MANIFEST_NAME = ".bpa-manifest.json"
+
 TIPOS_FIXOS = [
     "Lei",
     "Medida Provisória",
@@ -34,17 +50,9 @@ def _is_url(v: str | None) -> bool:
     return bool(v) and re.match(r"^https?://", v or "")
 
 
-def _safe_slug(s: str | None, fallback: str = "norma") -> str:
-    s = (s or "").lower()
-    s = re.sub(r"[^a-z0-9\-]+", "-", s)
-    s = s.replace("/", "-").replace("\\", "-").replace(".", "-")
-    s = re.sub(r"-{2,}", "-", s).strip("-")
-    return s or fallback
-
-
-def _css() -> str:
+@lru_cache(maxsize=None)
+def _css_text() -> str:
     return (
-        "<style>"
         "body{font:16px/1.35 system-ui,-apple-system,Segoe UI,Roboto,Ubuntu,Cantarell,Noto Sans,sans-serif;margin:24px;max-width:1200px}"
         "h1{margin:0 0 12px}"
         ".panel{background:#0c9a8a;color:#fff;padding:10px 14px;font-weight:700;border-radius:6px 6px 0 0}"
@@ -64,42 +72,349 @@ def _css() -> str:
         ".section{margin:18px 0}"
         ".pill{display:inline-block;background:#eef;border:1px solid #cde;border-radius:12px;padding:2px 8px;margin-right:6px}"
         ".btns a{display:inline-block;border:1px solid #444;padding:6px 10px;margin-right:8px;text-decoration:none}"
-        "</style>"
+        # tabela virtualizada do index
+        "#view{max-height:70vh;overflow:auto;border:1px solid #ddd}"
+        "#view table{margin-top:0;table-layout:fixed}"
+        "#view thead th{position:sticky;top:0;cursor:pointer;text-align:left}"
+        "#view th[aria-sort=ascending]::after{content:' ▲'}#view th[aria-sort=descending]::after{content:' ▼'}"
+        "tr.vr td{white-space:nowrap;overflow:hidden;text-overflow:ellipsis}"
+    )
+
+
+def _css(prefix: str = "") -> str:
+    """<link> da folha compartilhada (assets/site.<hash>.css); PREFIX leva da página à raiz do site."""
+    return f"<link rel='stylesheet' href='{prefix}{asset_path('site', 'css', _css_text())}'>"
+
+
+@lru_cache(maxsize=None)
+def _index_js() -> str:
+    # filtragem e ordenação rodam em search/worker.js (ver WORKER_JS);
+    # a versão do índice vem do data-v da tag <script>
+    return (
+        "const W = new Worker('search/worker.js?v=' + document.currentScript.dataset.v);"
+        "const BLOCK = 100, OVERSCAN = 10, DEBOUNCE_MS = 200;"
+        "let ROW_H = 44, SEQ = 0, N = 0, timer = 0, frame = 0;"
+        "const ROWS = new Map(), PEND = new Set(), SORT = {col:'', dir:1};"
+        "const VIEW = document.getElementById('view'), GRID = document.getElementById('grid');"
+        "function norm(s){return (s??'').toString().normalize('NFKD').replace(/[\\u0300-\\u036f]/g,'').toLowerCase().trim();}"
+        "function esc(s){return String(s??'').replace(/[&<>\"']/g, ch=>({'&':'&amp;','<':'&lt;','>':'&gt;','\"':'&quot;',\"'\":'&#39;'}[ch]));}"
+        "function val(id){return document.getElementById(id).value;}"
+
+        "function filtros(){"
+        "  return {"
+        "    tipos: Array.from(document.querySelectorAll('input[name=tipo]:checked')).map(i=>norm(i.value)),"
+        "    numero: norm(val('f-numero')), ano: val('f-ano').trim(), arg: norm(val('f-arg')),"
+        "    tema: norm(val('f-tema')), origem: val('f-origem'), situacao: val('f-situacao'),"
+        "  };"
+        "}"
+        "function visible(){return Math.ceil(VIEW.clientHeight/ROW_H) + 2*OVERSCAN;}"
+        "function doSearch(){"
+        "  clearTimeout(timer);"
+        "  SEQ++;"
+        "  W.postMessage({tipo:'buscar', q:SEQ, f:filtros(), sort:SORT, ate:Math.max(BLOCK, visible())});"
+        "}"
+        # digitação: uma busca só depois de DEBOUNCE_MS sem teclas
+        "function schedule(){ clearTimeout(timer); timer = setTimeout(doSearch, DEBOUNCE_MS); }"
+
+        "function draw(){"
+        "  frame = 0;"
+        "  if(N===0){ GRID.innerHTML='<tr><td colspan=6 class=\"muted\">Nenhum resultado.</td></tr>'; return; }"
+        "  const first = Math.max(0, Math.floor(VIEW.scrollTop/ROW_H) - OVERSCAN);"
+        "  const last = Math.min(N, first + visible() + OVERSCAN);"
+        "  let html = '<tr style=\"height:'+(first*ROW_H)+'px\"></tr>';"
+        "  for(let i=first;i<last;i++){"
+        "    const r = ROWS.get(i);"
+        "    if(!r){"
+        "      const b = i - i%BLOCK;"
+        "      if(!PEND.has(b)){ PEND.add(b); W.postMessage({tipo:'linhas', de:b, ate:b+BLOCK}); }"
+        "      html += '<tr class=\"vr\"><td colspan=6 class=\"muted\">…</td></tr>';"
+        "      continue;"
+        "    }"
+        "    html += '<tr class=\"vr\"><td>'+esc(r[2])+'</td><td><a href=\"'+esc(r[0])+'.html\">'+esc(r[1])+'</a></td>'"
+        "      +'<td>'+esc(r[3])+'</td><td>'+esc(r[4])+'</td><td>'+esc(r[5])+'</td><td title=\"'+esc(r[6])+'\">'+esc(r[6])+'</td></tr>';"
+        "  }"
+        "  html += '<tr style=\"height:'+((N-last)*ROW_H)+'px\"></tr>';"
+        "  GRID.innerHTML = html;"
+        # altura real da linha (fonte/zoom do navegador) corrige os espaçadores
+        "  const tr = GRID.querySelector('tr.vr');"
+        "  const h = tr ? tr.getBoundingClientRect().height : 0;"
+        "  if(h && Math.abs(h-ROW_H) > 0.5){ ROW_H = h; draw(); }"
+        "}"
+        "function redraw(){ if(!frame) frame = requestAnimationFrame(draw); }"
+
+        "W.onmessage = e => {"
+        "  const m = e.data;"
+        "  if(m.tipo==='pronto'){ doSearch(); return; }"
+        "  if(m.q !== SEQ) return;"  # resposta de uma busca já substituída
+        "  if(m.tipo==='resultado'){"
+        "    N = m.n; ROWS.clear(); PEND.clear(); VIEW.scrollTop = 0;"
+        "    document.getElementById('status').textContent = N===1 ? '1 resultado' : N+' resultados';"
+        "  }"
+        "  PEND.delete(m.de);"
+        "  m.linhas.forEach((r,k)=>ROWS.set(m.de+k, r));"
+        "  redraw();"
+        "};"
+        "VIEW.addEventListener('scroll', redraw);"
+        "window.addEventListener('resize', redraw);"
+        "document.getElementById('btn-buscar').addEventListener('click', doSearch);"
+        "['f-numero','f-ano','f-arg','f-tema'].forEach(id=>document.getElementById(id).addEventListener('input', schedule));"
+        "['f-origem','f-situacao'].forEach(id=>document.getElementById(id).addEventListener('change', doSearch));"
+        "document.querySelectorAll('input[name=tipo]').forEach(i=>i.addEventListener('change', schedule));"
+        "document.querySelectorAll('#view th[data-col]').forEach(th=>th.addEventListener('click', ()=>{"
+        "  const col = th.dataset.col;"
+        "  SORT.dir = SORT.col===col ? -SORT.dir : 1;"
+        "  SORT.col = col;"
+        "  document.querySelectorAll('#view th[data-col]').forEach(x=>x.removeAttribute('aria-sort'));"
+        "  th.setAttribute('aria-sort', SORT.dir>0 ? 'ascending' : 'descending');"
+        "  doSearch();"
+        "}));"
+    )
+
+
+def _assets() -> dict[str, str]:
+    """Assets compartilhados: caminho com hash -> conteúdo."""
+    return {
+        asset_path("site", "css", _css_text()): _css_text(),
+        asset_path("index", "js", _index_js()): _index_js(),
+    }
+
+
+# ----------------- manifesto de build (publicação incremental) -----------------
+
+def _sha(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# módulos cujo código entra no HTML das páginas: este, o das relações e o do modelo
+_TEMPLATE_SOURCES = (Path(__file__), Path(__file__).with_name("graph.py"), Path(__file__).parents[1] / "model.py")
+
+
+def _template_hash() -> str:
+    # qualquer mudança no código dos templates invalida todas as páginas
+    code = "".join(p.read_text(encoding="utf-8") for p in _TEMPLATE_SOURCES)
+    return _sha(code + _css_text() + _index_js())
+
+
+def norm_hash(n: Norm) -> str:
+    return _sha(json.dumps(n.to_json(), ensure_ascii=False, sort_keys=True))
+
+
+def _load_manifest(out: Path) -> dict:
+    p = out / MANIFEST_NAME
+    if not p.exists():
+        return {}
+    try:
+        return json.loads(p.read_text(encoding="utf-8"))
+    except ValueError:
+        return {}
+
+
+def _write_manifest(out: Path, manifest: dict) -> None:
+    tmp = out / (MANIFEST_NAME + ".tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True), encoding="utf-8")
+    tmp.replace(out / MANIFEST_NAME)
+
+
+# ----------------- páginas de detalhe -----------------
+
+def _page_title(n: Norm, i: int) -> str:
+    return n.identificacao or n.slug or f"Norma {i}"
+
+
+def _page_slug(n: Norm, i: int) -> str:
+    return safe_slug(n.slug or _page_title(n, i), fallback="norma-" + str(i))
+
+
+def page_items(norms: list[Norm]) -> dict[str, tuple[int, Norm]]:
+    """slug da página -> (posição, registro); slugs repetidos: vale o último."""
+    last: dict[str, tuple[int, Norm]] = {}
+    for i, n in enumerate(norms, start=1):
+        last[_page_slug(n, i)] = (i, n)
+    return last
+
+
+def graph_for(items: dict[str, tuple[int, Norm]]) -> dict:
+    titles = {slug: _page_title(n, i) for slug, (i, n) in items.items()}
+    return build_graph([(slug, n) for slug, (_, n) in items.items()], titles)
+
+
+def _page_inputs(n: Norm, i: int, graph: dict) -> dict:
+    """Tudo o que a página de detalhe usa além do próprio registro."""
+    slug = _page_slug(n, i)
+    refs = page_refs(graph, slug)
+    return {
+        "titulo": _page_title(n, i),
+        "slug": slug,
+        "altera": refs["altera"],
+        "alterado_por": refs["alterado_por"],
+        "correlatas": refs["relacionados"],
+        "cadeia": refs["cadeia"],
+    }
+
+
+def _links_oficiais(n: Norm) -> str:
+    links: list[str] = []
+    if n.tipo.lower() in {"lei", "decreto"} and n.fonte_planalto:
+        links.append(_a(n.fonte_planalto, "Ver no Planalto"))
+    if n.fonte_dou:
+        links.append(_a(n.fonte_dou, "Ver no DOU"))
+    if not links:
+        return "<span class='muted'>—</span>"
+    return SEP.join(links)
+
+
+def _ref_links(refs: list[tuple[str, str | None]]) -> list[str]:
+    out: list[str] = []
+    for label, target_slug in refs:
+        if target_slug:
+            out.append(f'<a href="{target_slug}.html">{html.escape(label)}</a>')
+        else:
+            out.append(html.escape(label))
+    return out
+
+
+def _render_detail(n: Norm, inputs: dict) -> str:
+    titulo = inputs["titulo"]
+
+    btns: list[str] = []
+    if _is_url(n.texto_original):
+        btns.append(_a(n.texto_original, "Texto original"))
+    if _is_url(n.texto_compilado):
+        btns.append(_a(n.texto_compilado, "Texto compilado"))
+    btns_html = " ".join(btns)
+
+    altera = _ref_links(inputs["altera"])
+    alterado_por = _ref_links(inputs["alterado_por"])
+    correlatas = _ref_links(inputs["correlatas"])
+    cadeia = _ref_links(inputs["cadeia"])
+
+    # metadados (raw)
+    meta_rows: list[str] = []
+    for col, v in n.raw_items():
+        cell = _a(v, v) if _is_url(v) else html.escape(str(v))
+        meta_rows.append(f"<tr><th align='left'>{html.escape(col)}</th><td>{cell}</td></tr>")
+    meta_table = "<div class='section'><h3>Metadados da planilha</h3><table>" + "".join(meta_rows) + "</table></div>"
+
+    return (
+        "<!doctype html><meta charset='utf-8'>"
+        "<title>" + html.escape(titulo) + "</title>"
+        + _css()
+        + '<p><a href="index.html">← Voltar</a></p>'
+        "<h2>" + html.escape(titulo) + "</h2>"
+        "<p><strong>Vigência:</strong> " + html.escape(n.vigencia or "—")
+        + SEP
+        + "<strong>Tema:</strong> " + html.escape(n.tema or "—")
+        + "</p>"
+        + (("<div class='section'>" + btns_html + "</div>") if btns_html else "")
+        + "<div class='section'><strong>Fontes oficiais:</strong> " + _links_oficiais(n) + "</div>"
+        + (("<div class='section'><strong>Alterações que ESTE ato faz:</strong> " + SEP.join(altera) + "</div>") if altera else "")
+        + (("<div class='section'><strong>Este ato foi ALTERADO por:</strong> " + SEP.join(alterado_por) + "</div>") if alterado_por else "")
+        + (("<div class='section'><strong>Alterado indiretamente por (cadeia de alterações):</strong> " + SEP.join(cadeia) + "</div>") if cadeia else "")
+        + (("<div class='section'><strong>Legislação correlata:</strong> " + SEP.join(correlatas) + "</div>") if correlatas else "")
+        + "<hr><p><em>Texto compilado</em> e histórico virão aqui em versões futuras.</p>"
+        + meta_table
     )
 
 
-def build_site(norms_json: str, out_dir: str) -> None:
+# ----------------- renderização (sequencial ou em processos) -----------------
+
+def _render_pages(items: list[tuple[int, Norm]], out_dir: str, graph: dict,
+                  prev_pages: dict[str, str]) -> list[tuple[str, str, str, bool]]:
+    """Renderiza e grava as páginas cujo digest mudou -> [(slug, hash, digest, gravou)]."""
+    out = Path(out_dir)
+    results: list[tuple[str, str, str, bool]] = []
+    for i, n in items:
+        inputs = _page_inputs(n, i, graph)
+        rh = norm_hash(n)
+        digest = _sha(json.dumps([rh, inputs], ensure_ascii=False))
+        target = out / (inputs["slug"] + ".html")
+        wrote = prev_pages.get(inputs["slug"]) != digest or not target.exists()
+        if wrote:
+            target.write_text(_render_detail(n, inputs), encoding="utf-8")
+        results.append((inputs["slug"], rh, digest, wrote))
+    return results
+
+
+# estado somente-leitura de cada worker (out_dir, graph, prev_pages)
+_WORKER_CTX: tuple = ()
+
+
+def _init_render_worker(out_dir: str, graph: dict, prev_pages: dict[str, str]) -> None:
+    global _WORKER_CTX
+    _WORKER_CTX = (out_dir, graph, prev_pages)
+
+
+def _render_chunk(items: list[tuple[int, Norm]]) -> list[tuple[str, str, str, bool]]:
+    return _render_pages(items, *_WORKER_CTX)
+
+
+def build_site(norms_json: str, out_dir: str, full: bool = False, jobs: int = 1, changes_dir: str | None = None) -> dict:
+    """
+    Gera o site em OUT_DIR. Com o manifesto de build (MANIFEST_NAME) só
+    regrava as páginas cujas entradas mudaram e remove páginas órfãs;
+    full=True ignora o manifesto anterior. jobs>1 renderiza as páginas de
+    detalhe em processos (mesma saída, byte a byte). Com CHANGES_DIR (estado
+    entre publicações), grava o delta da versão anterior em OUT/changes/. Ao
+    fim, grava os .gz/.br dos arquivos que mudaram. Retorna contagens e o
+    relatório de tamanhos.
+    """
     out = Path(out_dir)
     out.mkdir(parents=True, exist_ok=True)
 
-    norms: list[dict] = []
-    p = Path(norms_json)
-    if p.exists():
-        norms = json.loads(p.read_text(encoding="utf-8"))
-
-    # índice para relacionar por slug/identificação
-    slug_by_key: dict[str, str] = {}
-    for n in norms:
-        s = _safe_slug(n.get("slug") or n.get("identificacao") or "")
-        if not s:
-            continue
-        slug_by_key[s] = s
-        ident = (n.get("identificacao") or "").strip().lower()
-        if ident:
-            slug_by_key[ident] = s
+    with metrics.stage("publish.leitura") as st:
+        norms = load_corpus(norms_json)
+        last = page_items(norms)
+        st["itens"] = len(norms)
+
+    # ===== GRAFO DE RELAÇÕES =====
+    with metrics.stage("publish.grafo", len(last)):
+        graph = graph_for(last)
+        graph_written = write_if_changed(out / GRAPH_NAME, json.dumps(graph, ensure_ascii=False, separators=(",", ":")))
+
+    # ===== ÍNDICE DE BUSCA =====
+    with metrics.stage("publish.indice_busca", len(last)):
+        fields = resolve_fields(norms)
+        # um documento por página (slug repetido: vale o último), na ordem do corpus
+        pages = sorted(last.items(), key=lambda kv: kv[1][0])
+        entries = [(n, slug) for slug, (_, n) in pages]
+        search = build_search_index(entries, out, {k: [v[i - 1] for _, (i, _) in pages] for k, v in fields.items()})
+
+    # ===== FACETAS =====
+    with metrics.stage("publish.facetas", len(last)):
+        facets = build_facets(fields, [(i - 1, slug) for slug, (i, _) in last.items()], out, _css)
+        counts = {f: {e["valor"]: e["n"] for e in entries} for f, entries in facets["facetas"].items()}
+
+    # ===== AUTOCOMPLETE DO ADMIN =====
+    with metrics.stage("publish.autocomplete", len(last)):
+        autocomplete = build_autocomplete(fields, [(i - 1, slug) for slug, (i, _) in last.items()], out)
+
+    # ===== ASSETS (CSS/JS compartilhados, nome com hash do conteúdo) =====
+    with metrics.stage("publish.assets"):
+        assets_written, assets_removed = write_assets(out, _assets())
+    js_href = asset_path("index", "js", _index_js())
 
     # ===== INDEX =====
-    data_js = json.dumps(norms, ensure_ascii=False)
+    t0 = time.perf_counter()
+    # tipos fixos primeiro, depois os demais do corpus; contagens de facets.json
+    tipos = TIPOS_FIXOS + [t for t in counts["tipo"] if t not in TIPOS_FIXOS]
     tipos_check = "".join(
-        "<label class='chip'><input type='checkbox' name='tipo' value='" + html.escape(t) + "'> " + html.escape(t) + "</label>"
-        for t in TIPOS_FIXOS
+        "<label class='chip'><input type='checkbox' name='tipo' value='" + html.escape(t) + "'> " + html.escape(t)
+        + f" <span class='muted'>({counts['tipo'].get(t, 0)})</span></label>"
+        for t in tipos
     )
 
+    def options(facet: str) -> str:
+        return "".join(f"<option value='{html.escape(e['valor'])}'>{html.escape(e['valor'])} ({e['n']})</option>"
+                       for e in facets["facetas"][facet])
+
+    browse = SEP.join(f"<a href='{f}/'>{html.escape(label)}</a>" for f, label in FACETS.items())
+
     index_html = (
         "<!doctype html><meta charset='utf-8'>"
         "<title>banco-normativos-ba</title>"
         f"{_css()}"
         "<h1>Banco de Normativos de Beneficios Assistenciais</h1>"
+        "<p class='muted'>Navegar por: " + browse + "</p>"
         "<div class='panel'>Pesquisa</div>"
         "<div class='search'>"
         "<div class='chips'>" + tipos_check + "</div>"
@@ -108,196 +423,86 @@ def build_site(norms_json: str, out_dir: str) -> None:
         "<div class='col-3'><label>Ano</label><input id='f-ano' type='number' min='1900' max='2100' placeholder='ex: 2025'></div>"
         "<div class='col-6'><label>Argumento (identificação/ementa)</label><input id='f-arg' type='text' placeholder='palavra-chave'></div>"
         "<div class='col-4'><label>Temas</label><input id='f-tema' type='text' placeholder='ex: BPC'></div>"
-        "<div class='col-4'><label>Origem</label><select id='f-origem'><option value=''>—</option></select></div>"
-        "<div class='col-4'><label>Situação</label><select id='f-situacao'><option value=''>—</option></select></div>"
+        "<div class='col-4'><label>Origem</label><select id='f-origem'><option value=''>—</option>" + options("origem") + "</select></div>"
+        "<div class='col-4'><label>Situação</label><select id='f-situacao'><option value=''>—</option>" + options("vigencia") + "</select></div>"
         "<div class='col-12' style='text-align:right'><button id='btn-buscar' class='btn'>Pesquisar</button></div>"
         "</div>"
-        "<table>"
-        "<thead><tr><th>Tipo</th><th>Número</th><th>Data</th><th>Origem</th><th>Situação</th><th>Ementa</th></tr></thead>"
+        "<p id='status' class='muted' aria-live='polite'>Carregando…</p>"
+        # tabela virtualizada: só as linhas da janela visível existem no DOM
+        "<div id='view'><table>"
+        "<colgroup><col style='width:15%'><col style='width:10%'><col style='width:13%'>"
+        "<col style='width:10%'><col style='width:10%'><col></colgroup>"
+        "<thead><tr><th data-col='tipo'>Tipo</th><th data-col='numero'>Número</th><th data-col='data'>Data</th>"
+        "<th data-col='origem'>Origem</th><th data-col='vigencia'>Situação</th><th data-col='ementa'>Ementa</th></tr></thead>"
         "<tbody id='grid'></tbody>"
-        "</table>"
+        "</table></div>"
         "</div>"
-        "<script>"
-        f"const DATA = {data_js};"
-        # utilitários / normalização
-        "function val(x){return (x??'').toString().trim();}"
-        "function norm(s){return (s??'').toString().normalize('NFKD').replace(/[\\u0300-\\u036f]/g,'').toLowerCase().trim();}"
-        "function slug(s){return (s||'').toLowerCase().normalize('NFKD').replace(/[^a-z0-9\\- ]/g,'').replace(/[\\s_]+/g,'-').replace(/-+/g,'-').replace(/^-|-$/g,'');}"
-        "function pickRaw(n,keys){ if(!n||!n.raw) return ''; for(const k of keys){ if(n.raw[k]!=null && String(n.raw[k]).trim()!=='') return String(n.raw[k]).trim(); } return ''; }"
-
-        # helpers robustos: extraem de canônico -> raw -> identificacao
-        "function getIdent(n){return val(n.identificacao) || pickRaw(n,['IDENTIFICAÇÃO','Identificação','Identificacao','identificação','Ident.']);}"
-
-        "function inferTipoFromIdent(id){const s=norm(id); const map=["
-        "['portaria interministerial','Portaria Interministerial'],['portaria conjunta','Portaria Conjunta'],['portaria inss','Portaria INSS'],['portaria mds','Portaria MDS'],"
-        "['instrucao normativa','Instrução Normativa'],['instrucao operacional','Instrução Operacional'],['memorando circular','Memorando Circular'],['orientacao interna','Orientação Interna'],"
-        "['medida provisoria','Medida Provisória'],['resolucao','Resolução'],['decreto','Decreto'],['lei','Lei'],['portaria','Portaria']];"
-        "for(const [k,v] of map){ if(s.includes(k)) return v; } return '';}"
-        "function getTipo(n){ return val(n.tipo) || pickRaw(n,['TIPO','Tipo','tipo']) || inferTipoFromIdent(getIdent(n)); }"
-
-        "function inferNumeroFromIdent(id){const m = id.match(/n[ºo]\\s*([0-9\\.\\-\\/]+)/i) || id.match(/\\b(\\d{1,6}[\\./]\\d{4})\\b/); return m ? m[1] : '';}"
-        "function getNumero(n){ return val(n.numero) || pickRaw(n,['NÚMERO','NUMERO','Número','Numero','numero','Nº','No']) || inferNumeroFromIdent(getIdent(n)); }"
-
-        "function getAno(n){ return val(n.ano) || pickRaw(n,['ANO','Ano','ano']) || ((getNumero(n).match(/(\\d{4})$/)||[])[1]||''); }"
-
-        "function getTema(n){ return val(n.tema) || pickRaw(n,['TEMA','Tema','tema','Assunto','Assuntos']); }"
-
-        "function getOrigem(n){ return val(n.origem) || pickRaw(n,['Origem','Órgão','ORIGEM','Orgão','Órgão/Unidade','Órgão emissor','Orgão emissor']); }"
-
-        "function getData(n){"
-        "  return val(n.data) || pickRaw(n,["
-        "    'DATA','Data','data','DATA DE PUBLICAÇÃO','Data de Publicação','DATA DA PUBLICAÇÃO','Publicação','DATA (DOU)','Data DOU','Data publicação'"
-        "  ]);"
-        "}"
-
-        "function getEmenta(n){ return val(n.ementa) || pickRaw(n,['EMENTA','Ementa','Ementa resumida','Ementa (resumo)','Resumo']); }"
-
-        "function mapVigencia(v){"
-        "  const s=norm(v);"
-        "  if(!s) return '';"
-        "  if(s.includes('vigente')||s==='v') return 'Vigente';"
-        "  if(s.includes('revog')||s==='r') return 'Revogada';"
-        "  if(s.includes('suspens')) return 'Suspensa';"
-        "  if(s.includes('nao vigente')||s.includes('não vigente')) return 'Não vigente';"
-        "  return v;"
-        "}"
-        "function getVigencia(n){ return mapVigencia(val(n.vigencia) || pickRaw(n,['VIGÊNCIA','Vigência','SITUAÇÃO','Situação','STATUS','Status'])); }"
-
-        "function unique(xs){return Array.from(new Set(xs.filter(Boolean)));}"
-
-        "function fillOrigem(){"
-        "  const opts = unique(DATA.map(getOrigem)).sort();"
-        "  const sel = document.getElementById('f-origem');"
-        "  opts.forEach(o=>{const op=document.createElement('option');op.value=o;op.textContent=o||'—';sel.appendChild(op);});"
-        "}"
-
-        "function fillSituacao(){"
-        "  const opts = unique(DATA.map(getVigencia)).sort();"
-        "  const sel = document.getElementById('f-situacao');"
-        "  sel.innerHTML = '<option value=\"\">—</option>';"
-        "  opts.forEach(o=>{const op=document.createElement('option');op.value=o;op.textContent=o;sel.appendChild(op);});"
-        "}"
-
-        "function render(rows){"
-        "  const tb=document.getElementById('grid'); tb.innerHTML='';"
-        "  if(rows.length===0){tb.innerHTML='<tr><td colspan=6 class=\"muted\">Nenhum resultado.</td></tr>';return;}"
-        "  rows.forEach(n=>{"
-        "    const id = getIdent(n) || (getTipo(n)+' '+(getNumero(n)||'')+'/'+(getAno(n)||''));"
-        "    const s = slug(n.slug || id);"
-        "    const ementa = getEmenta(n);"
-        "    const numeroTxt = getNumero(n) || id;"
-        "    const linha = '<tr>' +"
-        "      '<td>'+ (getTipo(n)||'') +'</td>' +"
-        "      '<td><a href=\"'+ s +'.html\">'+ numeroTxt +'</a></td>' +"
-        "      '<td>'+ (getData(n)||'') +'</td>' +"
-        "      '<td>'+ (getOrigem(n)||'') +'</td>' +"
-        "      '<td>'+ (getVigencia(n)||'') +'</td>' +"
-        "      '<td>'+ (ementa||'') +'</td>' +"
-        "    '</tr>';"
-        "    tb.insertAdjacentHTML('beforeend', linha);"
-        "  });"
-        "}"
-
-        "function doSearch(){"
-        "  const tipos = Array.from(document.querySelectorAll('input[name=tipo]:checked')).map(i=>norm(i.value));"
-        "  const num = norm(document.getElementById('f-numero').value);"
-        "  const ano = document.getElementById('f-ano').value.trim();"
-        "  const arg = norm(document.getElementById('f-arg').value);"
-        "  const tema = norm(document.getElementById('f-tema').value);"
-        "  const origem = norm(document.getElementById('f-origem').value);"
-        "  const sit = norm(document.getElementById('f-situacao').value);"
-        "  const out = DATA.filter(n=>{"
-        "    const t = norm(getTipo(n));"
-        "    const okTipo = (tipos.length===0) || tipos.includes(t);"
-        "    const okNum = !num || norm(getNumero(n)).includes(num);"
-        "    const okAno = !ano || (getAno(n)===ano);"
-        "    const pack = norm(getIdent(n)+' '+getEmenta(n));"
-        "    const okArg = !arg || pack.includes(arg);"
-        "    const okTema = !tema || norm(getTema(n)).includes(tema);"
-        "    const okOrigem = !origem || norm(getOrigem(n))===origem;"
-        "    const okSit = !sit || norm(getVigencia(n))===sit;"
-        "    return okTipo && okNum && okAno && okArg && okTema && okOrigem && okSit;"
-        "  });"
-        "  render(out);"
-        "}"
-
-        "fillOrigem();"
-        "fillSituacao();"
-        "document.getElementById('btn-buscar').addEventListener('click', doSearch);"
-        "render(DATA);"
-        "</script>"
+        f"<script src='{js_href}' data-v='{search['versao']}' defer></script>"
     )
 
-    (out / "index.html").write_text(index_html, encoding="utf-8")
+    # páginas da publicação anterior: órfãs são removidas mesmo com --full ou
+    # template novo, que só decidem o que é renderizado de novo
+    manifest = _load_manifest(out)
+    published: dict[str, str] = manifest.get("pages") or {}
+    template = _template_hash()
+    prev = {} if full or manifest.get("template") != template else manifest
+    prev_pages: dict[str, str] = prev.get("pages") or {}
+    stats = {"paginas": 0, "gravadas": search["gravados"] + graph_written + facets["gravados"] + assets_written
+             + autocomplete["gravados"],
+             "removidas": facets["removidos"] + assets_removed + autocomplete["removidos"]}
+
+    index_hash = _sha(index_html)
+    if prev.get("index") != index_hash or not (out / "index.html").exists():
+        (out / "index.html").write_text(index_html, encoding="utf-8")
+        stats["gravadas"] += 1
     (out / ".nojekyll").write_text("", encoding="utf-8")
+    metrics.add("publish.index_html", time.perf_counter() - t0, 1)
 
     # ===== DETALHE =====
-    def links_oficiais(n: dict) -> str:
-        links: list[str] = []
-        if (n.get("tipo") or "").lower() in {"lei", "decreto"} and n.get("fonte_planalto"):
-            links.append(_a(n.get("fonte_planalto"), "Ver no Planalto"))
-        if n.get("fonte_dou"):
-            links.append(_a(n.get("fonte_dou"), "Ver no DOU"))
-        if not links:
-            return "<span class='muted'>—</span>"
-        return SEP.join(links)
-
-    for i, n in enumerate(norms, start=1):
-        titulo = n.get("identificacao") or n.get("slug") or f"Norma {i}"
-        slug = _safe_slug(n.get("slug") or titulo, fallback="norma-" + str(i))
-
-        btns: list[str] = []
-        if _is_url(n.get("texto_original")):
-            btns.append(_a(n.get("texto_original"), "Texto original"))
-        if _is_url(n.get("texto_compilado")):
-            btns.append(_a(n.get("texto_compilado"), "Texto compilado"))
-        btns_html = " ".join(btns)
-
-        def _resolve_list(val_) -> list[str]:
-            if not val_:
-                return []
-            items = [x.strip() for x in str(val_).split(";") if x.strip()]
-            out_links: list[str] = []
-            for it in items:
-                key = it.strip().lower()
-                target_slug = slug_by_key.get(key) or slug_by_key.get(_safe_slug(key))
-                label = html.escape(it)
-                if target_slug:
-                    out_links.append(f'<a href="{target_slug}.html">{label}</a>')
-                else:
-                    out_links.append(label)
-            return out_links
-
-        altera = _resolve_list(n.get("altera") or n.get("altera_ids") or n.get("alteracoes"))
-        alterado_por = _resolve_list(n.get("alterado_por") or n.get("alterado_por_ids"))
-        correlatas = _resolve_list(n.get("relacionados") or n.get("legislacao_correlata"))
-
-        # metadados (raw)
-        meta_rows: list[str] = []
-        raw = n.get("raw") or {}
-        raw_cols = n.get("raw_columns") or list(raw.keys())
-        for col in raw_cols:
-            v = raw.get(col, "")
-            cell = _a(v, v) if _is_url(v) else html.escape(str(v))
-            meta_rows.append(f"<tr><th align='left'>{html.escape(col)}</th><td>{cell}</td></tr>")
-        meta_table = "<div class='section'><h3>Metadados da planilha</h3><table>" + "".join(meta_rows) + "</table></div>"
-
-        detail_html = (
-            "<!doctype html><meta charset='utf-8'>"
-            "<title>" + html.escape(titulo) + "</title>"
-            + _css()
-            + '<p><a href="index.html">← Voltar</a></p>'
-            "<h2>" + html.escape(titulo) + "</h2>"
-            "<p><strong>Vigência:</strong> " + html.escape(n.get("vigencia", "") or "—")
-            + SEP
-            + "<strong>Tema:</strong> " + html.escape(n.get("tema", "") or "—")
-            + "</p>"
-            + (("<div class='section'>" + btns_html + "</div>") if btns_html else "")
-            + "<div class='section'><strong>Fontes oficiais:</strong> " + links_oficiais(n) + "</div>"
-            + (("<div class='section'><strong>Alterações que ESTE ato faz:</strong> " + SEP.join(altera) + "</div>") if altera else "")
-            + (("<div class='section'><strong>Este ato foi ALTERADO por:</strong> " + SEP.join(alterado_por) + "</div>") if alterado_por else "")
-            + (("<div class='section'><strong>Legislação correlata:</strong> " + SEP.join(correlatas) + "</div>") if correlatas else "")
-            + "<hr><p><em>Texto compilado</em> e histórico virão aqui em versões futuras.</p>"
-            + meta_table
-        )
-        (out / (slug + ".html")).write_text(detail_html, encoding="utf-8")
+    items = list(last.values())
+    ctx = (str(out), graph, prev_pages)
+    with metrics.stage("publish.paginas", len(items)):
+        if jobs > 1 and len(items) > jobs:
+            from concurrent.futures import ProcessPoolExecutor
+
+            size = -(-len(items) // (jobs * 4))
+            chunks = [items[k:k + size] for k in range(0, len(items), size)]
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_init_render_worker, initargs=ctx) as pool:
+                results = [r for chunk in pool.map(_render_chunk, chunks) for r in chunk]
+        else:
+            results = _render_pages(items, *ctx)
+
+    records: dict[str, str] = {}
+    pages: dict[str, str] = {}
+    for slug, rh, digest, wrote in results:
+        records[slug] = rh
+        pages[slug] = digest
+        stats["gravadas"] += wrote
+
+    with metrics.stage("publish.manifesto", len(pages)):
+        for slug in published.keys() - pages.keys():
+            (out / (slug + ".html")).unlink(missing_ok=True)
+            stats["removidas"] += 1
+
+        _write_manifest(out, {
+            "template": template,
+            "index": index_hash,
+            "records": records,
+            "pages": pages,
+        })
+    stats["paginas"] = len(pages)
+
+    # ===== FEED DE MUDANÇAS =====
+    if changes_dir is not None:
+        with metrics.stage("publish.mudancas", len(records)):
+            changes = build_changes({slug: n.to_json() for slug, (_, n) in last.items()}, records, out,
+                                    Path(changes_dir))
+        stats["gravadas"] += changes["gravados"]
+        stats["removidas"] += changes["removidos"]
+        stats["mudancas"] = changes
+
+    # ===== PRÉ-COMPRESSÃO (.gz/.br ao lado de cada HTML/JSON/JS/CSS/Atom) =====
+    with metrics.stage("publish.compressao") as st:
+        stats["tamanhos"] = compress_site(out, jobs)
+        st["itens"] = stats["tamanhos"]["comprimidos"]
+    return stats
@@ -0,0 +1,145 @@
+# bpa/publish/emit_sqlite.py
+from pathlib import Path
+import hashlib
+import json
+import sqlite3
+
+from bpa import corpus
+from bpa.publish import emit_site, graph as graph_mod
+from bpa.publish.emit_site import graph_for, page_items
+from bpa.publish.graph import RELS
+
+SCHEMA_VERSION = "2"
+
+# colunas canônicas gravadas em `norms` (na ordem da tabela)
+COLUMNS = [
+    "slug", "tipo", "numero", "ano", "data", "vigencia", "identificacao", "ementa",
+    "tema", "origem", "fonte_planalto", "fonte_dou", "texto_original", "texto_compilado",
+]
+
+DDL = f"""
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE norms (
+  id INTEGER PRIMARY KEY,
+  slug TEXT NOT NULL UNIQUE,
+  {", ".join(c + " TEXT NOT NULL DEFAULT ''" for c in COLUMNS[1:])}
+);
+CREATE INDEX ix_norms_tipo ON norms(tipo);
+CREATE INDEX ix_norms_ano ON norms(ano);
+CREATE INDEX ix_norms_vigencia ON norms(vigencia);
+CREATE INDEX ix_norms_origem ON norms(origem);
+CREATE INDEX ix_norms_tema ON norms(tema);
+-- arestas altera / alterado_por / relacionados; target_id nulo = referência não resolvida,
+-- derived = 1 para arestas inversas deduzidas pelo grafo
+CREATE TABLE norm_refs (
+  norm_id INTEGER NOT NULL REFERENCES norms(id),
+  rel TEXT NOT NULL,
+  ref TEXT NOT NULL,
+  target_id INTEGER REFERENCES norms(id),
+  derived INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX ix_refs_norm ON norm_refs(norm_id, rel);
+CREATE INDEX ix_refs_target ON norm_refs(target_id, rel);
+-- fecho transitivo de alterado_por (pos = ordem na cadeia)
+CREATE TABLE norm_chain (
+  norm_id INTEGER NOT NULL REFERENCES norms(id),
+  amended_by INTEGER NOT NULL REFERENCES norms(id),
+  pos INTEGER NOT NULL
+);
+CREATE INDEX ix_chain_norm ON norm_chain(norm_id);
+CREATE VIRTUAL TABLE norms_fts USING fts5(
+  identificacao, ementa,
+  content='norms', content_rowid='id',
+  tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+
+def _build_key(corpus_hash: str) -> str:
+    """Corpus + código que decide o conteúdo do banco (este emissor, slugs e grafo)."""
+    h = hashlib.sha256(corpus_hash.encode("ascii"))
+    for m in (emit_site, graph_mod):
+        h.update(Path(m.__file__).read_bytes())
+    h.update(Path(__file__).read_bytes())
+    return h.hexdigest()
+
+
+def _stored_hash(path: Path) -> str:
+    if not path.exists():
+        return ""
+    try:
+        con = sqlite3.connect(path)
+        try:
+            row = con.execute("SELECT value FROM meta WHERE key='build_sha256'").fetchone()
+            ver = con.execute("SELECT value FROM meta WHERE key='schema_version'").fetchone()
+        finally:
+            con.close()
+    except sqlite3.Error:
+        return ""
+    return row[0] if row and ver and ver[0] == SCHEMA_VERSION else ""
+
+
+def build_sqlite(norms_json: str, sqlite_path: str, graph_json: str | None = None) -> bool:
+    """
+    Grava o corpus normalizado em SQLite (tabela norms + índices, arestas em
+    norm_refs, cadeias em norm_chain e busca textual em norms_fts). As
+    relações vêm do graph.json do site (GRAPH_JSON) ou, na falta dele, do
+    mesmo grafo calculado aqui. Retorna False quando o arquivo existente já
+    corresponde ao mesmo norms.json e ao mesmo código do emissor e do grafo.
+    """
+    p = Path(norms_json)
+    if p.exists():
+        with open(p, "rb") as f:
+            corpus_hash = hashlib.file_digest(f, "sha256").hexdigest()
+    else:
+        corpus_hash = hashlib.sha256(b"[]").hexdigest()
+    build_key = _build_key(corpus_hash)
+    dest = Path(sqlite_path)
+    if _stored_hash(dest) == build_key:
+        return False
+
+    norms = corpus.load(p)
+
+    # mesmos slugs do site; slugs repetidos: vale o último
+    by_slug = page_items(norms)
+    g = Path(graph_json) if graph_json else None
+    graph = json.loads(g.read_text(encoding="utf-8")) if g and g.exists() else graph_for(by_slug)
+    id_by_slug = {slug: i for i, slug in enumerate(by_slug, start=1)}
+
+    rows = []
+    edges = []
+    chain = []
+    for slug, (_, n) in by_slug.items():
+        nid = id_by_slug[slug]
+        rows.append((nid, slug, *(getattr(n, c).strip() for c in COLUMNS[1:])))
+        rels = graph["arestas"].get(slug, {})
+        for rel in RELS:
+            for label, target, derived in rels.get(rel, []):
+                edges.append((nid, rel, label, id_by_slug.get(target) if target else None, derived))
+        for pos, other in enumerate(graph["cadeias"].get(slug, [])):
+            if other in id_by_slug:
+                chain.append((nid, id_by_slug[other], pos))
+
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(dest.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+    con = sqlite3.connect(tmp)
+    try:
+        with con:
+            con.executescript(DDL)
+            con.executemany(
+                f"INSERT INTO norms (id, {', '.join(COLUMNS)}) VALUES ({', '.join('?' * (len(COLUMNS) + 1))})",
+                rows,
+            )
+            con.executemany("INSERT INTO norm_refs (norm_id, rel, ref, target_id, derived) VALUES (?, ?, ?, ?, ?)", edges)
+            con.executemany("INSERT INTO norm_chain (norm_id, amended_by, pos) VALUES (?, ?, ?)", chain)
+            con.execute("INSERT INTO norms_fts(norms_fts) VALUES ('rebuild')")
+            con.executemany(
+                "INSERT INTO meta (key, value) VALUES (?, ?)",
+                [("schema_version", SCHEMA_VERSION), ("corpus_sha256", corpus_hash),
+                 ("build_sha256", build_key), ("norms", str(len(rows)))],
+            )
+    finally:
+        con.close()
+    tmp.replace(dest)
+    return True
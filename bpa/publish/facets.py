@@ -0,0 +1,191 @@
+# bpa/publish/facets.py
+import html
+import json
+import re
+from pathlib import Path
+from typing import Callable
+
+from bpa.publish.search_index import fold
+from bpa.publish.util import safe_slug, write_if_changed
+
+FACETS_NAME = "facets.json"
+
+# faceta -> rótulo; cada uma vira um diretório do site (tipo/, ano/, ...)
+FACETS = {
+    "tipo": "Tipo",
+    "ano": "Ano",
+    "tema": "Tema",
+    "origem": "Origem",
+    "vigencia": "Situação",
+}
+PAGE_SIZE = 100
+
+_ISO_DATE_RE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+_BR_DATE_RE = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})")
+
+
+def value_slug(value: str) -> str:
+    return safe_slug(fold(value), fallback="valor")
+
+
+def _date_key(data: str, ano: str) -> tuple[int, int, int]:
+    """(ano, mês, dia) de DATA (ISO ou dd/mm/aaaa); sem data legível vale ANO; sem nenhum, (0, 0, 0)."""
+    data = data.strip()
+    if m := _ISO_DATE_RE.match(data):
+        return int(m.group(1)), int(m.group(2)), int(m.group(3))
+    if m := _BR_DATE_RE.match(data):
+        return int(m.group(3)), int(m.group(2)), int(m.group(1))
+    ano = ano.strip()
+    return (int(ano), 0, 0) if ano.isdigit() else (0, 0, 0)
+
+
+def count_facets(fields: dict[str, list[str]], ids: list[int]) -> dict[str, dict[str, list[int]]]:
+    """
+    Numa passada sobre os registros IDS (posições em FIELDS, de
+    resolve_fields): faceta -> valor -> posições. Valores vazios ficam de fora.
+    """
+    groups: dict[str, dict[str, list[int]]] = {f: {} for f in FACETS}
+    cols = [(groups[f], fields[f]) for f in FACETS]
+    for i in ids:
+        for g, col in cols:
+            v = col[i].strip()
+            if v:
+                g.setdefault(v, []).append(i)
+    return groups
+
+
+def _ordered(facet: str, values: dict[str, list[int]]) -> list[str]:
+    if facet == "ano":
+        # mais recente primeiro; anos malformados no fim, em ordem alfabética
+        return sorted(values, key=lambda v: (not v.isdigit(), -int(v) if v.isdigit() else 0, v))
+    return sorted(values, key=lambda v: (-len(values[v]), fold(v)))
+
+
+def _slugs(facet_values: list[str]) -> dict[str, str]:
+    """Valor -> slug do diretório; valores que colidem ganham sufixo -2, -3..."""
+    out: dict[str, str] = {}
+    taken: set[str] = set()
+    for v in sorted(facet_values):
+        base = slug = value_slug(v)
+        k = 2
+        while slug in taken:
+            slug = f"{base}-{k}"
+            k += 1
+        taken.add(slug)
+        out[v] = slug
+    return out
+
+
+def _rows(ids: list[int], f: dict[str, list[str]], slugs: dict[int, str], prefix: str) -> str:
+    out = []
+    for i in ids:
+        label = f["numero"][i] or f["identificacao"][i] or f"{f['tipo'][i]} /{f['ano'][i]}"
+        out.append(
+            "<tr>"
+            f"<td>{html.escape(f['tipo'][i])}</td>"
+            f"<td><a href=\"{html.escape(prefix + slugs[i])}.html\">{html.escape(label)}</a></td>"
+            f"<td>{html.escape(f['data'][i])}</td>"
+            f"<td>{html.escape(f['origem'][i])}</td>"
+            f"<td>{html.escape(f['vigencia'][i])}</td>"
+            f"<td>{html.escape(f['ementa'][i])}</td>"
+            "</tr>"
+        )
+    return "".join(out)
+
+
+def _listing_page(css: Callable[[str], str], facet: str, value: str, count: int, page: int, pages: int, rows: str) -> str:
+    # página 1 em <faceta>/<valor>/, página k em <faceta>/<valor>/<k>/
+    prefix = "../../" if page == 1 else "../../../"
+    here = "" if page == 1 else "../"
+    label = FACETS[facet]
+    nav = []
+    if page > 1:
+        prev = here if page == 2 else f"{here}{page - 1}/"
+        nav.append(f"<a rel='prev' href='{prev}'>← Anterior</a>")
+    nav.append(f"Página {page} de {pages}")
+    if page < pages:
+        nav.append(f"<a rel='next' href='{here}{page + 1}/'>Próxima →</a>")
+    title = f"{label}: {value}" + (f" — página {page}" if page > 1 else "")
+    return (
+        "<!doctype html><meta charset='utf-8'>"
+        f"<title>{html.escape(title)}</title>"
+        + css(prefix)
+        + f"<p><a href='{prefix}index.html'>← Pesquisa</a> · <a href='{prefix}{facet}/'>{html.escape(label)}: todos</a></p>"
+        f"<h2>{html.escape(label)}: {html.escape(value)}</h2>"
+        f"<p class='muted'>{count} ato(s)</p>"
+        "<table>"
+        "<thead><tr><th>Tipo</th><th>Número</th><th>Data</th><th>Origem</th><th>Situação</th><th>Ementa</th></tr></thead>"
+        f"<tbody>{rows}</tbody>"
+        "</table>"
+        f"<p class='btns'>{' · '.join(nav)}</p>"
+    )
+
+
+def _facet_index(css: Callable[[str], str], facet: str, entries: list[dict]) -> str:
+    label = FACETS[facet]
+    items = "".join(
+        f"<li><a href='{e['slug']}/'>{html.escape(e['valor'])}</a> <span class='muted'>({e['n']})</span></li>"
+        for e in entries
+    )
+    return (
+        "<!doctype html><meta charset='utf-8'>"
+        f"<title>{html.escape(label)}</title>"
+        + css("../")
+        + "<p><a href='../index.html'>← Pesquisa</a></p>"
+        f"<h2>{html.escape(label)}</h2>"
+        f"<ul>{items or '<li class=muted>Nenhum valor.</li>'}</ul>"
+    )
+
+
+def build_facets(fields: dict[str, list[str]], items: list[tuple[int, str]], out: Path,
+                 css: Callable[[str], str]) -> dict:
+    """
+    Contagens por tipo/ano/tema/origem/vigência (OUT/facets.json) e as
+    páginas estáticas de cada valor, PAGE_SIZE atos por página, do mais
+    recente ao mais antigo, a partir de (posição em FIELDS, slug da página).
+    CSS(prefixo até a raiz) produz a tag da folha de estilo de cada página.
+    Só regrava arquivos cujo conteúdo mudou e remove listagens de valores
+    que sumiram. Retorna as facetas (valor, slug, n em ordem de exibição) e
+    quantos arquivos foram gravados/removidos.
+    """
+    slugs = dict(items)
+    data, ano = fields["data"], fields["ano"]
+    ids = sorted(slugs, key=lambda i: (_date_key(data[i], ano[i]), -i), reverse=True)
+    groups = count_facets(fields, ids)
+
+    facetas: dict[str, list[dict]] = {}
+    files: dict[str, str] = {}
+    for facet, values in groups.items():
+        value_slugs = _slugs(list(values))
+        entries = []
+        for v in _ordered(facet, values):
+            members = values[v]
+            pages = -(-len(members) // PAGE_SIZE)
+            entries.append({"valor": v, "slug": value_slugs[v], "n": len(members), "paginas": pages})
+            for k in range(pages):
+                chunk = members[k * PAGE_SIZE:(k + 1) * PAGE_SIZE]
+                rel = f"{facet}/{value_slugs[v]}/" + ("" if k == 0 else f"{k + 1}/") + "index.html"
+                depth = "../../" if k == 0 else "../../../"
+                files[rel] = _listing_page(css, facet, v, len(members), k + 1, pages,
+                                           _rows(chunk, fields, slugs, depth))
+        files[f"{facet}/index.html"] = _facet_index(css, facet, entries)
+        facetas[facet] = entries
+
+    files[FACETS_NAME] = json.dumps({"versao": 1, "total": len(ids), "facetas": facetas},
+                                    ensure_ascii=False, separators=(",", ":"))
+    written = sum(write_if_changed(out / rel, text) for rel, text in files.items())
+
+    removed = 0
+    for facet in FACETS:
+        base = out / facet
+        if not base.is_dir():
+            continue
+        for p in sorted(base.rglob("index.html")):
+            if p.relative_to(out).as_posix() not in files:
+                p.unlink()
+                removed += 1
+        # diretórios de valores/páginas que ficaram vazios
+        for d in sorted((d for d in base.rglob("*") if d.is_dir()), key=lambda d: len(d.parts), reverse=True):
+            if not any(d.iterdir()):
+                d.rmdir()
+    return {"facetas": facetas, "gravados": written, "removidos": removed}
@@ -0,0 +1,136 @@
+# bpa/publish/graph.py
+from collections import deque
+import re
+
+from bpa.extract.xlsx_ingest import infer_numero_from_ident, infer_tipo_from_ident, year_from_numero
+from bpa.model import Norm
+from bpa.publish.search_index import fold, resolve_fields
+from bpa.publish.util import safe_slug
+
+GRAPH_NAME = "graph.json"
+
+RELS = ("altera", "alterado_por", "relacionados")
+INVERSE = {"altera": "alterado_por", "alterado_por": "altera", "relacionados": "relacionados"}
+
+_YEAR_RE = re.compile(r"\b(1[89]\d{2}|20\d{2})\b")
+_NUM_SUFFIX_RE = re.compile(r"^(.*?)[/\-](\d{4})$")
+
+
+def _fold_key(s: str) -> str:
+    return " ".join(fold(s).split())
+
+
+def tna_keys(tipo: str, numero: str, ano: str) -> list[str]:
+    """Chaves tipo|número|ano normalizadas (a segunda sem o ano)."""
+    numero = numero.strip()
+    m = _NUM_SUFFIX_RE.match(numero)
+    if m:
+        numero, ano = m.group(1), ano or m.group(2)
+    num = re.sub(r"[^0-9a-z]", "", fold(numero)).lstrip("0")
+    tipo = _fold_key(tipo)
+    if not (tipo and num):
+        return []
+    return [f"{tipo}|{num}|{ano}", f"{tipo}|{num}|"] if ano else [f"{tipo}|{num}|"]
+
+
+def ref_keys(text: str) -> list[str]:
+    """Chaves tipo|número|ano inferidas de uma citação livre ('Lei nº 8.742/1993')."""
+    numero = infer_numero_from_ident(text)
+    ano = year_from_numero(numero)
+    if not ano:
+        years = _YEAR_RE.findall(text)
+        ano = years[-1] if years else ""
+    return tna_keys(infer_tipo_from_ident(text), numero, ano)
+
+
+class Resolver:
+    """Índice identificador normalizado -> slug."""
+
+    def __init__(self, items: list[tuple[str, Norm]]):
+        self.exact: dict[str, str] = {}
+        self.folded: dict[str, str] = {}
+        self.tna: dict[str, str | None] = {}
+        f = resolve_fields([n for _, n in items])
+        for j, (slug, n) in enumerate(items):
+            self.exact.setdefault(slug, slug)
+            ident = n.identificacao.strip()
+            if ident:
+                self.exact[ident.lower()] = slug
+                self.folded[_fold_key(ident)] = slug
+            for key in tna_keys(f["tipo"][j], f["numero"][j], f["ano"][j]):
+                # chave ambígua (dois atos) não resolve nada
+                self.tna[key] = slug if self.tna.get(key, slug) == slug else None
+
+    def resolve(self, label: str) -> str | None:
+        key = label.strip().lower()
+        hit = self.exact.get(key) or self.exact.get(safe_slug(key)) or self.folded.get(_fold_key(label))
+        if hit:
+            return hit
+        for k in ref_keys(label):
+            if self.tna.get(k):
+                return self.tna[k]
+        return None
+
+
+def build_graph(items: list[tuple[str, Norm]], titles: dict[str, str]) -> dict:
+    """
+    Grafo de relações a partir de (slug da página, registro), um por slug.
+    Cada lista de referências é lida e resolvida uma única vez; as arestas
+    inversas (altera <-> alterado_por, relacionados simétrico) são derivadas
+    e "cadeias" guarda o fecho transitivo de alterado_por de cada ato.
+
+    Formato (também o de graph.json):
+      nos:      slug -> título
+      arestas:  slug -> rel -> [[rótulo, slug de destino | None, derivada 0/1]]
+      cadeias:  slug -> [slugs que o alteram direta ou indiretamente]
+    """
+    resolver = Resolver(items)
+    adj: dict[str, dict[str, list[list]]] = {}
+    seen: dict[str, dict[str, set]] = {}
+
+    def add(src: str, rel: str, label: str, target: str | None, derived: int) -> None:
+        if target is not None:
+            s = seen.setdefault(src, {}).setdefault(rel, set())
+            if target in s:
+                return
+            s.add(target)
+        adj.setdefault(src, {}).setdefault(rel, []).append([label, target, derived])
+
+    declared: list[tuple[str, str, str | None]] = []
+    for slug, n in items:
+        for rel in RELS:
+            for label in n.refs(rel):
+                target = resolver.resolve(label)
+                add(slug, rel, label, target, 0)
+                if target is not None and target != slug:
+                    declared.append((slug, rel, target))
+    for src, rel, target in declared:
+        add(target, INVERSE[rel], titles.get(src, src), src, 1)
+
+    cadeias: dict[str, list[str]] = {}
+    for slug in adj:
+        direct = [t for _, t, _ in adj[slug].get("alterado_por", []) if t]
+        if not direct:
+            continue
+        order: list[str] = []
+        visited = {slug}
+        queue = deque(direct)
+        while queue:
+            cur = queue.popleft()
+            if cur in visited:
+                continue
+            visited.add(cur)
+            order.append(cur)
+            queue.extend(t for _, t, _ in adj.get(cur, {}).get("alterado_por", []) if t)
+        cadeias[slug] = order
+
+    return {"versao": 1, "nos": titles, "arestas": adj, "cadeias": cadeias}
+
+
+def page_refs(graph: dict, slug: str) -> dict:
+    """Seções de relacionamento da página de SLUG: [(rótulo, slug | None)]."""
+    rels = graph["arestas"].get(slug, {})
+    out = {rel: [(label, target) for label, target, _ in rels.get(rel, [])] for rel in RELS}
+    direct = {t for _, t in out["alterado_por"] if t}
+    out["cadeia"] = [(graph["nos"].get(s, s), s) for s in graph["cadeias"].get(slug, []) if s not in direct]
+    return out
@@ -0,0 +1,225 @@
+# bpa/publish/search_index.py
+from pathlib import Path
+import hashlib
+import json
+import re
+import unicodedata
+
+from bpa.extract.xlsx_ingest import canonical_columns
+from bpa.model import Norm
+from bpa.publish.util import write_if_changed
+
+SEARCH_DIR = "search"
+
+# docs.json é colunar: listas paralelas por campo; os campos de DICT_FIELDS
+# vão como códigos inteiros para o vocabulário em "dict"
+DICT_FIELDS = ["tipo", "origem", "vigencia", "tema"]
+_CANON_KEYS = ["identificacao", "tipo", "numero", "ano", "vigencia", "data", "origem", "tema", "ementa"]
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Web Worker da página de pesquisa (search/worker.js): carrega docs.json e os
+# shards, filtra (com as regras de doSearch) e ordena fora da thread da
+# página. Mensagens:
+#   -> {tipo:'buscar', q, f:{tipos,numero,ano,arg,tema,origem,situacao}, sort:{col,dir}, ate}
+#      (origem e situacao pelo valor, como nas opções geradas de facets.json)
+#   <- {tipo:'resultado', q, n, de:0, linhas}      (as primeiras ATE linhas)
+#   -> {tipo:'linhas', de, ate}   <- {tipo:'linhas', q, de, linhas}
+# linha = [slug, rótulo, tipo, data, origem, situação, ementa]. Uma busca cujos
+# filtros só estreitam os da anterior (texto acrescentado ao fim) filtra o
+# resultado anterior em vez do corpus inteiro.
+WORKER_JS = r"""const V = new URLSearchParams(self.location.search).get('v') || '';
+const SHARDS = new Set(), SHARD_CACHE = new Map(), RANK = {};
+const COLLATOR = new Intl.Collator('pt-BR', {numeric: true, sensitivity: 'base'});
+let D = null, LAST = null, CUR = [], CURQ = -1, REQ = -1;
+const READY = fetch('docs.json?v=' + V).then(r => r.json()).then(p => {
+  D = p;
+  p.shards.forEach(k => SHARDS.add(k));
+  postMessage({tipo: 'pronto', n: D.n});
+});
+
+function norm(s){return (s??'').toString().normalize('NFKD').replace(/[\u0300-\u036f]/g,'').toLowerCase().trim();}
+function tokens(s){return norm(s).match(/[a-z0-9]+/g)||[];}
+function codesWhere(field, pred){
+  const out = new Set();
+  D.dict[field].forEach((v,c)=>{ if(pred(norm(v))) out.add(c); });
+  return out;
+}
+function loadShard(k){
+  if(!SHARDS.has(k)) return Promise.resolve({});
+  if(!SHARD_CACHE.has(k)) SHARD_CACHE.set(k, fetch('idx/'+k+'.json?v='+V).then(r=>r.json()));
+  return SHARD_CACHE.get(k);
+}
+async function matchArg(arg){
+  const toks = Array.from(new Set(tokens(arg)));
+  if(!toks.length) return null;
+  // token de 1 caractere é prefixo de tokens em vários shards
+  const keys = t => t.length > 1 ? [t.slice(0,2)] : [...SHARDS].filter(k=>k.startsWith(t));
+  const shards = await Promise.all(toks.map(t=>Promise.all(keys(t).map(loadShard))));
+  let acc = null;
+  toks.forEach((t,j)=>{
+    const ids = new Set();
+    for(const shard of shards[j])
+      for(const k in shard){ if(k.startsWith(t)) for(const i of shard[k]) ids.add(i); }
+    acc = acc===null ? ids : new Set([...acc].filter(i=>ids.has(i)));
+  });
+  return acc;
+}
+// F só estreita P: mesmos filtros exatos e textos de P com algo acrescentado
+function refines(f, p){
+  return f.tipos.join('\n') === p.tipos.join('\n') && f.ano === p.ano
+    && f.origem === p.origem && f.situacao === p.situacao
+    && f.arg.startsWith(p.arg) && f.numero.startsWith(p.numero) && f.tema.startsWith(p.tema);
+}
+async function filter(f){
+  const argIds = await matchArg(f.arg);
+  const tipoSet = f.tipos.length ? codesWhere('tipo', t=>f.tipos.includes(t)) : null;
+  const temaSet = f.tema ? codesWhere('tema', t=>t.includes(f.tema)) : null;
+  // valor fora do vocabulário = código -1, que nenhum registro tem
+  const o = f.origem==='' ? null : D.dict.origem.indexOf(f.origem);
+  const v = f.situacao==='' ? null : D.dict.vigencia.indexOf(f.situacao);
+  const c = D.cols, from = LAST && refines(f, LAST.f) ? LAST.ids : null, out = [];
+  const n = from ? from.length : D.n;
+  for(let k=0;k<n;k++){
+    const i = from ? from[k] : k;
+    if(argIds!==null && !argIds.has(i)) continue;
+    if(tipoSet && !tipoSet.has(c.tipo[i])) continue;
+    if(o!==null && c.origem[i]!==o) continue;
+    if(v!==null && c.vigencia[i]!==v) continue;
+    if(temaSet && !temaSet.has(c.tema[i])) continue;
+    if(f.ano && c.ano[i]!==f.ano) continue;
+    if(f.numero && !norm(c.numero[i]).includes(f.numero)) continue;
+    out.push(i);
+  }
+  return out;
+}
+const KEYS = {
+  tipo: i=>D.dict.tipo[D.cols.tipo[i]],
+  numero: i=>D.cols.numero[i],
+  data: i=>D.cols.data[i],
+  origem: i=>D.dict.origem[D.cols.origem[i]],
+  vigencia: i=>D.dict.vigencia[D.cols.vigencia[i]],
+  ementa: i=>D.cols.ementa[i],
+};
+// posição de cada registro na ordem da coluna, calculada uma vez por coluna
+function rank(col){
+  if(!RANK[col]){
+    const key = KEYS[col], ks = Array.from({length:D.n}, (_,i)=>key(i));
+    const ids = Array.from({length:D.n}, (_,i)=>i).sort((a,b)=>COLLATOR.compare(ks[a],ks[b]) || a-b);
+    const r = new Int32Array(D.n);
+    ids.forEach((i,p)=>{ r[i] = p; });
+    RANK[col] = r;
+  }
+  return RANK[col];
+}
+function row(i){
+  const c = D.cols, d = D.dict;
+  return [c.slug[i], c.rotulo[i], d.tipo[c.tipo[i]], c.data[i], d.origem[c.origem[i]], d.vigencia[c.vigencia[i]], c.ementa[i]];
+}
+onmessage = async e => {
+  const m = e.data;
+  await READY;
+  if(m.tipo === 'buscar'){
+    REQ = m.q;
+    const ids = await filter(m.f);
+    if(m.q !== REQ) return;  // substituída enquanto os shards carregavam
+    LAST = {f: m.f, ids};
+    let cur = ids;
+    if(m.sort && KEYS[m.sort.col]){
+      const r = rank(m.sort.col), dir = m.sort.dir < 0 ? -1 : 1;
+      cur = ids.slice().sort((a,b)=>(r[a]-r[b])*dir);
+    }
+    CUR = cur; CURQ = m.q;
+    postMessage({tipo: 'resultado', q: CURQ, n: CUR.length, de: 0, linhas: CUR.slice(0, m.ate).map(row)});
+  } else if(m.tipo === 'linhas'){
+    postMessage({tipo: 'linhas', q: CURQ, de: m.de, linhas: CUR.slice(m.de, m.ate).map(row)});
+  }
+};
+"""
+
+
+def fold(s: str | None) -> str:
+    """Minúsculas sem acentos (mesma regra do norm() da página)."""
+    s = unicodedata.normalize("NFKD", str(s or ""))
+    return "".join(c for c in s if not unicodedata.combining(c)).lower()
+
+
+def tokenize(s: str | None) -> list[str]:
+    return _TOKEN_RE.findall(fold(s))
+
+
+def shard_key(token: str) -> str:
+    # prefixo de 2 caracteres; tokens de 1 caractere ficam em shard próprio
+    return token[:2]
+
+
+def resolve_fields(norms: list[Norm]) -> dict[str, list[str]]:
+    """
+    Campos canônicos resolvidos uma vez no build, com as mesmas regras do
+    ingest (tipo/número/ano inferidos da identificação, vigência mapeada).
+    """
+    if not norms:
+        return {k: [] for k in _CANON_KEYS}
+    rows = [[getattr(n, k) for k in _CANON_KEYS] for n in norms]
+    return canonical_columns(rows, {k: i for i, k in enumerate(_CANON_KEYS)})
+
+
+def _encode(values: list[str]) -> tuple[list[str], list[int]]:
+    vocab = sorted(set(values))
+    code = {v: i for i, v in enumerate(vocab)}
+    return vocab, [code[v] for v in values]
+
+
+def build_search_index(entries: list[tuple[Norm, str]], out: Path, fields: dict[str, list[str]] | None = None) -> dict:
+    """
+    Grava em OUT/search/ a tabela colunar de resultados (docs.json) e o índice
+    invertido token -> ids (idx/<prefixo>.json), a partir de (registro, slug
+    da página). Só regrava arquivos cujo conteúdo mudou. Retorna a versão do
+    índice (usada para invalidar cache no navegador) e quantos arquivos mudaram.
+    FIELDS = resolve_fields() dos mesmos registros, se já calculado.
+    """
+    base = out / SEARCH_DIR
+    f = fields if fields is not None else resolve_fields([n for n, _ in entries])
+    cols: dict[str, list] = {
+        "slug": [slug for _, slug in entries],
+        # texto do link na tabela: número, senão identificação, senão "tipo /ano"
+        "rotulo": [num or ident or f"{tipo} /{ano}"
+                   for num, ident, tipo, ano in zip(f["numero"], f["identificacao"], f["tipo"], f["ano"])],
+        "numero": f["numero"],
+        "ano": f["ano"],
+        "data": f["data"],
+        "ementa": f["ementa"],
+    }
+    vocab: dict[str, list[str]] = {}
+    for k in DICT_FIELDS:
+        vocab[k], cols[k] = _encode(f[k])
+
+    postings: dict[str, list[int]] = {}
+    for doc_id, (ident, ementa) in enumerate(zip(f["identificacao"], f["ementa"])):
+        for tok in set(tokenize(ident + " " + ementa)):
+            postings.setdefault(tok, []).append(doc_id)
+
+    shards: dict[str, dict[str, list[int]]] = {}
+    for tok in sorted(postings):
+        shards.setdefault(shard_key(tok), {})[tok] = postings[tok]
+
+    files = {"worker.js": WORKER_JS, "docs.json": json.dumps(
+        {"n": len(entries), "cols": cols, "dict": vocab, "shards": sorted(shards)},
+        ensure_ascii=False, separators=(",", ":"),
+    )}
+    for key, table in shards.items():
+        files[f"idx/{key}.json"] = json.dumps(table, separators=(",", ":"))
+
+    version = hashlib.sha256()
+    written = 0
+    for name in sorted(files):
+        version.update(name.encode("utf-8") + b"\0" + files[name].encode("utf-8"))
+        written += write_if_changed(base / name, files[name])
+
+    idx_dir = base / "idx"
+    if idx_dir.exists():
+        for p in idx_dir.glob("*.json"):
+            if p.stem not in shards:
+                p.unlink()
+                written += 1
+    return {"versao": version.hexdigest()[:12], "gravados": written}
@@ -0,0 +1,22 @@
+# bpa/publish/util.py
+"""Utilitários dos geradores do site (páginas, índices, facetas, autocomplete, mudanças)."""
+from pathlib import Path
+import re
+
+
+def safe_slug(s: str | None, fallback: str = "norma") -> str:
+    """Slug de URL: minúsculas, [a-z0-9-], sem hífens repetidos nas bordas."""
+    s = (s or "").lower()
+    s = re.sub(r"[^a-z0-9\-]+", "-", s)
+    s = s.replace("/", "-").replace("\\", "-").replace(".", "-")
+    s = re.sub(r"-{2,}", "-", s).strip("-")
+    return s or fallback
+
+
+def write_if_changed(path: Path, text: str) -> bool:
+    """Grava TEXT em PATH só se o conteúdo mudou (mtime preservado); True se gravou."""
+    if path.exists() and path.read_text(encoding="utf-8") == text:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return True
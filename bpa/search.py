@@ -0,0 +1,249 @@
+# bpa/search.py
+"""
+Busca offline no corpus (bpa search), com os filtros da página de pesquisa:
+tipo, número, ano, argumento (identificação/ementa), tema, origem e situação.
+
+O índice é montado uma vez por processo: colunas canônicas resolvidas como
+no publish (resolve_fields), tokens sem acento -> ids separados por campo
+(identificação e ementa) e, para tipo/ano/vigência/origem, um bitmap (int)
+por valor normalizado; número e tema, filtrados por trecho, guardam os ids
+de cada valor. Filtros viram AND de bitmaps; o argumento casa por prefixo
+de token, como matchArg() da página.
+
+Ordenação: tokens do argumento achados na identificação valem mais que na
+ementa, e token inteiro mais que prefixo; empates (e buscas sem argumento)
+vão do ato mais recente ao mais antigo. Um resultado por página do site: com
+slugs repetidos vale o último registro, como no publish.
+
+Com cache_dir, o índice é gravado em CACHE_DIR/search/<chave>.json, com
+chave = sha256 do corpus + versão deste código; consultas seguintes sobre o
+mesmo norms.json só leem esse arquivo.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Iterable, Iterator, NamedTuple
+import hashlib
+import json
+import os
+
+from bpa import corpus
+from bpa.extract import xlsx_ingest
+from bpa.publish import emit_site, search_index
+from bpa.publish.emit_site import page_items
+from bpa.publish.search_index import fold, resolve_fields, tokenize
+
+CACHE_SUBDIR = "search"
+
+# colunas de cada resultado (as da tabela da página + identificação/tema)
+COLUMNS = ("slug", "tipo", "numero", "ano", "data", "vigencia", "origem", "tema", "identificacao", "ementa")
+# filtros de igualdade (valor normalizado) e de trecho (substring normalizada)
+EQ_FACETS = ("tipo", "ano", "vigencia", "origem")
+SUBSTR_FACETS = ("numero", "tema")
+# peso do campo em que o token do argumento aparece
+FIELD_WEIGHTS = {"identificacao": 2, "ementa": 1}
+
+
+class Query(NamedTuple):
+    arg: str = ""
+    tipos: tuple[str, ...] = ()
+    numero: str = ""
+    ano: str = ""
+    tema: str = ""
+    origem: str = ""
+    situacao: str = ""
+
+    @classmethod
+    def from_json(cls, d: dict[str, Any]) -> "Query":
+        """Consulta de um lote (--batch): chaves como as opções da CLI; "tipo" aceita texto ou lista."""
+        tipos = d.get("tipo") or d.get("tipos") or ()
+        if isinstance(tipos, str):
+            tipos = (tipos,)
+        return cls(
+            arg=str(d.get("arg") or d.get("argumento") or ""),
+            tipos=tuple(str(t) for t in tipos),
+            numero=str(d.get("numero") or ""),
+            ano=str(d.get("ano") or ""),
+            tema=str(d.get("tema") or ""),
+            origem=str(d.get("origem") or ""),
+            situacao=str(d.get("situacao") or d.get("vigencia") or ""),
+        )
+
+
+def _bitmap(ids: Iterable[int], n: int) -> int:
+    bits = bytearray((n + 7) // 8)
+    for i in ids:
+        bits[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(bits, "little")
+
+
+def _ids(bitmap: int) -> Iterator[int]:
+    """Posições dos bits ligados, em ordem crescente."""
+    for j, byte in enumerate(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")):
+        while byte:
+            low = byte & -byte
+            yield (j << 3) + low.bit_length() - 1
+            byte ^= low
+
+
+class SearchIndex:
+    """Índice em memória do corpus; construído por build() ou lido do cache (load_index)."""
+
+    def __init__(self, cols: dict[str, list[str]], postings: dict[str, dict[str, list[int]]]):
+        self.cols = cols
+        self.n = len(cols["slug"])
+        self.postings = postings
+        self._tokens = {f: sorted(p) for f, p in postings.items()}
+        self.all = (1 << self.n) - 1
+        # igualdade: um bitmap por valor normalizado (vocabulário pequeno)
+        self.facets: dict[str, dict[str, int]] = {}
+        for f in EQ_FACETS:
+            self.facets[f] = {v: _bitmap(ids, self.n) for v, ids in self._groups(f).items()}
+        # trecho: valores distintos podem ser muitos (números); ids viram bitmap só na consulta
+        self.values = {f: self._groups(f) for f in SUBSTR_FACETS}
+
+    def _groups(self, field: str) -> dict[str, list[int]]:
+        """Valor normalizado -> ids (cada valor distinto é normalizado uma vez)."""
+        raw: dict[str, list[int]] = {}
+        for i, v in enumerate(self.cols[field]):
+            raw.setdefault(v, []).append(i)
+        out: dict[str, list[int]] = {}
+        for v, ids in raw.items():
+            out.setdefault(fold(v).strip(), []).extend(ids)
+        return out
+
+    @classmethod
+    def build(cls, norms: list) -> "SearchIndex":
+        # um resultado por página do site: slugs repetidos, vale o último registro
+        items = sorted(page_items(norms).items(), key=lambda kv: kv[1][0])
+        f = resolve_fields([n for _, (_, n) in items])
+        cols = {k: f[k] for k in COLUMNS if k != "slug"}
+        cols["slug"] = [slug for slug, _ in items]
+        postings: dict[str, dict[str, list[int]]] = {}
+        for field in FIELD_WEIGHTS:
+            table = postings[field] = {}
+            for i, text in enumerate(cols[field]):
+                for tok in set(tokenize(text)):
+                    table.setdefault(tok, []).append(i)
+        return cls(cols, postings)
+
+    def to_json(self) -> dict[str, Any]:
+        return {"cols": self.cols, "postings": self.postings}
+
+    @classmethod
+    def from_json(cls, d: dict[str, Any]) -> "SearchIndex":
+        return cls(d["cols"], d["postings"])
+
+    # ----------------- consulta -----------------
+
+    def _prefix(self, field: str, tok: str) -> Iterator[str]:
+        tokens = self._tokens[field]
+        for k in range(bisect_left(tokens, tok), len(tokens)):
+            if not tokens[k].startswith(tok):
+                break
+            yield tokens[k]
+
+    def _facet(self, field: str, value: str) -> int:
+        return self.facets[field].get(fold(value).strip(), 0)
+
+    def _substring(self, field: str, value: str) -> int:
+        q = fold(value).strip()
+        return _bitmap((i for v, ids in self.values[field].items() if q in v for i in ids), self.n)
+
+    def match(self, q: Query) -> tuple[int, dict[int, int]]:
+        """(bitmap dos registros que passam nos filtros, pontuação por id do argumento)."""
+        hit = self.all
+        if q.tipos:
+            b = 0
+            for t in q.tipos:
+                b |= self._facet("tipo", t)
+            hit &= b
+        for field, value in (("ano", q.ano), ("vigencia", q.situacao), ("origem", q.origem)):
+            if value.strip():
+                hit &= self._facet(field, value)
+        for field, value in (("numero", q.numero), ("tema", q.tema)):
+            if fold(value).strip():
+                hit &= self._substring(field, value)
+
+        scores: dict[int, int] = {}
+        for tok in dict.fromkeys(tokenize(q.arg)):
+            # por token: melhor pontuação de cada registro (campo x inteiro/prefixo)
+            best: dict[int, int] = {}
+            for field, weight in FIELD_WEIGHTS.items():
+                table = self.postings[field]
+                for t in self._prefix(field, tok):
+                    w = weight * (2 if t == tok else 1)
+                    for i in table[t]:
+                        if best.get(i, 0) < w:
+                            best[i] = w
+            hit &= _bitmap(best, self.n)
+            for i, w in best.items():
+                scores[i] = scores.get(i, 0) + w
+        return hit, scores
+
+    def search(self, q: Query, limit: int | None = None) -> list[dict[str, Any]]:
+        hit, scores = self.match(q)
+        data = self.cols["data"]
+        # data ISO decrescente (vazia por último), depois pontuação; sort estável
+        ids = sorted(_ids(hit), key=data.__getitem__, reverse=True)
+        ids.sort(key=lambda i: -scores.get(i, 0))
+        if limit is not None:
+            ids = ids[:limit]
+        return [{**{k: self.cols[k][i] for k in COLUMNS}, "pontos": scores.get(i, 0)} for i in ids]
+
+
+# ----------------- cache em disco -----------------
+
+def _file_sha256(path: Path) -> str:
+    if not path.exists():
+        return hashlib.sha256(b"").hexdigest()
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _cache_key(norms_path: Path) -> str:
+    """Conteúdo do corpus + código que resolve campos, slugs e tokeniza."""
+    key = {
+        "corpus": _file_sha256(norms_path),
+        "code": [_file_sha256(Path(m.__file__)) for m in (search_index, xlsx_ingest, emit_site)] + [_file_sha256(Path(__file__))],
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def load_index(norms_path: str | Path, cache_dir: str | Path | None = None) -> SearchIndex:
+    """
+    Índice de NORMS_PATH (.json ou .ndjson). Com CACHE_DIR, reaproveita o
+    índice gravado para o mesmo conteúdo ou grava um novo (e remove os de
+    versões anteriores do corpus).
+    """
+    p = Path(norms_path)
+    if cache_dir is None:
+        return SearchIndex.build(corpus.load(p))
+    base = Path(cache_dir) / CACHE_SUBDIR
+    entry = base / (_cache_key(p) + ".json")
+    try:
+        return SearchIndex.from_json(json.loads(entry.read_text(encoding="utf-8")))
+    except (OSError, ValueError, KeyError):
+        pass
+    index = SearchIndex.build(corpus.load(p))
+    base.mkdir(parents=True, exist_ok=True)
+    tmp = entry.with_name(entry.name + f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(index.to_json(), ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    tmp.replace(entry)
+    for old in base.glob("*.json"):
+        if old != entry:
+            old.unlink(missing_ok=True)
+    return index
+
+
+def format_table(results: list[dict[str, Any]], width: int = 60) -> str:
+    """Tabela de texto com as colunas da página (ementa truncada em WIDTH)."""
+    head = ("Tipo", "Número", "Data", "Origem", "Situação", "Slug", "Ementa")
+    rows = [(r["tipo"], r["numero"], r["data"][:10], r["origem"], r["vigencia"], r["slug"],
+             r["ementa"] if len(r["ementa"]) <= width else r["ementa"][:width - 1] + "…")
+            for r in results]
+    sizes = [max([len(h)] + [len(row[k]) for row in rows]) for k, h in enumerate(head)]
+    lines = ["  ".join(c.ljust(s) for c, s in zip(row, sizes)).rstrip() for row in [head] + rows]
+    lines.insert(1, "  ".join("-" * s for s in sizes))
+    return "\n".join(lines)
@@ -0,0 +1,228 @@
+# bpa/serve.py
+"""
+Servidor local do site (bpa serve) com rebuild incremental e recarga ao vivo.
+
+O watcher faz polling (mtime/tamanho) das planilhas em DATA/*.xlsx, dos
+patches em DATA/patches/ e do norms.json; uma rajada de gravações vira um
+único rebuild (debounce). Só as etapas afetadas rodam:
+
+  planilha alterada / patch alterado ou removido -> ingest (cache) + merge + publish
+  patch novo                                      -> merge + publish
+  norms.json alterado                             -> publish
+
+O publish é o incremental do manifesto (só páginas cujas entradas mudaram)
+e, ao fim, as páginas abertas recebem "reload" por Server-Sent Events.
+"""
+from __future__ import annotations
+
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable
+import importlib.util
+import threading
+import time
+
+from bpa.extract.xlsx_ingest import write_norms_json
+from bpa.publish.emit_site import build_site
+
+EVENTS_PATH = "/__bpa/events"
+# injetado só nas respostas HTML do servidor local; os arquivos em disco não mudam
+RELOAD_SNIPPET = (
+    "<script>new EventSource('" + EVENTS_PATH + "')"
+    ".addEventListener('reload',()=>location.reload());</script>"
+).encode("utf-8")
+
+_MERGE_SCRIPT = Path(__file__).resolve().parents[1] / "scripts" / "merge_patches.py"
+
+
+class Reloader:
+    """Contador de builds; conexões SSE esperam ele mudar."""
+
+    def __init__(self):
+        self.version = 0
+        self._cond = threading.Condition()
+
+    def bump(self) -> None:
+        with self._cond:
+            self.version += 1
+            self._cond.notify_all()
+
+    def wait(self, seen: int, timeout: float) -> int:
+        with self._cond:
+            self._cond.wait_for(lambda: self.version != seen, timeout)
+            return self.version
+
+
+def make_handler(site_dir: Path, reloader: Reloader) -> type:
+    class Handler(SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=str(site_dir), **kwargs)
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def end_headers(self):
+            # o site muda a cada rebuild: nada de cache no navegador
+            self.send_header("Cache-Control", "no-store")
+            super().end_headers()
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0].split("#", 1)[0]
+            if path == EVENTS_PATH:
+                return self._events()
+            target = Path(self.translate_path(path))
+            if target.is_dir():
+                target = target / "index.html"
+            if target.suffix == ".html" and target.is_file():
+                return self._html(target)
+            return super().do_GET()
+
+        def _html(self, target: Path) -> None:
+            body = target.read_bytes() + RELOAD_SNIPPET
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _events(self) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "keep-alive")
+            self.end_headers()
+            seen = reloader.version
+            try:
+                while True:
+                    v = reloader.wait(seen, 15.0)
+                    if v != seen:
+                        self.wfile.write(f"event: reload\ndata: {v}\n\n".encode("utf-8"))
+                        seen = v
+                    else:
+                        self.wfile.write(b": ping\n\n")
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                return
+
+    return Handler
+
+
+def _snapshot(data_dir: Path, norms_json: Path) -> dict[str, tuple[int, int]]:
+    """(mtime_ns, tamanho) de cada arquivo observado, por caminho."""
+    files = [p for p in data_dir.glob("*.xlsx") if not p.name.startswith("~$")]
+    patches = data_dir / "patches"
+    if patches.is_dir():
+        files += [p for p in patches.glob("*.json") if not p.name.startswith(".")]
+    files.append(norms_json)
+    snap = {}
+    for p in files:
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        snap[str(p)] = (st.st_mtime_ns, st.st_size)
+    return snap
+
+
+def classify(old: dict, new: dict, norms_json: Path) -> set[str]:
+    """
+    Etapas a refazer a partir da diferença entre dois snapshots:
+    "ingest" (planilha mudou, ou patch mudou/sumiu), "merge" (patch novo),
+    "publish" (sempre que algo mudou).
+    """
+    steps: set[str] = set()
+    for path in old.keys() | new.keys():
+        if old.get(path) == new.get(path):
+            continue
+        p = Path(path)
+        steps.add("publish")
+        if p.suffix == ".xlsx":
+            steps |= {"ingest", "merge"}
+        elif p.parent.name == "patches" and p != norms_json:
+            # patch editado/removido não se desfaz por merge: reingere e reaplica tudo
+            steps |= {"merge"} if path not in old else {"ingest", "merge"}
+    return steps
+
+
+class Pipeline:
+    """Executa as etapas pedidas por classify() sobre DATA_DIR e OUT_DIR."""
+
+    def __init__(self, norms_json: Path, out_dir: Path, cache_dir: Path | None, log: Callable[[str], None] = print):
+        self.norms_json = norms_json
+        self.data_dir = norms_json.parent
+        self.out_dir = out_dir
+        self.cache_dir = cache_dir
+        self.log = log
+        self._merge = None
+
+    def _merge_patches(self) -> None:
+        if self._merge is None:
+            if not _MERGE_SCRIPT.exists():
+                return
+            spec = importlib.util.spec_from_file_location("merge_patches", _MERGE_SCRIPT)
+            self._merge = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(self._merge)
+        self._merge.main(self.data_dir, self.norms_json)
+
+    def run(self, steps: set[str]) -> dict:
+        t0 = time.perf_counter()
+        if "ingest" in steps and any(p for p in self.data_dir.glob("*.xlsx") if not p.name.startswith("~$")):
+            write_norms_json(self.data_dir, self.norms_json, jobs=1, cache_dir=self.cache_dir)
+        if "merge" in steps and (self.data_dir / "patches").is_dir():
+            self._merge_patches()
+        stats = build_site(str(self.norms_json), str(self.out_dir))
+        stats["segundos"] = round(time.perf_counter() - t0, 3)
+        return stats
+
+
+def watch(pipeline: Pipeline, reloader: Reloader, stop: threading.Event,
+          interval: float = 0.2, debounce: float = 0.3) -> None:
+    """Polling com debounce: rebuild só depois de DEBOUNCE segundos sem novas mudanças."""
+    norms = pipeline.norms_json
+    last = _snapshot(pipeline.data_dir, norms)
+    pending: set[str] = set()
+    changed_at = 0.0
+    while not stop.wait(interval):
+        snap = _snapshot(pipeline.data_dir, norms)
+        if snap != last:
+            pending |= classify(last, snap, norms)
+            last = snap
+            changed_at = time.monotonic()
+            continue
+        if not pending or time.monotonic() - changed_at < debounce:
+            continue
+        steps, pending = pending, set()
+        try:
+            stats = pipeline.run(steps)
+        except Exception as e:  # planilha no meio de uma gravação, JSON inválido...
+            pipeline.log(f">> Rebuild falhou ({', '.join(sorted(steps))}): {e}")
+            continue
+        finally:
+            # as próprias gravações do rebuild (norms.json, ledger) não disparam outro
+            last = _snapshot(pipeline.data_dir, norms)
+        pipeline.log(f">> Rebuild ({', '.join(sorted(steps))}) em {stats['segundos']:.2f}s · "
+                     f"gravadas: {stats['gravadas']} · removidas: {stats['removidas']}")
+        reloader.bump()
+
+
+def serve(norms_json: Path, out_dir: Path, host: str = "127.0.0.1", port: int = 8000, watch_files: bool = False,
+          debounce: float = 0.3, cache_dir: Path | None = None, log: Callable[[str], None] = print) -> None:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    pipeline = Pipeline(norms_json, out_dir, cache_dir, log)
+    if not (out_dir / "index.html").exists() and norms_json.exists():
+        pipeline.run({"publish"})
+    reloader = Reloader()
+    server = ThreadingHTTPServer((host, port), make_handler(out_dir, reloader))
+    server.daemon_threads = True
+    stop = threading.Event()
+    if watch_files:
+        threading.Thread(target=watch, args=(pipeline, reloader, stop), kwargs={"debounce": debounce},
+                         daemon=True).start()
+    log(f">> Servindo {out_dir} em http://{host}:{server.server_address[1]}/"
+        + (f" (observando {pipeline.data_dir})" if watch_files else ""))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
@@ -0,0 +1,325 @@
+# bpa/validate.py
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Callable, Iterable, NamedTuple
+import json
+import re
+
+from bpa.corpus import HEADER_KEY, decode_record, is_ndjson, iter_ndjson, read_headers, records
+from bpa.model import Norm
+from bpa.publish.emit_site import MANIFEST_NAME, norm_hash
+from bpa.publish.graph import Resolver, tna_keys
+from bpa.publish.search_index import fold
+
+# campos de URL checados quanto ao formato (sem acesso à rede)
+URL_FIELDS = ("fonte_dou", "fonte_planalto")
+# relações cujas referências devem apontar para atos do corpus
+REF_RELS = ("altera", "alterado_por")
+
+_URL_RE = re.compile(r"^https?://[^\s/:?#]+\.[^\s/:?#]+(:\d+)?([/?#]\S*)?$")
+
+_TYPES: dict[str, Callable[[Any], bool]] = {
+    "string": lambda v: isinstance(v, str),
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+}
+# palavras-chave sem efeito na validação
+_ANNOTATIONS = {"$schema", "$id", "$comment", "title", "description", "default", "examples", "format"}
+
+Check = Callable[[Any, str, list], None]
+# (posição 0-based, registro) -> checar contra o schema?
+Selector = Callable[[int, Norm], bool]
+
+
+class Violation(NamedTuple):
+    item: int        # posição do registro (1-based; 0 = documento)
+    path: str        # campo dentro do registro
+    message: str
+    level: str = "erro"
+
+    def __str__(self) -> str:
+        where = f"item {self.item}" if self.item else "documento"
+        if self.path:
+            where += f" ({self.path})"
+        return f"[{self.level.upper()}] {where}: {self.message}"
+
+
+def compile_schema(schema: dict) -> Check:
+    """
+    Compila o subconjunto de JSON Schema usado em data/schema.json numa função
+    check(valor, caminho, erros). Palavras-chave não suportadas são recusadas
+    na compilação, para não validarem "em silêncio".
+    """
+    checks: list[Check] = []
+
+    for key in schema:
+        if key not in _ANNOTATIONS and key not in {
+            "type", "required", "properties", "additionalProperties", "items", "enum", "const",
+            "minLength", "maxLength", "pattern", "minimum", "maximum", "minItems", "maxItems",
+        }:
+            raise ValueError(f"schema: palavra-chave não suportada: {key}")
+
+    if "type" in schema:
+        names = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+        preds = [_TYPES[t] for t in names]
+        label = " | ".join(names)
+
+        def check_type(v, path, errs):
+            if not any(p(v) for p in preds):
+                errs.append((path, f"tipo {type(v).__name__}, esperado {label}"))
+        checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = schema["enum"]
+        checks.append(lambda v, path, errs: v in allowed or errs.append((path, f"valor fora de {allowed}")))
+    if "const" in schema:
+        const = schema["const"]
+        checks.append(lambda v, path, errs: v == const or errs.append((path, f"valor diferente de {const!r}")))
+
+    lo, hi = schema.get("minLength"), schema.get("maxLength")
+    rx = re.compile(schema["pattern"]) if "pattern" in schema else None
+    if lo is not None or hi is not None or rx:
+        def check_str(v, path, errs):
+            if not isinstance(v, str):
+                return
+            if lo is not None and len(v) < lo:
+                errs.append((path, "vazio" if lo == 1 else f"menos de {lo} caracteres"))
+            if hi is not None and len(v) > hi:
+                errs.append((path, f"mais de {hi} caracteres"))
+            if rx and not rx.search(v):
+                errs.append((path, f"não casa com /{rx.pattern}/"))
+        checks.append(check_str)
+
+    vmin, vmax = schema.get("minimum"), schema.get("maximum")
+    if vmin is not None or vmax is not None:
+        def check_num(v, path, errs):
+            if not _TYPES["number"](v):
+                return
+            if vmin is not None and v < vmin:
+                errs.append((path, f"menor que {vmin}"))
+            if vmax is not None and v > vmax:
+                errs.append((path, f"maior que {vmax}"))
+        checks.append(check_num)
+
+    if "items" in schema or "minItems" in schema or "maxItems" in schema:
+        item = compile_schema(schema["items"]) if "items" in schema else None
+        imin, imax = schema.get("minItems"), schema.get("maxItems")
+
+        def check_array(v, path, errs):
+            if not isinstance(v, list):
+                return
+            if imin is not None and len(v) < imin:
+                errs.append((path, f"menos de {imin} itens"))
+            if imax is not None and len(v) > imax:
+                errs.append((path, f"mais de {imax} itens"))
+            if item:
+                for i, x in enumerate(v):
+                    item(x, f"{path}[{i}]", errs)
+        checks.append(check_array)
+
+    if {"required", "properties", "additionalProperties"} & schema.keys():
+        required = list(schema.get("required", []))
+        props = {k: compile_schema(s) for k, s in schema.get("properties", {}).items()}
+        extra = schema.get("additionalProperties", True)
+        extra_check = compile_schema(extra) if isinstance(extra, dict) else None
+
+        def check_object(v, path, errs):
+            if not isinstance(v, dict):
+                return
+            for k in required:
+                if k not in v:
+                    errs.append((_join(path, k), "obrigatório ausente"))
+            for k, x in v.items():
+                c = props.get(k)
+                if c:
+                    c(x, _join(path, k), errs)
+                elif extra is False:
+                    errs.append((_join(path, k), "campo não permitido"))
+                elif extra_check:
+                    extra_check(x, _join(path, k), errs)
+        checks.append(check_object)
+
+    def check(v, path, errs):
+        for c in checks:
+            c(v, path, errs)
+    return check
+
+
+def _join(path: str, key: str) -> str:
+    return f"{path}.{key}" if path else key
+
+
+class Validator:
+    """Validador reutilizável: schema compilado uma vez, registros checados numa única passada."""
+
+    def __init__(self, schema: dict):
+        root = dict(schema)
+        # schema do formato 2 descreve o objeto; os registros ficam em properties.normas.items
+        self._container = "items" not in root
+        if self._container:
+            props = dict(root.get("properties") or {})
+            normas = dict(props.get("normas") or {})
+            self._record = compile_schema(normas.pop("items", {}))
+            self._header = compile_schema((props.get("cabecalhos") or {}).get("items", {}))
+            root["properties"] = {**props, "normas": normas}
+        else:
+            self._record = compile_schema(root.pop("items", {}))
+            self._header = compile_schema({})
+        self._root = compile_schema(root)
+
+    @classmethod
+    def from_file(cls, schema_path: str | Path) -> "Validator":
+        return cls(json.loads(Path(schema_path).read_text(encoding="utf-8")))
+
+    def validate(self, doc: Any, changed: set[int] | None = None) -> list[Violation]:
+        """
+        Todas as violações do corpus (sem parar na primeira). Com CHANGED
+        (posições 0-based), schema e URLs só são checados nesses registros;
+        unicidade e referências continuam valendo para o corpus inteiro.
+        Um norms.json no formato 1 (lista) tem só os registros checados.
+        """
+        return self.check(doc, None if changed is None else lambda i, _: i in changed)[0]
+
+    def check(self, doc: Any, select: Selector | None = None) -> tuple[list[Violation], int, int]:
+        """
+        Como validate(), mas SELECT(posição, registro) escolhe os registros
+        checados contra o schema. Retorna (violações, total, checados).
+        """
+        errs: list = []
+        if not (self._container and isinstance(doc, list)):
+            self._root(doc, "", errs)
+        out = [Violation(0, p, m) for p, m in errs]
+        norms = records(doc)
+        if not isinstance(norms, list):
+            return out, 0, 0
+        headers = read_headers(doc) if isinstance(doc, dict) else []
+        found, total, checked = self._check_records(norms, headers, select)
+        return out + found, total, checked
+
+    def check_ndjson(self, path: str | Path, select: Selector | None = None) -> tuple[list[Violation], int, int]:
+        """norms.ndjson numa passada, linha a linha; linhas de cabeçalho checadas contra cabecalhos.items."""
+        head: list[Violation] = []
+        headers: list = []
+
+        def on_header(h: Any, k: int) -> None:
+            errs: list = []
+            self._header(h, "", errs)
+            if isinstance(h, dict) and h.get(HEADER_KEY) != k:
+                errs.append((HEADER_KEY, f"índice {h.get(HEADER_KEY)!r} fora de ordem, esperado {k}"))
+            head.extend(Violation(0, _join(f"cabecalhos[{k}]", p), m) for p, m in errs)
+
+        with open(path, encoding="utf-8") as f:
+            found, total, checked = self._check_records(iter_ndjson(f, headers, on_header), headers, select)
+        return head + found, total, checked
+
+    def _check_records(self, norms: Iterable[Any], headers: list,
+                       select: Selector | None) -> tuple[list[Violation], int, int]:
+        # HEADERS pode crescer durante a iteração (NDJSON: cabeçalho antes dos registros que o usam)
+        out: list[Violation] = []
+        slugs: dict[str, int] = {}
+        idents: dict[str, int] = {}
+        tnas: dict[str, int] = {}
+        models: list[tuple[int, Norm]] = []
+        total = checked = 0
+        for i, n in enumerate(norms):
+            total += 1
+            if not isinstance(n, dict):
+                checked += 1
+                out.append(Violation(i + 1, "", f"tipo {type(n).__name__}, esperado object"))
+                continue
+            m = decode_record(n, headers)
+            if select is None or select(i, m):
+                checked += 1
+                errs: list = []
+                self._record(n, "", errs)
+                out.extend(Violation(i + 1, p, msg) for p, msg in errs)
+                for k in URL_FIELDS:
+                    v = n.get(k)
+                    if isinstance(v, str) and v.strip() and not _URL_RE.match(v.strip()):
+                        out.append(Violation(i + 1, k, f"URL malformada: {v.strip()!r}"))
+                k = n.get("raw_header")
+                if isinstance(k, int):
+                    if not 0 <= k < len(headers):
+                        out.append(Violation(i + 1, "raw_header", f"cabeçalho inexistente: {k}"))
+                    elif len(n.get("raw_values") or []) > len(headers[k][0]):
+                        out.append(Violation(i + 1, "raw_values", f"mais valores que colunas no cabeçalho {k}"))
+            # só o necessário para resolver referências fica em memória
+            m.raw_columns = m.raw_values = None
+            models.append((i, m))
+
+            slug = str(n.get("slug") or "").strip()
+            if slug:
+                if slug in slugs:
+                    out.append(Violation(i + 1, "slug", f"slug duplicado (igual ao item {slugs[slug]}): {slug}"))
+                else:
+                    slugs[slug] = i + 1
+            # mesma chave tipo|número|ano do grafo: "Lei 8.742/1993" = "lei" "8742" "1993";
+            # aviso porque a planilha repete o ato em cada tema (--strict reprova)
+            tna = tna_keys(m.tipo, m.numero, m.ano)
+            if tna:
+                if tna[0] in tnas:
+                    out.append(Violation(i + 1, "numero",
+                                         f"tipo+número+ano duplicado (igual ao item {tnas[tna[0]]}): {tna[0]}",
+                                         "aviso"))
+                else:
+                    tnas[tna[0]] = i + 1
+            ident = str(n.get("identificacao") or "").strip()
+            if not ident:
+                if "identificacao" in n:  # ausente já é erro do schema
+                    out.append(Violation(i + 1, "identificacao", "vazio"))
+            else:
+                key = " ".join(fold(ident).split())
+                if key in idents:
+                    out.append(Violation(i + 1, "identificacao",
+                                         f"identificação duplicada (igual ao item {idents[key]}): {ident}", "aviso"))
+                else:
+                    idents[key] = i + 1
+
+        out.extend(self._dangling_refs(models))
+        return out, total, checked
+
+    @staticmethod
+    def _dangling_refs(models: list[tuple[int, Norm]]) -> Iterable[Violation]:
+        if not any(m.refs(rel) for _, m in models for rel in REF_RELS):
+            return
+        # mesma resolução usada pelo grafo do site
+        resolver = Resolver([(m.slug, m) for _, m in models])
+        for i, m in models:
+            for rel in REF_RELS:
+                for label in m.refs(rel):
+                    if resolver.resolve(label) is None:
+                        yield Violation(i + 1, rel, f"referência sem ato correspondente no corpus: {label}", "aviso")
+
+
+def changed_selector(manifest_path: str | Path) -> Selector | None:
+    """
+    Seletor dos registros novos ou alterados em relação ao manifesto de um
+    build anterior (".bpa-manifest.json" do site). None = manifesto ausente
+    ou ilegível (valida tudo).
+    """
+    p = Path(manifest_path)
+    if p.is_dir():
+        p = p / MANIFEST_NAME
+    try:
+        hashes = json.loads(p.read_text(encoding="utf-8")).get("records") or {}
+    except (OSError, ValueError):
+        return None
+    return lambda _, m: hashes.get(m.slug) != norm_hash(m)
+
+
+def validate_file(schema_path: str | Path, data_path: str | Path,
+                  changed_only: str | Path | None = None) -> tuple[list[Violation], int, int]:
+    """
+    Valida DATA (norms.json ou norms.ndjson) contra SCHEMA. Retorna
+    (violações, nº de registros, nº de registros checados).
+    """
+    validator = Validator.from_file(schema_path)
+    select = changed_selector(changed_only) if changed_only else None
+    if is_ndjson(data_path):
+        return validator.check_ndjson(data_path, select)
+    return validator.check(json.loads(Path(data_path).read_text(encoding="utf-8")), select)
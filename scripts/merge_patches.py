@@ -1,10 +1,21 @@
-import json, re, unicodedata, sys, glob
+import argparse, json, re, unicodedata, sys, glob, hashlib
 from pathlib import Path
-from typing import Set
+from typing import Dict, List, Set
+
+# roda direto do checkout (python scripts/merge_patches.py), sem instalar o pacote
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bpa.corpus import append as append_corpus, dump as dump_corpus, is_ndjson, load as load_corpus
+from bpa.model import Norm
 
 DATA = Path("data")
 NORMS = DATA / "norms.json"
 PATCH_DIR = DATA / "patches"
+# patches já mesclados: {"corpus": sha256 do norms.json gravado, "aplicados": {arquivo: sha256}}
+LEDGER_NAME = ".aplicados.json"
+LEDGER = PATCH_DIR / LEDGER_NAME
+
+CONTROL = {"acao", "slug", "campos"}
 
 def strip_acc(s): return unicodedata.normalize("NFKD", s).encode("ascii","ignore").decode("ascii")
 def slugify(s):
@@ -23,28 +34,149 @@ def uniq_slug(base, tipo, numero, ano, taken: Set[str]):
         if c not in taken: taken.add(c); return c
         i+=1
 
-def main():
-    NORMS.parent.mkdir(parents=True, exist_ok=True)
-    if NORMS.exists():
-        data = json.loads(NORMS.read_text(encoding="utf-8"))
+def sha256(b: bytes) -> str: return hashlib.sha256(b).hexdigest()
+def file_sha256(p: Path) -> str:
+    if not p.exists(): return sha256(b"")
+    with open(p, "rb") as f: return hashlib.file_digest(f, "sha256").hexdigest()
+def fold(s): return " ".join(strip_acc(str(s or "")).lower().split())
+
+def record_keys(rec: Norm) -> List[str]:
+    """Identidade estável do ato: tipo+número+ano e/ou identificação normalizados."""
+    keys = []
+    tipo, numero, ano = fold(rec.tipo), fold(rec.numero), fold(rec.ano)
+    m = re.match(r"^(.*?)[/\-](\d{4})$", numero)
+    if m: numero, ano = m.group(1), ano or m.group(2)
+    if not ano and re.match(r"^\d{4}", fold(rec.data)): ano = fold(rec.data)[:4]
+    num = re.sub(r"[^0-9a-z]", "", numero).lstrip("0")
+    if tipo and num and ano: keys.append(f"tna:{tipo}|{num}|{ano}")
+    ident = fold(rec.identificacao)
+    if ident: keys.append(f"id:{ident}")
+    return keys
+
+def normalize(fields: Dict) -> Dict:
+    """Tira espaços das bordas; apelidos de campo e listas ficam com o Norm (set/from_json)."""
+    return {k: v.strip() if isinstance(v, str) else v for k, v in fields.items()}
+
+class Corpus:
+    """norms.json com índices slug -> posição e identidade -> posição."""
+    def __init__(self, data: List[Norm]):
+        self.data = data
+        self.loaded = len(data)   # data[loaded:] = atos novos, acrescentados por append()
+        self.updated = False      # algum registro existente mudou
+        self.by_slug: Dict[str, int] = {}
+        self.by_key: Dict[str, int] = {}
+        for i, n in enumerate(data):
+            if n.slug: self.by_slug.setdefault(n.slug, i)
+            self._index(i)
+        self.taken: Set[str] = set(self.by_slug)
+
+    def _index(self, i):
+        for k in record_keys(self.data[i]): self.by_key.setdefault(k, i)
+
+    def _unindex(self, i):
+        for k in record_keys(self.data[i]):
+            if self.by_key.get(k) == i: del self.by_key[k]
+
+    def find(self, rec):
+        for k in record_keys(rec):
+            if k in self.by_key: return self.by_key[k]
+        return None
+
+    def update(self, i, fields, keep_empty=False):
+        self.updated = True
+        self._unindex(i)
+        self.data[i].update(fields, keep_empty)
+        self._index(i)
+
+    def append(self, rec: Norm):
+        ident = rec.identificacao or f"{rec.tipo} {rec.numero} {rec.ano}".strip()
+        want = slugify(rec.slug)
+        if want and want not in self.taken: slug = want; self.taken.add(slug)
+        else: slug = uniq_slug(ident, rec.tipo, rec.numero, rec.ano, self.taken)
+        rec.slug = slug
+        self.data.append(rec)
+        self.by_slug[slug] = len(self.data) - 1
+        self._index(len(self.data) - 1)
+        return slug
+
+def apply_patch(corpus: Corpus, rec: Dict, name: str) -> bool:
+    """Upsert de um patch; False quando o ato a alterar não existe (tenta de novo na próxima execução)."""
+    if rec.get("acao") == "alterar":
+        alvo = str(rec.get("slug") or "").strip()
+        i = corpus.by_slug.get(alvo)
+        if i is None: i = corpus.by_key.get(f"id:{fold(alvo)}")
+        if i is None:
+            print(f"merge_patches: ! {name}: ato '{alvo}' não encontrado", file=sys.stderr)
+            return False
+        corpus.update(i, normalize(rec.get("campos") or {k: v for k, v in rec.items() if k not in CONTROL}), keep_empty=True)
+        print(f"merge_patches: ~ {name} -> slug={corpus.data[i].slug}")
+        return True
+
+    fields = normalize({k: v for k, v in rec.items() if k != "acao"})
+    norm = Norm.from_json(fields)
+    i = corpus.find(norm)
+    if i is None:
+        print(f"merge_patches: + {name} -> slug={corpus.append(norm)}")
     else:
-        data = []
+        corpus.update(i, fields)
+        print(f"merge_patches: = {name} -> slug={corpus.data[i].slug}")
+    return True
+
+def load_ledger(path: Path, corpus_hash: str) -> Dict[str, str]:
+    try:
+        ledger = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    # norms.json regenerado (ex.: novo ingest) => todos os patches precisam ser reaplicados
+    return ledger.get("aplicados", {}) if ledger.get("corpus") == corpus_hash else {}
+
+def main(data_dir: str | Path | None = None, norms: str | Path | None = None) -> int:
+    """
+    Mescla DATA_DIR/patches/*.json em NORMS (padrão DATA_DIR/norms.json);
+    retorna quantos patches foram aplicados. Com um NORMS .ndjson, atos
+    novos são acrescentados ao fim do arquivo sem regravá-lo.
+    """
+    base = Path(data_dir) if data_dir is not None else DATA
+    norms_path = Path(norms) if norms is not None else base / NORMS.name
+    patch_dir = base / PATCH_DIR.name
+    ledger_path = patch_dir / LEDGER_NAME
+    norms_path.parent.mkdir(parents=True, exist_ok=True)
 
-    taken = set(n.get("slug","") for n in data if n.get("slug"))
-    patches = sorted(glob.glob(str(PATCH_DIR / "*.json")))
+    patches = sorted(p for p in glob.glob(str(patch_dir / "*.json")) if not Path(p).name.startswith("."))
     if not patches:
         print("merge_patches: nenhum patch encontrado.")
-        return
+        return 0
 
+    aplicados = load_ledger(ledger_path, file_sha256(norms_path))
+    seen = set(aplicados.values())
+    corpus = None
+    pulados = 0
     for p in patches:
-        rec = json.loads(Path(p).read_text(encoding="utf-8"))
-        ident = rec.get("identificacao") or f"{rec.get('tipo','')} {rec.get('numero','')} {rec.get('ano','')}".strip()
-        slug = uniq_slug(ident, rec.get("tipo",""), rec.get("numero",""), rec.get("ano",""), taken)
-        rec["slug"] = slug
-        data.append(rec)
-        print(f"merge_patches: + {Path(p).name} -> slug={slug}")
+        body = Path(p).read_bytes()
+        h = sha256(body)
+        if h in seen:
+            pulados += 1
+            continue
+        if corpus is None: corpus = Corpus(load_corpus(norms_path))
+        if apply_patch(corpus, json.loads(body.decode("utf-8")), Path(p).name):
+            aplicados[Path(p).name] = h
+            seen.add(h)
+    print(f"merge_patches: {len(patches) - pulados} patch(es) processados, {pulados} já aplicados.")
 
-    NORMS.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    # sem patches novos o corpus nem é reserializado; só atos novos num NDJSON = append
+    if corpus is not None and corpus.updated:
+        dump_corpus(corpus.data, norms_path)
+    elif corpus is not None and len(corpus.data) > corpus.loaded:
+        if is_ndjson(norms_path): append_corpus(corpus.data[corpus.loaded:], norms_path)
+        else: dump_corpus(corpus.data, norms_path)
+    ledger = json.dumps({"corpus": file_sha256(norms_path), "aplicados": aplicados}, ensure_ascii=False, indent=2, sort_keys=True)
+    ledger_path.parent.mkdir(parents=True, exist_ok=True)
+    ledger_path.write_text(ledger, encoding="utf-8")
+    return len(patches) - pulados
 
 if __name__ == "__main__":
-    main()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data", default=str(DATA), help="Diretório com norms.json e patches/ (padrão: data)")
+    ap.add_argument("--norms", default=None, help="Corpus a mesclar, .json ou .ndjson (padrão: DATA/norms.json)")
+    args = ap.parse_args()
+    main(args.data, args.norms)
@@ -1,39 +1,30 @@
-import argparse, json, sys
+import argparse, sys
 from pathlib import Path
 
+# roda direto do checkout (python scripts/validate_json.py), sem instalar o pacote
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from bpa.validate import validate_file
+
 def main():
     p = argparse.ArgumentParser()
     p.add_argument("--schema", required=True)
     p.add_argument("--data", required=True)
+    p.add_argument("--changed-only", default=None)
+    p.add_argument("--strict", action="store_true")
     args = p.parse_args()
 
     try:
-        import jsonschema
-    except ImportError:
-        print("Installing jsonschema...", flush=True)
-        import subprocess, sys as _sys
-        subprocess.check_call([_sys.executable, "-m", "pip", "install", "jsonschema"])
-        import jsonschema
-
-    schema = json.loads(Path(args.schema).read_text(encoding="utf-8"))
-    data = json.loads(Path(args.data).read_text(encoding="utf-8"))
-
-    # valida
-    jsonschema.validate(instance=data, schema=schema)
-
-    # checagens leves
-    slugs = set()
-    for i, n in enumerate(data, 1):
-        slug = (n.get("slug") or "").strip()
-        ident = (n.get("identificacao") or "").strip()
-        if not slug or not ident:
-            print(f"[ERRO] item {i}: slug/identificacao vazio(s)")
-            sys.exit(1)
-        if slug in slugs:
-            print(f"[ERRO] slug duplicado: {slug}")
-            sys.exit(1)
-        slugs.add(slug)
-
+        problems, total, checked = validate_file(args.schema, args.data, changed_only=args.changed_only)
+    except ValueError as e:  # JSON ilegível (no NDJSON, com o nº da linha)
+        print(f"{args.data}: {e}", file=sys.stderr)
+        sys.exit(2)
+    for v in problems:
+        print(v)
+    erros = sum(1 for v in problems if v.level == "erro" or args.strict)
+    if erros:
+        print(f"{erros} erro(s) em {checked}/{total} registros.")
+        sys.exit(1)
     print("Schema OK e checagens básicas OK.")
 
 if __name__ == "__main__":
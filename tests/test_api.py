@@ -0,0 +1,108 @@
+import gzip
+import http.client
+import json
+import os
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from bpa import corpus
+from bpa.api import Api, make_handler, route
+from bpa.model import Norm
+
+ATOS = [
+    {"slug": "lei-8742-1993", "tipo": "Lei", "numero": "8.742", "ano": "1993", "data": "1993-12-07",
+     "identificacao": "Lei nº 8.742, de 7 de dezembro de 1993", "ementa": "Lei Orgânica da Assistência Social " * 40},
+    {"slug": "decreto-6214-2007", "tipo": "Decreto", "numero": "6.214", "ano": "2007", "data": "2007-09-26",
+     "identificacao": "Decreto nº 6.214, de 26 de setembro de 2007", "ementa": "Regulamenta o BPC",
+     "altera": "Lei nº 8.742, de 7 de dezembro de 1993"},
+]
+
+
+@pytest.fixture
+def server(tmp_path):
+    path = tmp_path / "norms.json"
+    corpus.dump((Norm.from_json(a) for a in ATOS), path)
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(Api(path)))
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv, path
+    srv.shutdown()
+    srv.server_close()
+
+
+def _get(srv, target: str, **headers):
+    con = http.client.HTTPConnection(*srv.server_address)
+    try:
+        con.request("GET", target, headers=headers)
+        r = con.getresponse()
+        return r.status, dict(r.getheaders()), r.read()
+    finally:
+        con.close()
+
+
+def test_rota_canonica():
+    assert route("/normas?ano=1993&tipo=lei&tipo=decreto&x=1")[0] == "/normas?ano=1993&tipo=decreto&tipo=lei"
+    assert route("/normas/abc/")[0] == "/normas/abc"
+    assert route("/normas/abc?raw=sim")[0] == "/normas/abc?raw=1"
+
+
+def test_etag_e_304(server):
+    srv, _ = server
+    status, headers, body = _get(srv, "/normas?tipo=lei&ano=1993")
+    assert status == 200
+    assert json.loads(body)["total"] == 1
+    etag = headers["ETag"]
+    # mesma rota canônica, outra ordem de parâmetros: mesmo ETag
+    status, headers, body = _get(srv, "/normas?ano=1993&x=1&tipo=lei", **{"If-None-Match": etag})
+    assert status == 304
+    assert headers["ETag"] == etag
+    assert body == b""
+    assert _get(srv, "/normas?tipo=lei&ano=1993", **{"If-None-Match": "W/" + etag})[0] == 304
+    assert _get(srv, "/normas?tipo=lei", **{"If-None-Match": etag})[0] == 200
+
+
+def test_gzip_tem_etag_proprio(server):
+    srv, _ = server
+    _, plain, body = _get(srv, "/normas/lei-8742-1993")
+    status, headers, gz = _get(srv, "/normas/lei-8742-1993", **{"Accept-Encoding": "gzip"})
+    assert status == 200
+    assert headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(gz) == body
+    assert headers["ETag"] != plain["ETag"]
+    assert _get(srv, "/normas/lei-8742-1993", **{"Accept-Encoding": "gzip", "If-None-Match": headers["ETag"]})[0] == 304
+
+
+def test_corpus_alterado_muda_o_etag(server):
+    srv, path = server
+    _, headers, _ = _get(srv, "/")
+    atos = ATOS + [{"slug": "portaria-1-2020", "tipo": "Portaria", "identificacao": "Portaria nº 1"}]
+    corpus.dump((Norm.from_json(a) for a in atos), path)
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    status, new, body = _get(srv, "/", **{"If-None-Match": headers["ETag"]})
+    assert status == 200
+    assert new["ETag"] != headers["ETag"]
+    assert json.loads(body)["normas"] == 3
+
+
+def test_erros(server):
+    srv, _ = server
+    assert _get(srv, "/normas/nao-existe")[0] == 404
+    assert _get(srv, "/outra")[0] == 404
+    status, _, body = _get(srv, "/normas?pagina=0")
+    assert status == 400
+    assert "pagina" in json.loads(body)["erro"]
+
+
+def test_slug_repetido_vale_o_ultimo(tmp_path):
+    path = tmp_path / "norms.json"
+    atos = ATOS + [{**ATOS[0], "ementa": "versão nova"}]
+    corpus.dump((Norm.from_json(a) for a in atos), path)
+    snap = Api(path).snapshot()
+    assert snap.root()["normas"] == 2
+    listing = snap.listing({})
+    assert listing["total"] == 2
+    assert sorted(i["slug"] for i in listing["itens"]) == ["decreto-6214-2007", "lei-8742-1993"]
+    assert snap.detail("lei-8742-1993", False)["ementa"] == "versão nova"
@@ -0,0 +1,51 @@
+import gzip
+
+from bpa.publish import assets
+from bpa.publish.assets import asset_path, compress_site, write_assets
+
+
+def _site(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "index.html").write_text("<p>início</p>" * 50, encoding="utf-8")
+    (tmp_path / "sub" / "docs.json").write_text('{"n":1}', encoding="utf-8")
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG")
+    return tmp_path
+
+
+def test_comprime_so_o_que_mudou(tmp_path, monkeypatch):
+    monkeypatch.setattr(assets, "brotli", None)
+    out = _site(tmp_path)
+    report = compress_site(out, jobs=2)
+    assert report["comprimidos"] == 2
+    assert gzip.decompress((out / "index.html.gz").read_bytes()) == (out / "index.html").read_bytes()
+    assert not (out / "logo.png.gz").exists()
+    assert report["classes"]["html"]["arquivos"] == 1
+    assert report["classes"]["json"]["br"] is None
+    assert compress_site(out)["comprimidos"] == 0
+    (out / "sub" / "docs.json").write_text('{"n":2}', encoding="utf-8")
+    assert compress_site(out)["comprimidos"] == 1
+
+
+def test_remove_irmaos_orfaos(tmp_path, monkeypatch):
+    monkeypatch.setattr(assets, "brotli", None)
+    out = _site(tmp_path)
+    compress_site(out)
+    (out / "sub" / "docs.json").unlink()
+    (out / "index.html.br").write_bytes(b"velho")      # de um build com brotli
+    (out / "logo.png.gz").write_bytes(b"nao comprimivel")
+    report = compress_site(out)
+    assert report["removidos"] == 3
+    assert sorted(p.name for p in out.rglob("*") if p.is_file()) == ["index.html", "index.html.gz", "logo.png"]
+
+
+def test_assets_com_hash_no_nome(tmp_path):
+    css = asset_path("site", "css", "body{}")
+    assert css.startswith("assets/site.") and css.endswith(".css")
+    assert asset_path("site", "css", "body{ }") != css
+    assert write_assets(tmp_path, {css: "body{}"}) == (1, 0)
+    assert write_assets(tmp_path, {css: "body{}"}) == (0, 0)
+    (tmp_path / (css + ".gz")).write_bytes(b"")
+    novo = asset_path("site", "css", "p{}")
+    assert write_assets(tmp_path, {novo: "p{}"}) == (1, 1)
+    # o .gz do asset antigo fica para compress_site remover como órfão
+    assert sorted(p.name for p in (tmp_path / "assets").iterdir()) == sorted([novo.split("/")[1], css.split("/")[1] + ".gz"])
@@ -0,0 +1,62 @@
+import json
+
+from bpa.publish import autocomplete
+from bpa.publish.autocomplete import AUTOCOMPLETE_DIR, ato_tokens, build_autocomplete
+
+PALAVRAS = ["polo", "pomar", "porta", "portal", "portaria"]
+
+
+def _fields(n: int) -> dict[str, list[str]]:
+    return {
+        "identificacao": [f"Ato {PALAVRAS[k % len(PALAVRAS)]}" for k in range(n)],
+        "numero": [f"{k + 1}.000" for k in range(n)],
+        "tipo": ["Portaria"] * n,
+        "ano": ["2020"] * n,
+        "data": [f"2020-01-{k + 1:02d}" for k in range(n)],
+        "vigencia": ["Vigente"] * n,
+    }
+
+
+def _build(tmp_path, n: int) -> dict:
+    return build_autocomplete(_fields(n), [(k, f"ato-{k}") for k in range(n)], tmp_path)
+
+
+def _read(tmp_path, name: str) -> dict:
+    return json.loads((tmp_path / AUTOCOMPLETE_DIR / name).read_text(encoding="utf-8"))
+
+
+def test_tokens_do_ato():
+    assert ato_tokens("Lei nº 8.742", "8.742", "Lei", "1993") == ["lei", "no", "8", "742", "1993", "8742"]
+
+
+def test_shard_grande_e_dividido(tmp_path, monkeypatch):
+    monkeypatch.setattr(autocomplete, "SHARD_MAX", 2)
+    _build(tmp_path, 5)
+    index = _read(tmp_path, "index.json")
+    # "po" alcança 5 atos (tipo Portaria em todos): desce até os prefixos que cabem
+    assert "po" not in index["shards"]
+    assert {"pol", "pom", "portar"} <= set(index["shards"])
+    shard = _read(tmp_path, "pol.json")
+    assert shard["tokens"] == [["polo", [0]]]
+    assert shard["atos"] == [["ato-0", "Ato polo", "Portaria", "1.000", "2020", "Vigente", 4]]
+
+
+def test_token_comum_guarda_so_os_mais_recentes(tmp_path, monkeypatch):
+    monkeypatch.setattr(autocomplete, "SHARD_MAX", 2)
+    _build(tmp_path, 5)
+    index = _read(tmp_path, "index.json")
+    # "2020" está nos 5 atos: 2 ids e o total; "2000" (número 2.000) desce para "200"
+    shard = _read(tmp_path, "202.json")
+    assert shard["tokens"] == [["2020", [0, 1], 5]]
+    assert [a[0] for a in shard["atos"]] == ["ato-4", "ato-3"]
+    assert index["shards"]["202"] == 5
+    assert _read(tmp_path, "200.json")["tokens"] == [["2000", [0]]]
+
+
+def test_shards_que_sumiram_sao_removidos(tmp_path, monkeypatch):
+    monkeypatch.setattr(autocomplete, "SHARD_MAX", 2)
+    _build(tmp_path, 5)
+    result = _build(tmp_path, 1)
+    assert result["removidos"] > 0
+    names = {p.name for p in (tmp_path / AUTOCOMPLETE_DIR).iterdir()}
+    assert names == {"index.json"} | {f"{k}.json" for k in _read(tmp_path, "index.json")["shards"]}
@@ -0,0 +1,78 @@
+import json
+from datetime import datetime, timezone
+from xml.etree import ElementTree
+
+from bpa.publish.changes import (CHANGES_DIR, FEED_NAME, INDEX_NAME, build_changes, corpus_version,
+                                 diff_records, is_empty, record_hash, summary)
+
+LEI = {"slug": "lei-8742-1993", "tipo": "Lei", "identificacao": "Lei nº 8.742", "vigencia": "Vigente",
+       "raw": {"OBS": "a"}, "raw_columns": ["OBS"]}
+DECRETO = {"slug": "decreto-6214-2007", "tipo": "Decreto", "identificacao": "Decreto nº 6.214", "vigencia": "Vigente"}
+PORTARIA = {"slug": "portaria-1-2020", "tipo": "Portaria", "identificacao": "Portaria nº 1", "ementa": "Teste"}
+
+
+def _corpus(*records: dict) -> dict[str, dict]:
+    return {r["slug"]: r for r in records}
+
+
+def test_diff_records():
+    old = _corpus(LEI, DECRETO)
+    new = _corpus({**LEI, "vigencia": "Revogada", "raw": {"OBS": "b"}}, PORTARIA)
+    delta = diff_records(old, new)
+    assert [r["slug"] for r in delta["adicionados"]] == ["portaria-1-2020"]
+    assert delta["adicionados"][0]["hash"] == record_hash(PORTARIA)
+    assert delta["removidos"] == ["decreto-6214-2007"]
+    assert delta["alterados"] == [{
+        "slug": "lei-8742-1993",
+        "hash": record_hash(new["lei-8742-1993"]),
+        "campos": {"raw.OBS": ["a", "b"], "vigencia": ["Vigente", "Revogada"]},
+    }]
+    assert summary(delta) == {"adicionados": 1, "removidos": 1, "alterados": 1}
+    assert delta["anterior"] == corpus_version({s: record_hash(r) for s, r in old.items()})
+
+
+def test_diff_sem_mudancas():
+    c = _corpus(LEI, DECRETO)
+    delta = diff_records(c, dict(c))
+    assert is_empty(delta)
+    assert delta["versao"] == delta["anterior"]
+
+
+def test_campo_ausente_vale_null():
+    delta = diff_records(_corpus(PORTARIA), _corpus({k: v for k, v in PORTARIA.items() if k != "ementa"}))
+    assert delta["alterados"][0]["campos"] == {"ementa": ["Teste", None]}
+
+
+def test_colunas_repetidas():
+    old = {**LEI, "raw": {"": "x"}, "raw_columns": ["", ""], "raw_values": ["x", "y"]}
+    new = {**old, "raw_values": ["x", "z"]}
+    delta = diff_records(_corpus(old), _corpus(new))
+    assert delta["alterados"][0]["campos"] == {"raw.#2": ["y", "z"]}
+
+
+def _build(records: dict, tmp_path, day: int) -> dict:
+    hashes = {s: record_hash(r) for s, r in records.items()}
+    now = datetime(2025, 1, day, tzinfo=timezone.utc)
+    return build_changes(records, hashes, tmp_path / "site", tmp_path / "state", now=now)
+
+
+def test_build_changes_versoes_e_feed(tmp_path):
+    first = _build(_corpus(LEI, DECRETO), tmp_path, 1)
+    assert first["novo"] is None  # primeira execução: só a base
+    assert _build(_corpus(LEI, DECRETO), tmp_path, 2)["gravados"] == 0
+
+    second = _build(_corpus({**LEI, "vigencia": "Revogada"}, DECRETO, PORTARIA), tmp_path, 3)
+    assert second["novo"] == {"adicionados": 1, "removidos": 0, "alterados": 1}
+
+    out = tmp_path / "site" / CHANGES_DIR
+    index = json.loads((out / INDEX_NAME).read_text(encoding="utf-8"))
+    assert index["atual"] == second["versao"]
+    assert [v["versao"] for v in index["versoes"]] == [second["versao"], first["versao"]]
+    delta = json.loads((out / index["versoes"][0]["delta"]).read_text(encoding="utf-8"))
+    assert delta["anterior"] == first["versao"]
+    assert delta["gerado_em"] == "2025-01-03T00:00:00Z"
+
+    ns = {"a": "http://www.w3.org/2005/Atom"}
+    feed = ElementTree.parse(out / FEED_NAME).getroot()
+    entries = {e.find("a:category", ns).get("term"): e.find("a:title", ns).text for e in feed.findall("a:entry", ns)}
+    assert entries == {"novo": "Novo: Portaria nº 1", "revogado": "Revogado: Lei nº 8.742"}
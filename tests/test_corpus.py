@@ -0,0 +1,101 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from bpa import corpus
+from bpa.model import Norm
+
+DATA = Path(__file__).resolve().parents[1] / "data" / "norms.json"
+
+COLUNAS = ("", "ANO", "TIPO", "IDENTIFICAÇÃO", "EMENTA", "", "")
+
+
+def _atos() -> list[Norm]:
+    return [
+        Norm(slug="lei-8742-1993", tipo="Lei", numero="8.742", ano="1993", vigencia="Vigente",
+             identificacao="Lei nº 8.742, de 7 de dezembro de 1993", ementa="LOAS",
+             altera=("Lei nº 1, de 1990",), planilha="CGRAN.xlsx", aba="NORMAS",
+             raw_columns=COLUNAS,
+             raw_values=("*", "1993", "Lei", "Lei nº 8.742, de 7 de dezembro de 1993", "LOAS", "", "x")),
+        Norm(slug="decreto-6214-2007", tipo="Decreto", numero="6.214", ano="2007",
+             identificacao="Decreto nº 6.214", raw_columns=COLUNAS,
+             raw_values=("", "2007", "Decreto", "Decreto nº 6.214", "outra ementa", "", "")),
+        Norm(slug="sem-planilha", tipo="Portaria", identificacao="Portaria nº 1", extra={"chave_nova": 1}),
+    ]
+
+
+def _same(a: list[Norm], b: list[Norm]) -> None:
+    assert [n.to_json() for n in a] == [n.to_json() for n in b]
+    assert [list(n.raw_items()) for n in a] == [list(n.raw_items()) for n in b]
+
+
+def test_formato2_ida_e_volta():
+    atos = _atos()
+    text = corpus.dumps(atos)
+    doc = json.loads(text)
+    assert doc["formato"] == 2
+    # um cabeçalho para as duas linhas da aba; células iguais ao campo canônico viram null
+    assert len(doc["cabecalhos"]) == 1
+    assert doc["normas"][0]["raw_values"][1:5] == [None, None, None, None]
+    _same(atos, corpus.loads(text))
+
+
+def test_colunas_repetidas_sobrevivem_a_to_json():
+    n = _atos()[0]
+    d = n.to_json()
+    assert d["raw_values"] == list(n.raw_values)
+    back = Norm.from_json(d)
+    assert back.raw_values == n.raw_values
+    assert back.extra is None
+
+
+def test_formato1_lista_antiga():
+    atos = _atos()
+    legacy = json.dumps([n.to_json() for n in atos], ensure_ascii=False)
+    _same(atos, corpus.loads(legacy))
+
+
+def test_dump_e_load_de_arquivo(tmp_path):
+    atos = _atos()
+    assert corpus.dump(atos, tmp_path / "norms.json") == 3
+    _same(atos, corpus.load(tmp_path / "norms.json"))
+    _same(atos, list(corpus.iter_load(tmp_path / "norms.json")))
+
+
+def test_corpus_do_repositorio_e_estavel():
+    text = DATA.read_text(encoding="utf-8")
+    assert corpus.dumps(corpus.loads(text)) == text
+
+
+def test_ndjson_ida_e_volta():
+    atos = _atos()
+    text = corpus.dumps(atos, ndjson=True)
+    lines = [json.loads(line) for line in text.splitlines()]
+    # cabeçalho numa linha própria, antes do primeiro registro que o usa
+    assert corpus.HEADER_KEY in lines[0]
+    assert [corpus.HEADER_KEY in d for d in lines].count(True) == 1
+    _same(atos, corpus.loads(text, ndjson=True))
+    # mesmos registros que o formato 2
+    assert json.loads(corpus.dumps(atos))["normas"] == [d for d in lines if corpus.HEADER_KEY not in d]
+
+
+def test_ndjson_append_nao_regrava(tmp_path):
+    atos = _atos()
+    path = tmp_path / "norms.ndjson"
+    corpus.dump(atos[:1], path)
+    before = path.read_text(encoding="utf-8")
+    novo = Norm(slug="nova-aba", tipo="Lei", identificacao="Lei nova", raw_columns=("TIPO", "OBS"),
+                raw_values=("Lei", "obs"))
+    assert corpus.append(atos[1:] + [novo], path) == 3
+    after = path.read_text(encoding="utf-8")
+    assert after.startswith(before)
+    # o cabeçalho já gravado é reaproveitado; só o da aba nova entra
+    assert after.count('{"' + corpus.HEADER_KEY + '"') == 2
+    _same(atos + [novo], corpus.load(path))
+    _same(atos + [novo], list(corpus.iter_load(path)))
+
+
+def test_append_exige_ndjson(tmp_path):
+    with pytest.raises(ValueError):
+        corpus.append(_atos(), tmp_path / "norms.json")
@@ -0,0 +1,143 @@
+import json
+import re
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from bpa import corpus
+from bpa.model import Norm
+from bpa.publish.emit_site import MANIFEST_NAME, build_site
+
+ATOS = [
+    {"slug": "lei-8742-1993", "tipo": "Lei", "numero": "8.742", "ano": "1993", "data": "1993-12-07",
+     "vigencia": "Vigente", "identificacao": "Lei nº 8.742, de 7 de dezembro de 1993", "ementa": "LOAS"},
+    {"slug": "decreto-6214-2007", "tipo": "Decreto", "numero": "6.214", "ano": "2007", "data": "2007-09-26",
+     "vigencia": "Vigente", "identificacao": "Decreto nº 6.214, de 26 de setembro de 2007",
+     "ementa": "Regulamenta o BPC", "altera": "Lei nº 8.742, de 7 de dezembro de 1993"},
+    {"slug": "portaria-1-2020", "tipo": "Portaria", "numero": "1", "ano": "2020", "data": "2020-01-02",
+     "vigencia": "Revogada", "identificacao": "Portaria nº 1, de 2 de janeiro de 2020", "ementa": "Teste"},
+]
+
+
+def _publish(tmp_path: Path, atos: list[dict], **kw) -> dict:
+    src = tmp_path / "norms.json"
+    corpus.dump((Norm.from_json(a) for a in atos), src)
+    return build_site(str(src), str(tmp_path / "site"), **kw)
+
+
+def test_primeira_publicacao_grava_todas_as_paginas(tmp_path):
+    stats = _publish(tmp_path, ATOS)
+    site = tmp_path / "site"
+    assert stats["paginas"] == 3
+    for a in ATOS:
+        assert (site / (a["slug"] + ".html")).exists()
+        assert (site / (a["slug"] + ".html.gz")).exists()
+    assert (site / MANIFEST_NAME).exists()
+
+
+def test_republicar_sem_mudancas_nao_regrava(tmp_path):
+    _publish(tmp_path, ATOS)
+    page = tmp_path / "site" / "portaria-1-2020.html"
+    mtime = page.stat().st_mtime_ns
+    stats = _publish(tmp_path, ATOS)
+    assert stats["gravadas"] == 0
+    assert stats["removidas"] == 0
+    assert stats["tamanhos"]["comprimidos"] == 0
+    assert page.stat().st_mtime_ns == mtime
+
+
+def test_so_a_pagina_alterada_e_regravada(tmp_path):
+    _publish(tmp_path, ATOS)
+    site = tmp_path / "site"
+    before = {a["slug"]: (site / (a["slug"] + ".html")).read_text(encoding="utf-8") for a in ATOS}
+    changed = [dict(a) for a in ATOS]
+    changed[2]["tema"] = "BPC"
+    _publish(tmp_path, changed)
+    assert "<strong>Tema:</strong> BPC" in (site / "portaria-1-2020.html").read_text(encoding="utf-8")
+    for slug in ("lei-8742-1993", "decreto-6214-2007"):
+        assert (site / (slug + ".html")).read_text(encoding="utf-8") == before[slug]
+
+
+def test_remove_paginas_orfas(tmp_path):
+    _publish(tmp_path, ATOS)
+    stats = _publish(tmp_path, ATOS[:2])
+    site = tmp_path / "site"
+    assert stats["paginas"] == 2
+    assert not (site / "portaria-1-2020.html").exists()
+    assert not (site / "portaria-1-2020.html.gz").exists()
+
+
+def test_remove_paginas_orfas_com_full(tmp_path):
+    _publish(tmp_path, ATOS)
+    _publish(tmp_path, ATOS[:2], full=True)
+    assert not (tmp_path / "site" / "portaria-1-2020.html").exists()
+
+
+def test_jobs_gera_a_mesma_saida(tmp_path):
+    a, b = tmp_path / "a", tmp_path / "b"
+    a.mkdir()
+    b.mkdir()
+    _publish(a, ATOS)
+    _publish(b, ATOS, jobs=2)
+    for slug in (x["slug"] for x in ATOS):
+        name = slug + ".html"
+        assert (a / "site" / name).read_bytes() == (b / "site" / name).read_bytes()
+
+
+def test_codigo_do_modelo_e_do_grafo_invalida_as_paginas(tmp_path, monkeypatch):
+    from bpa.publish import emit_site
+    assert {p.name for p in emit_site._TEMPLATE_SOURCES} == {"emit_site.py", "graph.py", "model.py"}
+    _publish(tmp_path, ATOS)
+    pages = [tmp_path / "site" / (a["slug"] + ".html") for a in ATOS]
+    before = [p.stat().st_mtime_ns for p in pages]
+    extra = tmp_path / "model.py"
+    extra.write_text("# outra versão\n", encoding="utf-8")
+    monkeypatch.setattr(emit_site, "_TEMPLATE_SOURCES", emit_site._TEMPLATE_SOURCES + (extra,))
+    _publish(tmp_path, ATOS)
+    assert all(p.stat().st_mtime_ns != m for p, m in zip(pages, before))
+
+
+def test_indice_de_busca_tem_um_documento_por_pagina(tmp_path):
+    _publish(tmp_path, ATOS + [{**ATOS[0], "ementa": "versão nova"}])
+    docs = json.loads((tmp_path / "site" / "search" / "docs.json").read_text(encoding="utf-8"))
+    assert docs["n"] == 3
+    assert docs["cols"]["slug"] == ["decreto-6214-2007", "portaria-1-2020", "lei-8742-1993"]
+    assert docs["cols"]["ementa"][2] == "versão nova"
+
+
+# executa search/worker.js no node com fetch/postMessage do navegador simulados
+_WORKER_HARNESS = r"""
+const fs = require('fs'), path = require('path'), dir = process.argv.at(-1);
+const out = [];
+globalThis.self = {location: {search: '?v=1'}};
+globalThis.fetch = url => Promise.resolve({json: () => JSON.parse(fs.readFileSync(path.join(dir, url.split('?')[0]), 'utf8'))});
+globalThis.postMessage = m => out.push(m);
+eval(fs.readFileSync(path.join(dir, 'worker.js'), 'utf8'));
+const f = (o = {}) => ({tipos: [], numero: '', ano: '', arg: '', tema: '', origem: '', situacao: '', ...o});
+(async () => {
+  await onmessage({data: {tipo: 'buscar', q: 1, f: f(), sort: {col: 'data', dir: -1}, ate: 2}});
+  await onmessage({data: {tipo: 'linhas', de: 2, ate: 10}});
+  await onmessage({data: {tipo: 'buscar', q: 2, f: f({arg: 'regul', situacao: 'Vigente'}), ate: 10}});
+  await onmessage({data: {tipo: 'buscar', q: 3, f: f({tipos: ['lei', 'portaria']}), sort: {col: 'tipo', dir: 1}, ate: 10}});
+  console.log(JSON.stringify(out));
+})();
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node não instalado")
+def test_worker_da_pesquisa(tmp_path):
+    _publish(tmp_path, ATOS)
+    site = tmp_path / "site"
+    index = (site / "index.html").read_text(encoding="utf-8")
+    assert re.search(r"data-v='[0-9a-f]{12}'", index)
+    assert "<tbody id='grid'></tbody>" in index
+    run = subprocess.run(["node", "-e", _WORKER_HARNESS, "--", str(site / "search")],
+                         capture_output=True, text=True, check=True)
+    pronto, primeira, resto, regul, tipos = json.loads(run.stdout)
+    assert pronto == {"tipo": "pronto", "n": 3}
+    assert (primeira["n"], [r[0] for r in primeira["linhas"]]) == (3, ["portaria-1-2020", "decreto-6214-2007"])
+    assert [r[0] for r in resto["linhas"]] == ["lei-8742-1993"]
+    assert [r[0] for r in regul["linhas"]] == ["decreto-6214-2007"]
+    assert [r[2] for r in tipos["linhas"]] == ["Lei", "Portaria"]
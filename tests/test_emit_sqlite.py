@@ -0,0 +1,53 @@
+import sqlite3
+
+from bpa import corpus
+from bpa.model import Norm
+from bpa.publish.emit_sqlite import build_sqlite
+
+ATOS = [
+    Norm(slug="lei-8742-1993", tipo="Lei", numero="8.742", ano="1993", vigencia="Vigente",
+         identificacao="Lei nº 8.742, de 7 de dezembro de 1993", ementa="Lei Orgânica da Assistência Social"),
+    Norm(slug="decreto-6214-2007", tipo="Decreto", numero="6.214", ano="2007", vigencia="Vigente",
+         identificacao="Decreto nº 6.214, de 26 de setembro de 2007", ementa="Regulamenta o benefício",
+         altera=("Lei nº 8.742, de 7 de dezembro de 1993", "Lei nº 1, de 1900")),
+]
+
+
+def _build(tmp_path, atos=ATOS) -> tuple[bool, sqlite3.Connection]:
+    src = tmp_path / "norms.json"
+    corpus.dump(atos, src)
+    built = build_sqlite(str(src), str(tmp_path / "bpa.sqlite"))
+    return built, sqlite3.connect(tmp_path / "bpa.sqlite")
+
+
+def test_normas_e_arestas(tmp_path):
+    built, con = _build(tmp_path)
+    assert built
+    rows = con.execute("SELECT id, slug, tipo, numero, ano FROM norms ORDER BY id").fetchall()
+    assert rows == [(1, "lei-8742-1993", "Lei", "8.742", "1993"), (2, "decreto-6214-2007", "Decreto", "6.214", "2007")]
+    refs = con.execute("SELECT norm_id, rel, target_id, derived FROM norm_refs ORDER BY norm_id, rel, ref").fetchall()
+    # citação resolvida, citação sem ato (target nulo) e a aresta inversa deduzida
+    assert refs == [(1, "alterado_por", 2, 1), (2, "altera", None, 0), (2, "altera", 1, 0)]
+    assert con.execute("SELECT norm_id, amended_by FROM norm_chain").fetchall() == [(1, 2)]
+    assert con.execute("SELECT value FROM meta WHERE key='norms'").fetchone() == ("2",)
+
+
+def test_busca_textual_ignora_acentos(tmp_path):
+    _, con = _build(tmp_path)
+
+    def match(q: str) -> list[str]:
+        return [r[0] for r in con.execute(
+            "SELECT n.slug FROM norms_fts JOIN norms n ON n.id = norms_fts.rowid WHERE norms_fts MATCH ? ORDER BY n.id", (q,))]
+
+    assert match("assistencia") == ["lei-8742-1993"]
+    assert match("ORGÂNICA") == ["lei-8742-1993"]
+    assert match("beneficio") == ["decreto-6214-2007"]
+    assert match("setembro OR dezembro") == ["lei-8742-1993", "decreto-6214-2007"]
+
+
+def test_mesmo_corpus_nao_regrava(tmp_path):
+    assert _build(tmp_path)[0]
+    assert not _build(tmp_path)[0]
+    built, con = _build(tmp_path, ATOS[:1])
+    assert built
+    assert con.execute("SELECT count(*) FROM norms").fetchone() == (1,)
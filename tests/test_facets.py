@@ -0,0 +1,66 @@
+import json
+import re
+
+from bpa.model import Norm
+from bpa.publish import facets
+from bpa.publish.facets import FACETS_NAME, build_facets
+from bpa.publish.search_index import resolve_fields
+
+
+def _css(prefix: str) -> str:
+    return f"<link rel='stylesheet' href='{prefix}site.css'>"
+
+
+def _build(tmp_path, norms: list[Norm]) -> dict:
+    items = [(i, n.slug) for i, n in enumerate(norms)]
+    return build_facets(resolve_fields(norms), items, tmp_path, _css)
+
+
+def _listed(page) -> list[str]:
+    return re.findall(r'href="\.\./\.\./(?:\.\./)?([^"]+)\.html"', page.read_text(encoding="utf-8"))
+
+
+def test_listagem_do_mais_recente_ao_mais_antigo(tmp_path):
+    norms = [
+        Norm(slug="lei-8742-1993", tipo="Lei", numero="8.742", data="07/12/1993", vigencia="Vigente"),
+        Norm(slug="sem-data", tipo="Lei", numero="1", vigencia="Vigente"),
+        Norm(slug="decreto-6214-2007", tipo="Decreto", numero="6.214", data="2007-09-26 00:00:00", vigencia="Vigente"),
+        Norm(slug="portaria-1-2020", tipo="Portaria", numero="1", ano="2020", vigencia="Vigente"),
+        Norm(slug="lei-14176-2021", tipo="Lei", numero="14.176", data="22/06/2021", vigencia="Vigente"),
+    ]
+    _build(tmp_path, norms)
+    # dd/mm/aaaa e ISO comparados pela data; sem data vale o ano; sem nenhum, no fim
+    assert _listed(tmp_path / "vigencia" / "vigente" / "index.html") == [
+        "lei-14176-2021", "portaria-1-2020", "decreto-6214-2007", "lei-8742-1993", "sem-data"]
+
+
+def test_paginacao_e_links(tmp_path, monkeypatch):
+    monkeypatch.setattr(facets, "PAGE_SIZE", 2)
+    norms = [Norm(slug=f"portaria-{k}-2020", tipo="Portaria", numero=str(k), data=f"2020-01-{k:02d}", tema="BPC")
+             for k in range(1, 6)]
+    result = _build(tmp_path, norms)
+    assert result["facetas"]["tema"] == [{"valor": "BPC", "slug": "bpc", "n": 5, "paginas": 3}]
+    base = tmp_path / "tema" / "bpc"
+    pages = [base / "index.html", base / "2" / "index.html", base / "3" / "index.html"]
+    assert [_listed(p) for p in pages] == [
+        ["portaria-5-2020", "portaria-4-2020"], ["portaria-3-2020", "portaria-2-2020"], ["portaria-1-2020"]]
+    first, second, last = (p.read_text(encoding="utf-8") for p in pages)
+    assert "rel='prev'" not in first and "<a rel='next' href='2/'>" in first
+    assert "<a rel='prev' href='../'>" in second and "<a rel='next' href='../3/'>" in second
+    assert "<a rel='prev' href='../2/'>" in last and "rel='next'" not in last
+    assert "href='../../../site.css'" in last
+
+    # menos atos: as páginas que sobram são removidas
+    result = _build(tmp_path, norms[:2])
+    assert result["removidos"] >= 2
+    assert not (base / "3").exists() and not (base / "2").exists()
+
+
+def test_facets_json_e_indice(tmp_path):
+    norms = [Norm(slug="a", tipo="Lei", ano="1993"), Norm(slug="b", tipo="Lei", ano="2007"),
+             Norm(slug="c", tipo="Decreto", ano="2007"), Norm(slug="d", tipo="Decreto", ano="s/d")]
+    _build(tmp_path, norms)
+    doc = json.loads((tmp_path / FACETS_NAME).read_text(encoding="utf-8"))
+    assert doc["total"] == 4
+    assert [(e["valor"], e["n"]) for e in doc["facetas"]["ano"]] == [("2007", 2), ("1993", 1), ("s/d", 1)]
+    assert "<a href='decreto/'>Decreto</a>" in (tmp_path / "tipo" / "index.html").read_text(encoding="utf-8")
@@ -0,0 +1,58 @@
+from bpa.model import Norm
+from bpa.publish.graph import Resolver, build_graph, page_refs, ref_keys, tna_keys
+
+LEI = Norm(slug="lei-8742-1993", tipo="Lei", numero="8.742", ano="1993",
+           identificacao="Lei nº 8.742, de 7 de dezembro de 1993")
+LEI_12435 = Norm(slug="lei-12435-2011", tipo="Lei", numero="12.435", ano="2011",
+                 identificacao="Lei nº 12.435, de 6 de julho de 2011", altera=("Lei nº 8.742/1993",))
+LEI_13146 = Norm(slug="lei-13146-2015", tipo="Lei", numero="13.146", ano="2015",
+                 identificacao="Lei nº 13.146, de 6 de julho de 2015",
+                 altera=("Lei nº 12.435, de 6 de julho de 2011",), relacionados=("Lei nº 8742 (LOAS)", "Portaria nº 99/2099"))
+
+
+def _graph(*norms: Norm) -> dict:
+    return build_graph([(n.slug, n) for n in norms], {n.slug: n.identificacao for n in norms})
+
+
+def test_chaves_tipo_numero_ano():
+    assert tna_keys("Lei", "8.742", "1993") == ["lei|8742|1993", "lei|8742|"]
+    assert tna_keys("LEI", "8742/1993", "") == ["lei|8742|1993", "lei|8742|"]
+    assert tna_keys("", "8.742", "1993") == []
+    assert ref_keys("Lei nº 8.742, de 7 de dezembro de 1993") == ["lei|8742|1993", "lei|8742|"]
+
+
+def test_resolver():
+    r = Resolver([(n.slug, n) for n in (LEI, LEI_12435)])
+    assert r.resolve("LEI Nº 8.742, DE 7 DE DEZEMBRO DE 1993") == "lei-8742-1993"
+    assert r.resolve("lei-12435-2011") == "lei-12435-2011"
+    assert r.resolve("Lei 8742/1993") == "lei-8742-1993"
+    assert r.resolve("Lei nº 1/1900") is None
+
+
+def test_chave_ambigua_nao_resolve():
+    outra = Norm(slug="lei-8742-outra", tipo="Lei", numero="8742", ano="1993", identificacao="Lei 8742 (cópia)")
+    assert Resolver([(n.slug, n) for n in (LEI, outra)]).resolve("Lei nº 8742, de 1993") is None
+
+
+def test_arestas_inversas_e_cadeia():
+    g = _graph(LEI, LEI_12435, LEI_13146)
+    assert g["arestas"]["lei-8742-1993"] == {
+        "alterado_por": [["Lei nº 12.435, de 6 de julho de 2011", "lei-12435-2011", 1]],
+        "relacionados": [["Lei nº 13.146, de 6 de julho de 2015", "lei-13146-2015", 1]],
+    }
+    assert g["arestas"]["lei-13146-2015"]["relacionados"] == [
+        ["Lei nº 8742 (LOAS)", "lei-8742-1993", 0], ["Portaria nº 99/2099", None, 0]]
+    # 8.742 <- 12.435 <- 13.146
+    assert g["cadeias"] == {"lei-8742-1993": ["lei-12435-2011", "lei-13146-2015"],
+                            "lei-12435-2011": ["lei-13146-2015"]}
+    refs = page_refs(g, "lei-8742-1993")
+    assert refs["alterado_por"] == [("Lei nº 12.435, de 6 de julho de 2011", "lei-12435-2011")]
+    # a cadeia da página só traz quem não está em alterado_por
+    assert refs["cadeia"] == [("Lei nº 13.146, de 6 de julho de 2015", "lei-13146-2015")]
+
+
+def test_ciclo_nao_trava():
+    a = Norm(slug="a", tipo="Lei", numero="1", ano="2000", identificacao="Lei nº 1/2000", alterado_por=("Lei nº 2/2000",))
+    b = Norm(slug="b", tipo="Lei", numero="2", ano="2000", identificacao="Lei nº 2/2000", alterado_por=("Lei nº 1/2000",))
+    g = _graph(a, b)
+    assert g["cadeias"] == {"a": ["b"], "b": ["a"]}
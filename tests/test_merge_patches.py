@@ -0,0 +1,91 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import merge_patches  # noqa: E402
+from bpa import corpus  # noqa: E402
+from bpa.model import Norm  # noqa: E402
+
+LEI = {"slug": "lei-8742-1993", "tipo": "Lei", "numero": "8.742", "ano": "1993",
+       "identificacao": "Lei nº 8.742, de 7 de dezembro de 1993", "ementa": "LOAS"}
+
+
+@pytest.fixture
+def base(tmp_path: Path) -> Path:
+    corpus.dump([Norm.from_json(LEI)], tmp_path / "norms.json")
+    (tmp_path / "patches").mkdir()
+    return tmp_path
+
+
+def _patch(base: Path, name: str, body: dict) -> None:
+    (base / "patches" / name).write_text(json.dumps(body, ensure_ascii=False), encoding="utf-8")
+
+
+def _snapshot(base: Path) -> list[dict]:
+    return [n.to_json() for n in corpus.load(base / "norms.json")]
+
+
+def test_apply_patch_novo_e_depois_igual_nao_duplica():
+    c = merge_patches.Corpus([Norm.from_json(LEI)])
+    novo = {"tipo": "Decreto", "numero": "6.214", "ano": "2007",
+            "identificacao": "Decreto nº 6.214, de 26 de setembro de 2007"}
+    assert merge_patches.apply_patch(c, dict(novo), "a.json")
+    assert merge_patches.apply_patch(c, dict(novo), "b.json")
+    assert len(c.data) == 2
+    # mesmo ato com outra grafia do número (tipo+número+ano normalizados)
+    assert merge_patches.apply_patch(c, {"tipo": "Lei", "numero": "8742/1993", "ementa": "Nova"}, "c.json")
+    assert len(c.data) == 2
+    assert c.data[0].ementa == "Nova"
+
+
+def test_apply_patch_alterar_ato_inexistente():
+    c = merge_patches.Corpus([Norm.from_json(LEI)])
+    assert not merge_patches.apply_patch(c, {"acao": "alterar", "slug": "nao-existe", "campos": {"tema": "X"}},
+                                         "x.json")
+    assert not c.updated
+
+
+def test_apply_patch_alterar_limpa_campo():
+    c = merge_patches.Corpus([Norm.from_json({**LEI, "tema": "BPC"})])
+    assert merge_patches.apply_patch(c, {"acao": "alterar", "slug": LEI["slug"], "campos": {"tema": ""}}, "x.json")
+    assert c.data[0].tema == ""
+
+
+def test_main_idempotente(base):
+    _patch(base, "001.json", {"tipo": "Decreto", "numero": "6.214", "ano": "2007",
+                              "identificacao": "Decreto nº 6.214, de 26 de setembro de 2007"})
+    _patch(base, "002.json", {"acao": "alterar", "slug": LEI["slug"], "campos": {"tema": "BPC"}})
+    assert merge_patches.main(base) == 2
+    first = _snapshot(base)
+    assert [n["slug"] for n in first] == [LEI["slug"], "decreto-no-6-214-de-26-de-setembro-de-2007"]
+    assert first[0]["tema"] == "BPC"
+
+    mtime = (base / "norms.json").stat().st_mtime_ns
+    assert merge_patches.main(base) == 0
+    assert _snapshot(base) == first
+    assert (base / "norms.json").stat().st_mtime_ns == mtime
+
+
+def test_main_reaplica_quando_o_corpus_e_regerado(base):
+    _patch(base, "001.json", {"acao": "alterar", "slug": LEI["slug"], "campos": {"tema": "BPC"}})
+    merge_patches.main(base)
+    # novo ingest: norms.json sem o patch, ledger de outro corpus
+    corpus.dump([Norm.from_json(LEI)], base / "norms.json")
+    assert merge_patches.main(base) == 1
+    assert _snapshot(base)[0]["tema"] == "BPC"
+
+
+def test_main_ndjson_acrescenta_ao_fim(base):
+    norms = base / "norms.ndjson"
+    corpus.dump([Norm.from_json(LEI)], norms)
+    before = norms.read_text(encoding="utf-8")
+    _patch(base, "001.json", {"tipo": "Decreto", "numero": "6.214", "ano": "2007",
+                              "identificacao": "Decreto nº 6.214, de 26 de setembro de 2007"})
+    assert merge_patches.main(base, norms) == 1
+    after = norms.read_text(encoding="utf-8")
+    assert after.startswith(before)
+    assert len(corpus.load(norms)) == 2
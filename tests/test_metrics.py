@@ -0,0 +1,49 @@
+import json
+import pstats
+
+import pytest
+
+from bpa import metrics
+
+
+def test_sem_sessao_nao_mede_nada():
+    assert not metrics.enabled()
+    with metrics.stage("x", 3) as st:
+        st["itens"] = 5
+    metrics.add("y", 1.0, 2)
+    metrics.merge({"z": {"segundos": 1.0, "itens": 1, "chamadas": 1}})
+    assert not metrics.enabled()
+
+
+def test_sessao_grava_etapas_e_perfil(tmp_path):
+    out, prof = tmp_path / "m" / "metrics.json", tmp_path / "p" / "perfil.prof"
+    with metrics.session("publish", metrics_json=out, cprofile=prof) as m:
+        assert metrics.enabled()
+        with metrics.stage("publish.paginas", 2) as st:
+            st["itens"] = 3
+        metrics.add("publish.paginas", 0.5, 4)
+        # etapas de um worker do pool
+        metrics.merge({"ingest.linhas": {"segundos": 0.25, "itens": 10, "chamadas": 2}})
+    assert not metrics.enabled()
+
+    report = json.loads(out.read_text(encoding="utf-8"))
+    assert report["comando"] == "publish"
+    etapas = {e["etapa"]: e for e in report["etapas"]}
+    assert (etapas["publish.paginas"]["itens"], etapas["publish.paginas"]["chamadas"]) == (7, 2)
+    assert etapas["publish.paginas"]["segundos"] >= 0.5
+    assert (etapas["ingest.linhas"]["itens"], etapas["ingest.linhas"]["chamadas"]) == (10, 2)
+    assert pstats.Stats(str(prof)).total_calls > 0
+
+    table = m.table().splitlines()
+    assert table[0].split()[:3] == ["etapa", "segundos", "itens"]
+    assert [line.split()[0] for line in table[1:]] == ["publish.paginas", "ingest.linhas", "total"]
+
+
+def test_sessao_fecha_mesmo_com_erro(tmp_path):
+    out = tmp_path / "metrics.json"
+    with pytest.raises(RuntimeError):
+        with metrics.session("ingest", metrics_json=out):
+            metrics.add("ingest.cache", 0.0, 1)
+            raise RuntimeError("falhou")
+    assert not metrics.enabled()
+    assert json.loads(out.read_text(encoding="utf-8"))["etapas"][0]["etapa"] == "ingest.cache"
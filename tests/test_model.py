@@ -0,0 +1,54 @@
+from bpa import model
+from bpa.model import Norm, shared_columns, split_refs
+
+
+def test_apelidos_e_referencias():
+    n = Norm.from_json({
+        "slug": "lei-1", "situacao": "Vigente", "link_dou": "https://dou/1", "dou_url": "https://dou/2",
+        "alteracoes": "Lei nº 1; Lei nº 2 ;", "legislacao_correlata": ["Decreto nº 3", ""], "subtema": ["a", "b"],
+        "chave_nova": {"x": 1},
+    })
+    assert n.vigencia == "Vigente"
+    assert n.fonte_dou == "https://dou/2"   # entre apelidos vale a ordem de ALIASES
+    assert n.altera == ("Lei nº 1", "Lei nº 2")
+    assert n.relacionados == ("Decreto nº 3",)
+    assert n.subtemas == "a; b"
+    d = n.to_json()
+    assert d["altera"] == "Lei nº 1; Lei nº 2"
+    assert d["chave_nova"] == {"x": 1}
+    assert "situacao" not in d and "raw" not in d
+
+
+def test_campo_canonico_vence_o_apelido():
+    assert Norm.from_json({"vigencia": "Revogada", "situacao": "Vigente"}).vigencia == "Revogada"
+    assert Norm.from_json({"vigencia": "", "situacao": "Vigente"}).vigencia == "Vigente"
+
+
+def test_update_ignora_vazios_e_slug():
+    n = Norm(slug="a", tipo="Lei", ementa="x")
+    n.update({"slug": "b", "tipo": "", "ementa": None, "tema": "BPC", "altera_ids": ["Lei nº 1"]})
+    assert (n.slug, n.tipo, n.ementa, n.tema, n.altera) == ("a", "Lei", "x", "BPC", ("Lei nº 1",))
+    n.update({"ementa": ""}, keep_empty=True)
+    assert n.ementa == ""
+
+
+def test_raw_em_dict_mantem_a_ordem_das_colunas():
+    n = Norm.from_json({"raw": {"B": 2, "A": None, "C": "c"}, "raw_columns": ["A", "B"]})
+    assert list(n.raw_items()) == [("A", ""), ("B", "2"), ("C", "c")]
+    assert n.to_json()["raw_columns"] == ["A", "B", "C"]
+    assert split_refs(None) == ()
+
+
+def test_colunas_compartilhadas():
+    a = Norm(raw_columns=("TIPO", "OBS"))
+    b = Norm.from_json({"raw_columns": ["TIPO", "OBS"], "raw": {"TIPO": "Lei", "OBS": "x"}})
+    assert a.raw_columns is b.raw_columns
+
+
+def test_cache_de_colunas_e_limitado(monkeypatch):
+    monkeypatch.setattr(model, "_COLUMNS", {})
+    monkeypatch.setattr(model, "_COLUMNS_MAX", 4)
+    for k in range(10):
+        shared_columns([f"C{k}"])
+    assert len(model._COLUMNS) <= 4
+    assert shared_columns(["C9"]) is shared_columns(("C9",))
@@ -0,0 +1,68 @@
+from bpa import corpus
+from bpa.model import Norm
+from bpa.search import CACHE_SUBDIR, Query, SearchIndex, load_index
+
+ATOS = [
+    Norm(slug="lei-8742-1993", tipo="Lei", numero="8.742", ano="1993", data="1993-12-07", vigencia="Vigente",
+         tema="BPC", origem="Congresso", identificacao="Lei nº 8.742, de 7 de dezembro de 1993",
+         ementa="Dispõe sobre a organização da Assistência Social"),
+    Norm(slug="decreto-6214-2007", tipo="Decreto", numero="6.214", ano="2007", data="2007-09-26", vigencia="Vigente",
+         tema="BPC", origem="Presidência", identificacao="Decreto nº 6.214, de 26 de setembro de 2007",
+         ementa="Regulamenta o benefício de prestação continuada da assistência social"),
+    Norm(slug="portaria-1-2020", tipo="Portaria", numero="1", ano="2020", data="2020-01-02", vigencia="Revogada",
+         tema="Cadastro Único", origem="MDS", identificacao="Portaria nº 1, de 2 de janeiro de 2020",
+         ementa="Cadastro e benefício"),
+]
+
+
+def _slugs(index: SearchIndex, **q) -> list[str]:
+    return [r["slug"] for r in index.search(Query(**q))]
+
+
+def test_filtros():
+    index = SearchIndex.build(ATOS)
+    assert _slugs(index) == ["portaria-1-2020", "decreto-6214-2007", "lei-8742-1993"]
+    assert _slugs(index, tipos=("lei", "DECRETO")) == ["decreto-6214-2007", "lei-8742-1993"]
+    assert _slugs(index, numero="742") == ["lei-8742-1993"]
+    assert _slugs(index, tema="cadastro unico") == ["portaria-1-2020"]
+    assert _slugs(index, situacao="vigente", origem="presidencia") == ["decreto-6214-2007"]
+    assert _slugs(index, ano="1999") == []
+
+
+def test_argumento_pontua_identificacao_e_token_inteiro():
+    index = SearchIndex.build(ATOS)
+    # "assistencia" inteiro na ementa de dois atos; "benef" é prefixo
+    assert _slugs(index, arg="ASSISTÊNCIA") == ["decreto-6214-2007", "lei-8742-1993"]
+    results = index.search(Query(arg="benef"))
+    assert [(r["slug"], r["pontos"]) for r in results] == [("portaria-1-2020", 1), ("decreto-6214-2007", 1)]
+    # na identificação vale mais que na ementa
+    assert _slugs(index, arg="dezembro social") == ["lei-8742-1993"]
+    # token inteiro na identificação: peso 2, dobrado
+    assert [r["pontos"] for r in index.search(Query(arg="8"))] == [4]
+
+
+def test_slug_repetido_vale_o_ultimo():
+    index = SearchIndex.build(ATOS + [Norm(slug="lei-8742-1993", tipo="Lei", identificacao="Lei nº 8.742", ementa="LOAS")])
+    assert index.n == 3
+    assert _slugs(index, arg="loas") == ["lei-8742-1993"]
+    assert _slugs(index, arg="organizacao") == []
+
+
+def test_query_de_lote():
+    q = Query.from_json({"argumento": "bpc", "tipo": "Lei", "vigencia": "Vigente", "ano": 1993})
+    assert q == Query(arg="bpc", tipos=("Lei",), ano="1993", situacao="Vigente")
+
+
+def test_cache_em_disco(tmp_path):
+    src = tmp_path / "norms.json"
+    corpus.dump(ATOS, src)
+    cache = tmp_path / "cache"
+    first = load_index(src, cache)
+    entries = list((cache / CACHE_SUBDIR).iterdir())
+    assert len(entries) == 1
+    again = load_index(src, cache)
+    assert again.cols == first.cols and again.postings == first.postings
+    corpus.dump(ATOS[:1], src)
+    assert load_index(src, cache).n == 1
+    assert [p.name for p in (cache / CACHE_SUBDIR).iterdir()] != [p.name for p in entries]
+    assert len(list((cache / CACHE_SUBDIR).iterdir())) == 1
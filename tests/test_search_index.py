@@ -0,0 +1,55 @@
+import json
+
+from bpa.model import Norm
+from bpa.publish.search_index import DICT_FIELDS, SEARCH_DIR, build_search_index, shard_key, tokenize
+
+NORMS = [
+    Norm(slug="lei-8742-1993", tipo="Lei", numero="8.742", ano="1993", vigencia="Vigente", tema="BPC",
+         origem="Congresso", identificacao="Lei nº 8.742, de 7 de dezembro de 1993", ementa="Assistência Social"),
+    Norm(slug="decreto-6214-2007", tipo="Decreto", numero="6.214", ano="2007", vigencia="Vigente", tema="BPC",
+         origem="Presidência", identificacao="Decreto nº 6.214", ementa="Regulamenta o benefício"),
+    Norm(slug="portaria-1-2020", tipo="Portaria", numero="1", ano="2020", vigencia="Revogada", tema="Cadastro",
+         origem="MDS", identificacao="Portaria nº 1", ementa="Cadastro Único e benefício"),
+]
+
+
+def _build(tmp_path, norms=NORMS) -> dict:
+    return build_search_index([(n, n.slug) for n in norms], tmp_path)
+
+
+def _read(tmp_path, name: str):
+    return json.loads((tmp_path / SEARCH_DIR / name).read_text(encoding="utf-8"))
+
+
+def test_docs_colunar_decodifica_os_campos(tmp_path):
+    _build(tmp_path)
+    docs = _read(tmp_path, "docs.json")
+    assert docs["n"] == 3
+    assert docs["cols"]["slug"] == [n.slug for n in NORMS]
+    for field in DICT_FIELDS:
+        assert [docs["dict"][field][c] for c in docs["cols"][field]] == [getattr(n, field) for n in NORMS]
+    # vocabulário sem repetição: "Vigente" e "BPC" têm um código só
+    assert docs["dict"]["vigencia"].count("Vigente") == 1
+    assert docs["dict"]["tema"].count("BPC") == 1
+
+
+def test_postings_apontam_para_os_documentos(tmp_path):
+    _build(tmp_path)
+    docs = _read(tmp_path, "docs.json")
+    for tok, expected in {"beneficio": [1, 2], "assistencia": [0], "cadastro": [2], "8": [0]}.items():
+        key = shard_key(tok)
+        assert key in docs["shards"]
+        assert _read(tmp_path, f"idx/{key}.json")[tok] == expected
+    # todo token de identificação+ementa está no shard da sua chave
+    for i, n in enumerate(NORMS):
+        for tok in tokenize(n.identificacao + " " + n.ementa):
+            assert i in _read(tmp_path, f"idx/{shard_key(tok)}.json")[tok]
+
+
+def test_shard_que_sumiu_e_removido(tmp_path):
+    _build(tmp_path)
+    assert (tmp_path / SEARCH_DIR / "idx" / f"{shard_key('cadastro')}.json").exists()
+    stats = _build(tmp_path, NORMS[:1])
+    assert stats["gravados"] > 0
+    assert not (tmp_path / SEARCH_DIR / "idx" / f"{shard_key('cadastro')}.json").exists()
+    assert _read(tmp_path, "docs.json")["shards"] == sorted(p.stem for p in (tmp_path / SEARCH_DIR / "idx").iterdir())
@@ -0,0 +1,59 @@
+import threading
+
+from bpa.serve import Reloader, _snapshot, classify
+
+
+def _data(tmp_path):
+    data = tmp_path / "data"
+    (data / "patches").mkdir(parents=True)
+    (data / "CGRAN.xlsx").write_bytes(b"x")
+    (data / "~$CGRAN.xlsx").write_bytes(b"lock")
+    (data / "patches" / "001.json").write_text("{}", encoding="utf-8")
+    (data / "norms.json").write_text("[]", encoding="utf-8")
+    return data, data / "norms.json"
+
+
+def _touch(p, text="mudou"):
+    p.write_text(text, encoding="utf-8")
+
+
+def test_snapshot_ignora_arquivos_de_trava(tmp_path):
+    data, norms = _data(tmp_path)
+    snap = _snapshot(data, norms)
+    assert sorted(snap) == sorted(str(p) for p in (data / "CGRAN.xlsx", data / "patches" / "001.json", norms))
+
+
+def test_classify(tmp_path):
+    data, norms = _data(tmp_path)
+    old = _snapshot(data, norms)
+    assert classify(old, _snapshot(data, norms), norms) == set()
+
+    _touch(norms, "[{}]")
+    assert classify(old, _snapshot(data, norms), norms) == {"publish"}
+
+    old = _snapshot(data, norms)
+    _touch(data / "patches" / "002.json")
+    assert classify(old, _snapshot(data, norms), norms) == {"merge", "publish"}
+
+    old = _snapshot(data, norms)
+    _touch(data / "patches" / "001.json", '{"x": 1}')
+    assert classify(old, _snapshot(data, norms), norms) == {"ingest", "merge", "publish"}
+
+    old = _snapshot(data, norms)
+    (data / "patches" / "002.json").unlink()
+    assert classify(old, _snapshot(data, norms), norms) == {"ingest", "merge", "publish"}
+
+    old = _snapshot(data, norms)
+    _touch(data / "CGRAN.xlsx")
+    assert classify(old, _snapshot(data, norms), norms) == {"ingest", "merge", "publish"}
+
+
+def test_reloader_acorda_quem_espera():
+    r = Reloader()
+    got = []
+    t = threading.Thread(target=lambda: got.append(r.wait(0, 5.0)))
+    t.start()
+    r.bump()
+    t.join(5.0)
+    assert got == [1]
+    assert r.wait(1, 0.01) == 1
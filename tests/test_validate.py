@@ -0,0 +1,89 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from bpa import corpus
+from bpa.model import Norm
+from bpa.validate import Validator, validate_file
+
+DATA = Path(__file__).resolve().parents[1] / "data"
+SCHEMA = DATA / "schema.json"
+
+LEI = {"slug": "lei-8742-1993", "tipo": "Lei", "numero": "8.742", "ano": "1993",
+       "identificacao": "Lei nº 8.742, de 7 de dezembro de 1993", "ementa": "LOAS",
+       "fonte_planalto": "https://www.planalto.gov.br/ccivil_03/leis/l8742.htm"}
+DECRETO = {"slug": "decreto-6214-2007", "tipo": "Decreto", "numero": "6.214", "ano": "2007",
+           "identificacao": "Decreto nº 6.214, de 26 de setembro de 2007",
+           "altera": "Lei nº 8.742, de 7 de dezembro de 1993"}
+
+
+@pytest.fixture(scope="module")
+def validator() -> Validator:
+    return Validator.from_file(SCHEMA)
+
+
+def _doc(*atos: dict) -> dict:
+    return json.loads(corpus.dumps(Norm.from_json(a) for a in atos))
+
+
+def _found(violations) -> set[tuple[int, str, str]]:
+    return {(v.item, v.path, v.level) for v in violations}
+
+
+def test_corpus_valido(validator):
+    problems, total, checked = validator.check(_doc(LEI, DECRETO))
+    assert problems == []
+    assert (total, checked) == (2, 2)
+
+
+def test_slug_duplicado_e_erro(validator):
+    problems, _, _ = validator.check(_doc(LEI, {**DECRETO, "slug": LEI["slug"]}))
+    assert (2, "slug", "erro") in _found(problems)
+
+
+def test_tipo_numero_ano_duplicado_e_aviso(validator):
+    # mesma chave normalizada: "8.742" = "8742", "8742/1993" traz o ano
+    outra = {**LEI, "slug": "lei-8742", "numero": "8742/1993", "ano": "", "identificacao": "Lei 8742 (LOAS)"}
+    problems, _, _ = validator.check(_doc(LEI, outra))
+    assert _found(problems) == {(2, "numero", "aviso")}
+
+
+def test_identificacao_duplicada_e_aviso(validator):
+    outra = {**DECRETO, "identificacao": "LEI Nº 8.742, DE 7 DE DEZEMBRO DE 1993"}
+    problems, _, _ = validator.check(_doc(LEI, outra))
+    assert (2, "identificacao", "aviso") in _found(problems)
+
+
+def test_url_malformada_e_erro(validator):
+    problems, _, _ = validator.check(_doc({**LEI, "fonte_planalto": "planalto.gov.br/l8742"}))
+    assert _found(problems) == {(1, "fonte_planalto", "erro")}
+
+
+def test_referencia_sem_ato_e_aviso(validator):
+    problems, _, _ = validator.check(_doc(DECRETO))
+    assert _found(problems) == {(1, "altera", "aviso")}
+
+
+def test_schema(validator):
+    doc = _doc(LEI)
+    doc["normas"][0]["tipo"] = 1
+    del doc["normas"][0]["identificacao"]
+    problems, _, _ = validator.check(doc)
+    assert _found(problems) == {(1, "tipo", "erro"), (1, "identificacao", "erro")}
+
+
+def test_json_e_ndjson_dao_o_mesmo_resultado(tmp_path):
+    atos = [Norm.from_json(a) for a in (LEI, {**DECRETO, "slug": LEI["slug"]})]
+    corpus.dump(atos, tmp_path / "norms.json")
+    corpus.dump(atos, tmp_path / "norms.ndjson")
+    a = validate_file(SCHEMA, tmp_path / "norms.json")
+    b = validate_file(SCHEMA, tmp_path / "norms.ndjson")
+    assert _found(a[0]) == _found(b[0]) != set()
+    assert a[1:] == b[1:] == (2, 2)
+
+
+def test_corpus_do_repositorio_sem_erros():
+    problems, total, checked = validate_file(SCHEMA, DATA / "norms.json")
+    assert total == checked > 0
+    assert [str(v) for v in problems if v.level == "erro"] == []
@@ -0,0 +1,83 @@
+from pathlib import Path
+
+import openpyxl
+import pytest
+
+from bpa.extract import xlsx_ingest
+from bpa.extract.xlsx_ingest import (_map_vigencia, canonical_columns, infer_numero_from_ident,
+                                     infer_tipo_from_ident, iter_corpus_records, year_from_numero)
+
+DATA = Path(__file__).resolve().parents[1] / "data"
+
+HEADER = ["TIPO", "NÚMERO", "ANO", "IDENTIFICAÇÃO", "EMENTA", "TEMA"]
+LEI = ["Lei", "8.742", "1993", "Lei nº 8.742, de 7 de dezembro de 1993", "LOAS", "BPC"]
+DECRETO = ["Decreto", "6.214", "2007", "Decreto nº 6.214, de 26 de setembro de 2007", "Regulamenta o BPC", "BPC"]
+
+
+def _xlsx(path: Path, *rows: list) -> Path:
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "NORMAS"
+    for row in (HEADER, *rows):
+        ws.append(row)
+    wb.save(path)
+    return path
+
+
+def test_ato_repetido_em_outra_planilha_vale_a_primeira(tmp_path):
+    a = _xlsx(tmp_path / "a.xlsx", LEI, [*LEI[:5], "Renda"])
+    # mesmo ato escrito de outro jeito: "8742" = "8.742"
+    b = _xlsx(tmp_path / "b.xlsx", ["Lei", "8742", "1993", "Lei 8742 (LOAS)", "LOAS", "BPC"], DECRETO)
+    recs = list(iter_corpus_records([a, b], jobs=1))
+    # as duas linhas de a.xlsx (um tema cada) ficam; a repetição de b.xlsx sai
+    assert [(r.planilha, r.tipo, r.tema) for r in recs] == [
+        ("a.xlsx", "Lei", "BPC"), ("a.xlsx", "Lei", "Renda"), ("b.xlsx", "Decreto", "BPC")]
+    assert len({r.slug for r in recs}) == 3
+
+
+@pytest.mark.filterwarnings("ignore::UserWarning")
+@pytest.mark.parametrize("batch", [7, 5000])
+def test_engines_stream_e_pandas_dao_os_mesmos_registros(tmp_path, monkeypatch, batch):
+    # lote pequeno: a aba do repositório atravessa várias fronteiras de lote
+    monkeypatch.setattr(xlsx_ingest, "BATCH_ROWS", batch)
+    b = _xlsx(tmp_path / "b.xlsx", ["", "", "", "", "", ""], LEI, [None, None, None, "Decreto nº 6.214/2007", 7, None])
+    for inputs in ([DATA], [b]):
+        stream = [n.to_json() for n in iter_corpus_records(inputs, engine="stream", jobs=1)]
+        pandas = [n.to_json() for n in iter_corpus_records(inputs, engine="pandas", jobs=1)]
+        assert stream == pandas != []
+
+
+def test_canonical_columns_igual_as_inferencias_por_linha():
+    idents = ["Lei nº 8.742, de 7 de dezembro de 1993", "PORTARIA CONJUNTA Nº 3, DE 2018",
+              "Instrução Normativa nº 77/2015", "Resolução CIT 07/2009", "Memorando-circular", "", "Decreto 6214"]
+    vig = ["vigente", "R", "Revogado parcialmente", "", "Suspensa", "Não vigente", "Em análise"]
+    rows = [[ident, "", v] for ident, v in zip(idents, vig)]
+    rows[5][1] = "Lei"  # TIPO preenchido tem precedência
+    cols = canonical_columns(rows, {"identificacao": 0, "tipo": 1, "vigencia": 2})
+    tipo = [r[1] or infer_tipo_from_ident(r[0]) for r in rows]
+    numero = [infer_numero_from_ident(i) for i in idents]
+    assert cols["tipo"] == tipo
+    assert cols["numero"] == numero
+    assert cols["ano"] == [year_from_numero(n) for n in numero]
+    assert cols["vigencia"] == [_map_vigencia(v) for v in vig]
+    assert cols["tipo"][:4] == ["Lei", "Portaria Conjunta", "Instrução Normativa", "Resolução"]
+    assert cols["ano"][2:4] == ["2015", "2009"]
+
+
+def test_cache_evita_reler_a_planilha(tmp_path, monkeypatch):
+    a = _xlsx(tmp_path / "a.xlsx", LEI, DECRETO)
+    cache = tmp_path / "cache"
+    first = [n.to_json() for n in iter_corpus_records([a], jobs=1, cache_dir=cache)]
+    assert len(list((cache / xlsx_ingest.CACHE_SUBDIR).iterdir())) == 1
+
+    def no_read(*args, **kwargs):
+        raise AssertionError("planilha relida com cache válido")
+
+    monkeypatch.setattr(xlsx_ingest, "_iter_sheet_records", no_read)
+    assert [n.to_json() for n in iter_corpus_records([a], jobs=1, cache_dir=cache)] == first
+
+    # conteúdo novo = chave nova: relê
+    _xlsx(a, LEI)
+    monkeypatch.undo()
+    assert len(list(iter_corpus_records([a], jobs=1, cache_dir=cache))) == 1
+    assert len(list((cache / xlsx_ingest.CACHE_SUBDIR).iterdir())) == 2